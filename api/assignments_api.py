@@ -2,33 +2,180 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from utils.auth_utils import teacher_required, student_required
-from utils.auth_utils import db
+from utils.auth_utils import db, User
 from models.assignment_models import Assignment, AssignmentSubmission
-from models.classroom_models import Classroom
+from models.classroom_models import Classroom, ClassMember
+from utils.upload_store import upload_store, join_urls, resumable_uploads, UploadSessionError
+from config import Config
+from sqlalchemy import select, func, and_, or_, union_all
+from sqlalchemy.orm import aliased
+from werkzeug.exceptions import RequestEntityTooLarge
 from datetime import datetime
-import os, uuid
+import base64, json
 
 assign_api = Blueprint("assign_api", __name__)
 
-# get all assignments (merged) for student
+# -------------------------
+# STUDENT FEED (keyset pagination)
+# -------------------------
+# GET /student/all?limit=20&cursor=..&subject=..&status=pending|submitted|overdue|<status>
+# Assignments of the student's classes, newest due date first, with the
+# student's latest submission joined in. The cursor is the (due_date, id) of
+# the last row of the previous page.
+#
+# One `class_id IN (...) ORDER BY due_date` scan cannot come out of the
+# (class_id, due_date, id) index in order, so the database would sort every
+# matching assignment on every page. Instead each class contributes two
+# index-ordered arms of at most limit + 1 rows: dated assignments after the
+# cursor, then (a separate final phase) the undated ones by id. Only those
+# arms are merged and sorted, so a page costs classes x page size however
+# many assignments there are.
+FEED_PAGE_SIZE = 20
+FEED_MAX_PAGE_SIZE = 100
+FEED_ARMS_PER_UNION = 200       # SQLite allows 500 terms per compound SELECT
+
+
+def encode_cursor(due_date, id):
+    raw = json.dumps([due_date.isoformat() if due_date else None, id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        due, id = json.loads(raw)
+        return (datetime.fromisoformat(due) if due else None), int(id)
+    except (ValueError, TypeError):
+        return None
+
+
+def feed_arms(class_id, filters, position, limit):
+    """
+    Index-ordered pages of one class: dated rows after the cursor, then the
+    undated phase. Each arm is wrapped so SQLite accepts its ORDER BY/LIMIT
+    inside the UNION ALL.
+    """
+    due, last_id = position or (None, None)
+    base = select(Assignment.id, Assignment.due_date).where(Assignment.class_id == class_id, *filters)
+    arms = []
+    if position is None or due is not None:
+        dated = base.where(Assignment.due_date.isnot(None))
+        if position is not None:
+            dated = dated.where(or_(
+                Assignment.due_date < due,
+                and_(Assignment.due_date == due, Assignment.id < last_id)
+            ))
+        arms.append(dated.order_by(Assignment.due_date.desc(), Assignment.id.desc()))
+    undated = base.where(Assignment.due_date.is_(None))
+    if due is None and last_id is not None:
+        undated = undated.where(Assignment.id < last_id)
+    arms.append(undated.order_by(Assignment.id.desc()))
+    return [select(arm.limit(limit).subquery()) for arm in arms]
+
+
 @assign_api.route("/student/all", methods=["GET"])
 @student_required
 def student_assignments():
-    # For now return all assignments — you can filter by student's classes
-    assignments = Assignment.query.order_by(Assignment.due_date.desc().nullslast()).all()
+    limit = min(max(request.args.get("limit", FEED_PAGE_SIZE, type=int), 1), FEED_MAX_PAGE_SIZE)
+    subject = request.args.get("subject")
+    status = request.args.get("status")
+
+    latest_id = (
+        select(func.max(AssignmentSubmission.id))
+        .where(
+            AssignmentSubmission.assignment_id == Assignment.id,
+            AssignmentSubmission.student_id == current_user.id
+        )
+        .correlate(Assignment)
+        .scalar_subquery()
+    )
+    latest = aliased(AssignmentSubmission)
+
+    filters = []
+    if subject:
+        filters.append(Assignment.subject == subject)
+    if status == "pending":
+        filters.append(latest_id.is_(None))
+    elif status == "overdue":
+        filters += [latest_id.is_(None), Assignment.due_date < datetime.utcnow()]
+    elif status == "submitted":
+        filters.append(latest_id.isnot(None))
+    elif status:
+        filters.append(select(latest.status).where(latest.id == latest_id).scalar_subquery() == status)
+
+    position = None
+    cursor = request.args.get("cursor")
+    if cursor:
+        position = decode_cursor(cursor)
+        if position is None:
+            return jsonify({"error": "invalid cursor"}), 400
+
+    class_ids = [
+        c for (c,) in db.session.query(ClassMember.class_id).filter_by(student_id=current_user.id)
+    ]
+    if not class_ids:
+        return jsonify({"items": [], "next_cursor": None})
+    arms = [arm for c in class_ids for arm in feed_arms(c, filters, position, limit + 1)]
+    if len(arms) > FEED_ARMS_PER_UNION:
+        arms = [
+            select(union_all(*arms[i:i + FEED_ARMS_PER_UNION]).subquery())
+            for i in range(0, len(arms), FEED_ARMS_PER_UNION)
+        ]
+    page = union_all(*arms).subquery()
+
+    q = (
+        db.session.query(
+            Assignment.id,
+            Assignment.class_id,
+            Assignment.title,
+            Assignment.description,
+            Assignment.subject,
+            Assignment.due_date,
+            Assignment.file_url,
+            User.name,
+            User.email,
+            User.photo_url,
+            latest.id.label("submission_id"),
+            latest.status.label("submission_status"),
+            latest.submitted_at
+        )
+        .select_from(page)
+        .join(Assignment, Assignment.id == page.c.id)
+        .join(User, User.id == Assignment.teacher_id)
+        .outerjoin(latest, latest.id == latest_id)
+    )
+
+    # only the arms' rows are sorted here: dated ones first, newest due first
+    rows = (
+        q.order_by(page.c.due_date.is_(None), page.c.due_date.desc(), page.c.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    more = len(rows) > limit
+    rows = rows[:limit]
+
     out = []
-    for a in assignments:
+    for a in rows:
         out.append({
             "id": a.id,
+            "class_id": a.class_id,
             "title": a.title,
             "description": a.description,
             "subject": a.subject,
-            "teacher_name": a.teacher.name or a.teacher.email,
-            "teacher_photo": a.teacher.photo_url,
+            "teacher_name": a.name or a.email,
+            "teacher_photo": a.photo_url,
             "due_date": a.due_date.isoformat() if a.due_date else None,
-            "file_url": a.file_url
+            "file_url": a.file_url,
+            "submission": {
+                "id": a.submission_id,
+                "status": a.submission_status,
+                "submitted_at": a.submitted_at.isoformat() if a.submitted_at else None
+            } if a.submission_id else None
         })
-    return jsonify(out)
+    return jsonify({
+        "items": out,
+        "next_cursor": encode_cursor(rows[-1].due_date, rows[-1].id) if more else None
+    })
 
 # submit assignment (student) — expects multipart/form-data (file + comment + assignment_id)
 @assign_api.route("/student/submit", methods=["POST"])
@@ -41,19 +188,104 @@ def submit_assignment():
     if not assignment_id:
         return jsonify({"error":"assignment_id required"}), 400
 
-    file_url = None
-    if file:
-        # save file to static/uploads/assignments/
-        upload_dir = os.path.join("static", "uploads", "assignments")
-        os.makedirs(upload_dir, exist_ok=True)
-        filename = f"{uuid.uuid4().hex}_{file.filename}"
-        filepath = os.path.join(upload_dir, filename)
-        file.save(filepath)
-        file_url = "/" + filepath.replace("\\","/")
+    # copied + hashed into the content-addressed store (utils/upload_store.py)
+    try:
+        stored = upload_store.save(file, Config.UPLOAD_MAX_BYTES)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 413
+    file_url = stored.url if stored else None
 
     sub = AssignmentSubmission(assignment_id=int(assignment_id), student_id=current_user.id, file_url=file_url, comment=comment, submitted_at=datetime.utcnow())
     db.session.add(sub); db.session.commit()
     return jsonify({"message":"submitted", "submission_id": sub.id})
+
+# -------------------------
+# RESUMABLE UPLOADS (student)
+# -------------------------
+# POST   /student/uploads                      {assignment_id, filename, size}
+# PUT    /student/uploads/<id>?offset=N        raw bytes (or Content-Range: bytes N-M/size)
+# GET    /student/uploads/<id>                 received ranges
+# POST   /student/uploads/<id>/finalize        {comment} -> AssignmentSubmission
+# DELETE /student/uploads/<id>
+@assign_api.errorhandler(UploadSessionError)
+def upload_session_error(e):
+    return jsonify({"error": str(e)}), e.status
+
+
+@assign_api.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    return jsonify({"error": f"request is larger than {request.max_content_length} bytes"}), 413
+
+
+@assign_api.post("/student/uploads")
+@student_required
+def init_upload():
+    data = request.get_json(silent=True) or {}
+    assignment = db.session.get(Assignment, data.get("assignment_id") or 0)
+    if not assignment:
+        return jsonify({"error": "assignment not found"}), 404
+
+    upload = resumable_uploads.create(
+        current_user.id,
+        data.get("filename"),
+        data.get("size"),
+        max_bytes=Config.UPLOAD_MAX_BYTES,
+        assignment_id=assignment.id
+    )
+    return jsonify(upload), 201
+
+
+def chunk_offset():
+    content_range = request.headers.get("Content-Range", "")
+    if content_range.startswith("bytes "):
+        try:
+            return int(content_range[6:].split("-", 1)[0])
+        except ValueError:
+            pass
+    try:
+        return int(request.args["offset"])
+    except (KeyError, ValueError):
+        raise UploadSessionError("offset or Content-Range required")
+
+
+@assign_api.put("/student/uploads/<upload_id>")
+@student_required
+def upload_chunk(upload_id):
+    return jsonify(
+        resumable_uploads.write_chunk(upload_id, current_user.id, chunk_offset(), request.stream)
+    )
+
+
+@assign_api.get("/student/uploads/<upload_id>")
+@student_required
+def upload_status(upload_id):
+    return jsonify(resumable_uploads.status(upload_id, current_user.id))
+
+
+@assign_api.post("/student/uploads/<upload_id>/finalize")
+@student_required
+def finalize_upload(upload_id):
+    data = request.get_json(silent=True) or {}
+    stored, meta = resumable_uploads.finalize(upload_id, current_user.id)
+
+    sub = AssignmentSubmission(
+        assignment_id=meta["assignment_id"],
+        student_id=current_user.id,
+        file_url=stored.url,
+        comment=data.get("comment"),
+        submitted_at=datetime.utcnow()
+    )
+    db.session.add(sub); db.session.commit()
+    return jsonify({"message": "submitted", "submission_id": sub.id, "file_url": stored.url})
+
+
+@assign_api.delete("/student/uploads/<upload_id>")
+@student_required
+def abort_upload(upload_id):
+    resumable_uploads.abort(upload_id, current_user.id)
+    return jsonify({"message": "upload discarded"})
+
+
 @assign_api.post("/teacher/create")
 @teacher_required
 def create_assignment():
@@ -65,26 +297,34 @@ def create_assignment():
     if not class_id or not title:
         return jsonify({"error": "class_id and title required"}), 400
 
-    # handle files
-    file_urls = []
-    files = request.files.getlist("file")
-    os.makedirs("static/uploads/assignments", exist_ok=True)
+    classroom = Classroom.query.filter_by(id=class_id, teacher_id=current_user.id).first()
+    if not classroom:
+        return jsonify({"error": "Invalid class"}), 404
+
+    if due_date:
+        try:
+            due_date = datetime.fromisoformat(due_date)
+        except ValueError:
+            return jsonify({"error": "due_date must be an ISO date/time"}), 400
+    else:
+        due_date = None
 
-    for f in files:
-        if f.filename:
-            path = f"static/uploads/assignments/{f.filename}"
-            f.save(path)
-            file_urls.append(path)
+    # handle files (stored by content hash, so identical files are kept once)
+    try:
+        stored = [upload_store.save(f, Config.UPLOAD_MAX_BYTES) for f in request.files.getlist("file")]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 413
 
     assignment = Assignment(
-        class_id=class_id,
+        class_id=classroom.id,
         teacher_id=current_user.id,
         title=title,
         description=description,
+        subject=request.form.get("subject") or classroom.subject,
         due_date=due_date,
-        attachments=",".join(file_urls)
+        file_url=join_urls(stored)
     )
     db.session.add(assignment)
     db.session.commit()
 
-    return jsonify({"message": "Assignment created"}), 201
+    return jsonify({"message": "Assignment created", "assignment_id": assignment.id}), 201
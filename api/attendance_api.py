@@ -1,7 +1,115 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, Response, stream_with_context
+from flask_login import current_user
+from werkzeug.utils import secure_filename
+
+from utils.auth_utils import teacher_required, student_required, db, User
+from utils.attendance_rollup import rollup_dict
+from utils.report_utils import attendance_matrix, EXPORTS
+from utils.job_queue import job_queue
+from api.jobs_api import accepted
+from models.classroom_models import Classroom, ClassMember, AttendanceRollup
 
 attendance_api = Blueprint("attendance_api", __name__)
 
 @attendance_api.route("/status")
 def attendance_status():
     return jsonify({"message": "Attendance API working"})
+
+
+# -------------------------
+# TEACHER: ATTENDANCE REPORT EXPORT
+# -------------------------
+@attendance_api.get("/class/<int:class_id>/report.<fmt>")
+@teacher_required
+def attendance_report(class_id, fmt):
+    if fmt not in EXPORTS:
+        return jsonify({"error": "format must be csv or xlsx"}), 404
+
+    classroom = Classroom.query.filter_by(id=class_id, teacher_id=current_user.id).first()
+    if not classroom:
+        return jsonify({"error": "Invalid class"}), 404
+
+    chunks, mimetype = EXPORTS[fmt]
+    filename = secure_filename(f"attendance_{classroom.class_name}.{fmt}") or f"attendance.{fmt}"
+
+    response = Response(
+        stream_with_context(chunks(attendance_matrix(classroom.id))),
+        mimetype=mimetype
+    )
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response.headers["X-Accel-Buffering"] = "no"    # let nginx pass chunks straight through
+    return response
+
+
+@attendance_api.post("/class/<int:class_id>/report.<fmt>/job")
+@teacher_required
+def attendance_report_job(class_id, fmt):
+    """Build the report file in the background; the job result has its file_url."""
+    if fmt not in EXPORTS:
+        return jsonify({"error": "format must be csv or xlsx"}), 404
+
+    classroom = Classroom.query.filter_by(id=class_id, teacher_id=current_user.id).first()
+    if not classroom:
+        return jsonify({"error": "Invalid class"}), 404
+
+    return accepted(job_queue.enqueue(
+        "attendance_report", {"class_id": classroom.id, "fmt": fmt}, owner_id=current_user.id
+    ))
+
+
+# -------------------------
+# ATTENDANCE SUMMARIES (from AttendanceRollup, one row per student)
+# -------------------------
+@attendance_api.get("/class/<int:class_id>/summary")
+@teacher_required
+def class_attendance_summary(class_id):
+    classroom = Classroom.query.filter_by(id=class_id, teacher_id=current_user.id).first()
+    if not classroom:
+        return jsonify({"error": "Invalid class"}), 404
+
+    rows = (
+        db.session.query(
+            User.id, User.name, User.email,
+            AttendanceRollup.sessions_held,
+            AttendanceRollup.sessions_attended,
+            AttendanceRollup.total_seconds,
+            AttendanceRollup.last_seen_at
+        )
+        .join(ClassMember, ClassMember.student_id == User.id)
+        .outerjoin(AttendanceRollup, (AttendanceRollup.class_id == ClassMember.class_id)
+                   & (AttendanceRollup.student_id == ClassMember.student_id))
+        .filter(ClassMember.class_id == classroom.id)
+        .order_by(User.name, User.id)
+        .all()
+    )
+    return jsonify({
+        "class_id": classroom.id,
+        "students": [
+            {"student_id": r.id, "name": r.name, "email": r.email, **rollup_dict(r)}
+            for r in rows
+        ]
+    })
+
+
+@attendance_api.get("/student/summary")
+@student_required
+def student_attendance_summary():
+    rows = (
+        db.session.query(
+            Classroom.id, Classroom.class_name, Classroom.subject,
+            AttendanceRollup.sessions_held,
+            AttendanceRollup.sessions_attended,
+            AttendanceRollup.total_seconds,
+            AttendanceRollup.last_seen_at
+        )
+        .join(ClassMember, ClassMember.class_id == Classroom.id)
+        .outerjoin(AttendanceRollup, (AttendanceRollup.class_id == ClassMember.class_id)
+                   & (AttendanceRollup.student_id == ClassMember.student_id))
+        .filter(ClassMember.student_id == current_user.id)
+        .order_by(Classroom.class_name)
+        .all()
+    )
+    return jsonify([
+        {"class_id": r.id, "class_name": r.class_name, "subject": r.subject, **rollup_dict(r)}
+        for r in rows
+    ])
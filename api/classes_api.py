@@ -1,7 +1,9 @@
 # api/classes_api.py
 from flask import Blueprint, request, jsonify
 from flask_login import current_user, login_required
-from utils.auth_utils import teacher_required, student_required, db
+from utils.auth_utils import teacher_required, student_required, db, User
+from utils.face_store import face_store
+from utils.timetable_utils import timetable_index
 
 from models.classroom_models import (
     Classroom,
@@ -11,6 +13,9 @@ from models.classroom_models import (
     SessionAttendance     # ✅ attendance for LiveSession
 )
 
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
 import secrets
 import string
 
@@ -81,7 +86,16 @@ def join_class():
         student_id=current_user.id
     )
     db.session.add(member)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:  # concurrent double submit
+        db.session.rollback()
+        return {"message": "already joined"}
+
+    # make the student's registered face matchable in this class
+    face_store.add_student_to_class(classroom.id, current_user.id)
+    # the student now links this class's timetable to their other classes
+    timetable_index.clear()
 
     return {"message": "joined", "class_id": classroom.id}
 
@@ -91,19 +105,30 @@ def join_class():
 @classes_api.get("/teacher/list")
 @teacher_required
 def teacher_classes():
-    classes = Classroom.query.filter_by(
-        teacher_id=current_user.id
-    ).all()
+    # one grouped query instead of a COUNT per classroom
+    rows = (
+        db.session.query(
+            Classroom.id,
+            Classroom.class_name,
+            Classroom.subject,
+            Classroom.classroom_code,
+            func.count(ClassMember.id)
+        )
+        .outerjoin(ClassMember, ClassMember.class_id == Classroom.id)
+        .filter(Classroom.teacher_id == current_user.id)
+        .group_by(Classroom.id)
+        .all()
+    )
 
     return [
         {
-            "id": c.id,
-            "class_name": c.class_name,
-            "subject": c.subject,
-            "code": c.classroom_code,
-            "student_count": c.members.count()
+            "id": class_id,
+            "class_name": class_name,
+            "subject": subject,
+            "code": code,
+            "student_count": student_count
         }
-        for c in classes
+        for class_id, class_name, subject, code, student_count in rows
     ]
 
 # -------------------------
@@ -145,32 +170,31 @@ def generate_live_session(class_id):
 @classes_api.get("/student/joined")
 @student_required
 def student_joined_classes():
+    # memberships, classes and teachers in one query
+    rows = (
+        db.session.query(
+            Classroom.id,
+            Classroom.class_name,
+            Classroom.subject,
+            Classroom.classroom_code,
+            User.id,
+            User.name,
+            User.photo_url
+        )
+        .join(ClassMember, ClassMember.class_id == Classroom.id)
+        .outerjoin(User, User.id == Classroom.teacher_id)
+        .filter(ClassMember.student_id == current_user.id)
+        .all()
+    )
 
-    memberships = ClassMember.query.filter_by(
-        student_id=current_user.id
-    ).all()
-
-    if not memberships:
-        return []
-
-    class_ids = [m.class_id for m in memberships]
-
-    classes = Classroom.query.filter(
-        Classroom.id.in_(class_ids)
-    ).all()
-
-    result = []
-
-    for c in classes:
-        teacher = c.teacher  # requires relationship in model
-
-        result.append({
-            "class_id": c.id,
-            "class_name": c.class_name,
-            "subject": c.subject,
-            "code": c.classroom_code,
-            "teacher_name": teacher.name if teacher else "Unknown",
-            "teacher_photo": teacher.photo_url if teacher else None
-        })
-
-    return result
+    return [
+        {
+            "class_id": class_id,
+            "class_name": class_name,
+            "subject": subject,
+            "code": code,
+            "teacher_name": teacher_name if teacher_id else "Unknown",
+            "teacher_photo": teacher_photo
+        }
+        for class_id, class_name, subject, code, teacher_id, teacher_name, teacher_photo in rows
+    ]
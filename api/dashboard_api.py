@@ -1,7 +1,76 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+
+from utils.auth_utils import teacher_required, db, User
+from utils.suggestion_engine import suggestion_engine
+from models.classroom_models import Classroom, LiveSession
+from api.live_session_api import session_stats
 
 dashboard_api = Blueprint("dashboard_api", __name__)
 
+# -------------------------
+# LIVE STATS (ROLLING WINDOWS, NO HISTORY SCAN)
+# -------------------------
 @dashboard_api.route("/stats")
+@login_required
 def get_stats():
-    return jsonify({"present": 0, "attention": 0})
+    session_link = request.args.get("session")
+
+    if session_link:
+        session = LiveSession.query.filter_by(session_link=session_link).first()
+        if not session:
+            return jsonify({"error": "Invalid session"}), 404
+        return jsonify(session_stats(session).snapshot())
+
+    # no session given: totals over the teacher's running sessions
+    running = LiveSession.query.filter_by(
+        teacher_id=current_user.id,
+        ended_at=None
+    ).all()
+
+    snapshots = [session_stats(s).snapshot() for s in running]
+    samples = sum(s["attention_samples"] for s in snapshots)
+
+    return jsonify({
+        "present": sum(s["present"] for s in snapshots),
+        "attention": round(
+            sum(s["attention"] * s["attention_samples"] for s in snapshots) / samples, 3
+        ) if samples else 0,
+        "sessions": len(snapshots)
+    })
+
+
+# -------------------------
+# AT-RISK STUDENTS + SUGGESTED INTERVENTIONS (utils/suggestion_engine.py)
+# -------------------------
+@dashboard_api.get("/at-risk")
+@teacher_required
+def at_risk():
+    class_id = request.args.get("class_id", type=int)
+    limit = min(request.args.get("limit", 10, type=int), 100)
+
+    query = Classroom.query.filter_by(teacher_id=current_user.id)
+    if class_id is not None:
+        query = query.filter_by(id=class_id)
+    classes = query.order_by(Classroom.id).all()
+    if class_id is not None and not classes:
+        return jsonify({"error": "Invalid class"}), 404
+
+    results = suggestion_engine.at_risk(
+        db.session.connection(), [c.id for c in classes], limit=limit
+    )
+
+    student_ids = {s["student_id"] for students in results.values() for s in students}
+    names = dict(
+        db.session.query(User.id, User.name).filter(User.id.in_(student_ids))
+    ) if student_ids else {}
+    for students in results.values():
+        for s in students:
+            s["name"] = names.get(s["student_id"])
+
+    return jsonify({
+        "classes": [
+            {"class_id": c.id, "class_name": c.class_name, "students": results[c.id]}
+            for c in classes
+        ]
+    })
@@ -1,7 +1,66 @@
-from flask import Blueprint, jsonify
+from concurrent.futures import wait
+
+import numpy as np
+from flask import Blueprint, request, jsonify
+from flask_login import login_required
+
+from models.classroom_models import LiveSession
+from utils.emotion_utils import get_scheduler, cv2
+from utils.live_stats import live_stats
+from api.live_session_api import session_stats, board_session
 
 emotions_api = Blueprint("emotions_api", __name__)
 
+RESULT_TIMEOUT = 5  # seconds a request waits for its batch
+
 @emotions_api.route("/test")
 def test_emotions():
-    return jsonify({"message": "Emotion API working"})
+    scheduler = get_scheduler()
+    return jsonify({
+        "message": "Emotion API working",
+        "model_configured": scheduler is not None,
+        "scheduler": scheduler.stats() if scheduler else None
+    })
+
+
+# =====================================
+# FACE CROPS OF A LIVE SESSION -> EMOTIONS
+# =====================================
+@emotions_api.post("/session/<string:session_link>/crops")
+@login_required
+def classify_crops(session_link):
+    scheduler = get_scheduler()
+    if scheduler is None:
+        return {"error": "Emotion model not configured"}, 503
+    if cv2 is None:
+        return {"error": "opencv-python is not installed on the server"}, 503
+
+    session = LiveSession.query.filter_by(session_link=session_link).first()
+    # only the session's teacher and class members feed its stats
+    if not session or session.ended_at or not board_session(session_link):
+        return {"error": "Invalid session"}, 404
+
+    crops = []
+    for f in request.files.getlist("crops"):
+        img = cv2.imdecode(np.frombuffer(f.read(), dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        if img is not None:
+            crops.append(img)
+
+    if not crops:
+        return {"error": "crops required"}, 400
+
+    # attention sample: share of the present students whose face is visible
+    stats = session_stats(session)
+    if stats.present:
+        stats.record_attention(len(crops) / stats.present)
+
+    scheduler.register_session(session_link, live_stats.record_emotion_result)
+    futures = scheduler.submit_many(session_link, crops)
+    done, _ = wait(futures, timeout=RESULT_TIMEOUT)
+
+    return {
+        "results": [
+            f.result() if f in done and not f.exception() else None
+            for f in futures
+        ]
+    }
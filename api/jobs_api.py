@@ -0,0 +1,57 @@
+# api/jobs_api.py
+from flask import Blueprint, jsonify, request
+from flask_login import login_required, current_user
+
+from utils.auth_utils import db
+from utils.job_queue import job_queue
+from models.job_models import Job
+
+jobs_api = Blueprint("jobs_api", __name__)
+
+
+def accepted(job_id):
+    """202 response for an endpoint that handed its work to the queue."""
+    return jsonify({
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/api/jobs/{job_id}"
+    }), 202
+
+
+# -------------------------
+# MY JOBS
+# -------------------------
+@jobs_api.get("/")
+@login_required
+def my_jobs():
+    limit = min(request.args.get("limit", 20, type=int), 100)
+    jobs = (
+        Job.query.filter_by(owner_id=current_user.id)
+        .order_by(Job.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+    return jsonify([job_queue.describe(j) for j in jobs])
+
+
+# -------------------------
+# JOB STATUS
+# -------------------------
+@jobs_api.get("/<int:job_id>")
+@login_required
+def job_status(job_id):
+    job = db.session.get(Job, job_id)
+    if not job or job.owner_id != current_user.id:
+        return jsonify({"error": "job not found"}), 404
+    return jsonify(job_queue.describe(job))
+
+
+@jobs_api.post("/<int:job_id>/cancel")
+@login_required
+def cancel_job(job_id):
+    job = db.session.get(Job, job_id)
+    if not job or job.owner_id != current_user.id:
+        return jsonify({"error": "job not found"}), 404
+    if not job_queue.cancel(job_id):
+        return jsonify({"error": f"job is {job.status}, only queued jobs can be cancelled"}), 409
+    return jsonify({"message": "cancelled"})
@@ -1,43 +1,76 @@
 # api/live_session_api.py
-from flask import Blueprint
-from flask_login import current_user
+from flask import Blueprint, Response, jsonify, request
+from flask_login import current_user, login_required
 from datetime import datetime
+from sqlalchemy import update
 
 from utils.auth_utils import db, student_required, teacher_required
-from models.classroom_models import LiveSession, SessionAttendance
+from utils.live_stats import live_stats
+from utils.emotion_utils import release_session
+from utils.presence import presence_registry, event_stream
+from utils.attendance_buffer import attendance_buffer
+from utils.attendance_rollup import record_session_end
+from utils.whiteboard import whiteboard_log, parse_stroke, MAX_BATCH
+from utils.auth_utils import User
+from models.classroom_models import ClassMember, LiveSession
 
 live_session_api = Blueprint("live_session_api", __name__)
 
 
+def session_stats(session):
+    """Rolling stats of a session, seeded from the attendance buffer on first use."""
+    return live_stats.get(
+        session.session_link,
+        seed_present=lambda: len(attendance_buffer.open_students(session.id))
+    )
+
+
+def roster_entry(user, joined_at):
+    return {
+        "id": user.id,
+        "name": user.name or user.email,
+        "joined_at": joined_at.isoformat()
+    }
+
+
+def roster_seed(session):
+    """Open attendances of a session, used once to seed the presence registry."""
+    def seed():
+        present = attendance_buffer.open_students(session.id)
+        if not present:
+            return {}
+        users = User.query.filter(User.id.in_(list(present))).all()
+        return {u.id: roster_entry(u, present[u.id]) for u in users}
+    return seed
+
+
 # =====================================
 # STUDENT JOINS SESSION (AUTO ATTENDANCE)
 # =====================================
 @live_session_api.post("/join/<string:session_link>")
 @student_required
 def join_session(session_link):
-    session = LiveSession.query.filter_by(session_link=session_link).first()
+    session = attendance_buffer.session_ref(session_link)
 
     if not session:
         return {"error": "Invalid session"}, 404
 
-    # prevent duplicate join
-    existing = SessionAttendance.query.filter_by(
-        session_id=session.id,
-        student_id=current_user.id
-    ).first()
+    stats = session_stats(session)  # seed before this join is recorded
 
-    if existing:
+    # written to the DB by the buffer's next flush
+    created, attendance = attendance_buffer.join(session.id, current_user.id)
+
+    # prevent duplicate join
+    if not created:
         return {"message": "Already joined"}, 200
 
-    attendance = SessionAttendance(
-        session_id=session.id,
-        student_id=current_user.id,
-        joined_at=datetime.utcnow()
+    stats.record_join()
+    presence_registry.join(
+        session_link,
+        roster_entry(current_user, attendance.joined_at),
+        seed_roster=roster_seed(session)
     )
 
-    db.session.add(attendance)
-    db.session.commit()
-
     return {
         "message": "Attendance marked",
         "joined_at": attendance.joined_at.isoformat()
@@ -50,27 +83,23 @@ def join_session(session_link):
 @live_session_api.post("/leave/<string:session_link>")
 @student_required
 def leave_session(session_link):
-    session = LiveSession.query.filter_by(session_link=session_link).first()
+    session = attendance_buffer.session_ref(session_link)
 
     if not session:
         return {"error": "Invalid session"}, 404
 
-    attendance = SessionAttendance.query.filter_by(
-        session_id=session.id,
-        student_id=current_user.id,
-        left_at=None
-    ).first()
+    stats = session_stats(session)
+
+    attendance = attendance_buffer.leave(session.id, current_user.id)
 
     if not attendance:
         return {"error": "Attendance not found"}, 404
 
-    attendance.left_at = datetime.utcnow()
-    attendance.duration = int(
-        (attendance.left_at - attendance.joined_at).total_seconds()
+    stats.record_leave()
+    presence_registry.leave(
+        session_link, current_user.id, seed_roster=roster_seed(session)
     )
 
-    db.session.commit()
-
     return {
         "message": "Left session",
         "duration_seconds": attendance.duration
@@ -92,14 +121,112 @@ def end_session(session_link):
     if session.ended_at:
         return {"message": "Session already ended"}, 200
 
-    session.ended_at = datetime.utcnow()
-    session.duration = int(
-        (session.ended_at - session.started_at).total_seconds()
-    )
+    # buffered joins/leaves must be in the DB before the session closes
+    # (this process's buffer; other workers flush theirs within ATTENDANCE_FLUSH_MS)
+    attendance_buffer.flush(session.id)
+
+    ended_at = datetime.utcnow()
+    duration = int((ended_at - session.started_at).total_seconds())
+
+    # only one concurrent end request wins (and counts the session held)
+    ended = db.session.execute(
+        update(LiveSession)
+        .where(LiveSession.id == session.id, LiveSession.ended_at.is_(None))
+        .values(ended_at=ended_at, duration=duration)
+    ).rowcount
+    if not ended:
+        db.session.rollback()
+        return {"message": "Session already ended"}, 200
+
+    # per-class attendance totals, committed together with the end
+    record_session_end(db.session.connection(), session.id, session.class_id, ended_at)
 
     db.session.commit()
 
+    attendance_buffer.forget(session.id)
+    live_stats.drop(session.session_link)
+    release_session(session.session_link)
+    presence_registry.end(session.session_link)
+
     return {
         "message": "Session ended",
-        "duration_seconds": session.duration
+        "duration_seconds": duration
     }
+
+
+# =====================================
+# TEACHER: LIVE PRESENCE STREAM (SSE)
+# =====================================
+@live_session_api.get("/presence/<string:session_link>/stream")
+@teacher_required
+def presence_stream(session_link):
+    session = LiveSession.query.filter_by(
+        session_link=session_link,
+        teacher_id=current_user.id
+    ).first()
+
+    if not session:
+        return {"error": "Invalid session"}, 404
+
+    if session.ended_at:
+        return {"error": "Session already ended"}, 410
+
+    q = presence_registry.subscribe(session_link, seed_roster=roster_seed(session))
+
+    return Response(
+        event_stream(session_link, q),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+# =====================================
+# SHARED WHITEBOARD (STROKE LOG + SNAPSHOTS)
+# =====================================
+def board_session(session_link):
+    """Session ref of a board the current user may see (its teacher or a class member)."""
+    session = attendance_buffer.session_ref(session_link)
+    if not session:
+        return None
+    if session.teacher_id == current_user.id:
+        return session
+    member = ClassMember.query.filter_by(
+        class_id=session.class_id, student_id=current_user.id
+    ).first()
+    return session if member else None
+
+
+@live_session_api.get("/whiteboard/<string:session_link>")
+@login_required
+def whiteboard_since(session_link):
+    session = board_session(session_link)
+    if not session:
+        return {"error": "Invalid session"}, 404
+
+    since = max(request.args.get("since", 0, type=int), 0)
+    return jsonify(whiteboard_log.since(session.id, since))
+
+
+@live_session_api.post("/whiteboard/<string:session_link>")
+@teacher_required
+def whiteboard_append(session_link):
+    session = attendance_buffer.session_ref(session_link)
+    if not session or session.teacher_id != current_user.id:
+        return {"error": "Invalid session"}, 404
+
+    if db.session.query(LiveSession.ended_at).filter_by(id=session.id).scalar():
+        return {"error": "Session already ended"}, 410
+
+    raw = (request.get_json(silent=True) or {}).get("strokes")
+    if not isinstance(raw, list) or not 1 <= len(raw) <= MAX_BATCH:
+        return {"error": f"send 1..{MAX_BATCH} strokes"}, 400
+
+    try:
+        strokes = [parse_stroke(s) for s in raw]
+    except (ValueError, TypeError) as exc:
+        return {"error": f"invalid stroke: {exc}"}, 400
+
+    return {"seqs": whiteboard_log.append(session.id, current_user.id, strokes)}, 201
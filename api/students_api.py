@@ -1,7 +1,131 @@
-from flask import Blueprint, jsonify
+import json
+import math
+import os
+import shutil
+import tempfile
+
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from flask_login import current_user
+
+from utils.auth_utils import student_required, teacher_required, db
+from utils.face_store import face_store, ENCODING_DIM
+from utils.roster_utils import parse_roster, import_roster, ndjson
+from utils.job_queue import job_queue
+from utils.upload_store import upload_store
+from api.jobs_api import accepted
+from models.classroom_models import ClassMember, Classroom
 
 students_api = Blueprint("students_api", __name__)
 
 @students_api.route("/all")
 def get_students():
     return jsonify({"message": "Students API working"})
+
+
+# -------------------------
+# HELPERS
+# -------------------------
+def encoding_from_request():
+    """128-d encoding from a JSON body."""
+    data = request.get_json(silent=True) or {}
+    if data.get("encoding") is not None:
+        encoding = data["encoding"]
+        if not isinstance(encoding, list) or len(encoding) != ENCODING_DIM or not all(
+            isinstance(v, (int, float)) and not isinstance(v, bool) and math.isfinite(v)
+            for v in encoding
+        ):
+            return None, f"encoding must be a list of {ENCODING_DIM} finite numbers"
+        return encoding, None
+
+    return None, "encoding or image required"
+
+
+# -------------------------
+# STUDENT FACE REGISTRATION
+# -------------------------
+@students_api.post("/face/register")
+@student_required
+def register_face():
+    # a photo is encoded by a background job (face detection takes seconds)
+    image = request.files.get("image")
+    if image and image.filename:
+        fd, path = tempfile.mkstemp(dir=upload_store.tmp_dir(), suffix=".img")
+        with os.fdopen(fd, "wb") as out:
+            shutil.copyfileobj(image.stream, out)
+        return accepted(job_queue.enqueue(
+            "face_enroll", {"student_id": current_user.id, "image_path": path},
+            owner_id=current_user.id
+        ))
+
+    encoding, error = encoding_from_request()
+    if error:
+        return {"error": error}, 400
+
+    class_ids = [
+        c[0] for c in db.session.query(ClassMember.class_id)
+        .filter_by(student_id=current_user.id)
+        .all()
+    ]
+
+    face_store.enroll_student(current_user.id, encoding, class_ids)
+
+    return {"message": "face registered", "classes_updated": len(class_ids)}, 201
+
+
+# -------------------------
+# TEACHER: BULK ROSTER IMPORT
+# -------------------------
+@students_api.post("/import")
+@teacher_required
+def import_students():
+    """
+    CSV upload (field "roster": name,email,password + form class_id) or JSON
+    {"class_id": .., "students": [{"name", "email", "password"}, ..]}.
+    Streams one JSON line per input row, or with background=1 returns a job
+    id right away (summary in the job result).
+    """
+    data = request.get_json(silent=True)
+    if data is not None:
+        class_id = data.get("class_id")
+        background = bool(data.get("background"))
+        rows = parse_roster(json_rows=data.get("students") or [])
+    else:
+        class_id = request.form.get("class_id")
+        background = request.form.get("background") in ("1", "true", "on")
+        upload = request.files.get("roster")
+        if not upload:
+            return {"error": "roster file required"}, 400
+        rows = parse_roster(stream=upload.stream)
+
+    if class_id:
+        try:
+            if isinstance(class_id, (bool, float)):
+                raise TypeError
+            class_id = int(class_id)
+        except (TypeError, ValueError):
+            return {"error": "class_id must be a number"}, 400
+        classroom = Classroom.query.filter_by(
+            id=class_id, teacher_id=current_user.id
+        ).first()
+        if not classroom:
+            return {"error": "Invalid class"}, 404
+        class_id = classroom.id
+
+    if not rows:
+        return {"error": "roster is empty"}, 400
+
+    if background:
+        # hashing is the job's work; the rows wait in a private (0600) temp
+        # file the job deletes, so no password reaches the jobs table
+        fd, path = tempfile.mkstemp(dir=upload_store.tmp_dir(), suffix=".roster.json")
+        with os.fdopen(fd, "w", encoding="utf-8") as out:
+            json.dump(rows, out)
+        return accepted(job_queue.enqueue(
+            "roster_import", {"rows_path": path, "class_id": class_id},
+            owner_id=current_user.id
+        ))
+
+    return Response(
+        stream_with_context(ndjson(import_roster(rows, class_id=class_id))),
+        mimetype="application/x-ndjson"
+    )
@@ -1,7 +1,9 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response
 from flask_login import current_user
-from datetime import datetime
 from utils.auth_utils import teacher_required, student_required, db
+from utils.timetable_utils import (
+    plan_week, save_week, owned_classroom, timetable_index, grid_cache, bump_timetable_version
+)
 from models.classroom_models import TimetableEntry, Classroom, ClassMember
 
 timetable_api = Blueprint("timetable_api", __name__)
@@ -25,55 +27,49 @@ def add_timetable():
     if not all([class_id, day, start_time, end_time, period]):
         return jsonify({"error": "All fields are required"}), 400
 
-    start_time = datetime.strptime(start_time, "%H:%M").time()
-    end_time = datetime.strptime(end_time, "%H:%M").time()
-    period = int(period)
-
     classroom = Classroom.query.get_or_404(class_id)
 
-    # ---- students of this class
-    student_ids = [
-        s.student_id for s in ClassMember.query.filter_by(class_id=class_id).all()
-    ]
-
-    # ---- all classes of those students
-    other_class_ids = (
-        db.session.query(ClassMember.class_id)
-        .filter(ClassMember.student_id.in_(student_ids))
-        .distinct()
-        .all()
-    )
-    other_class_ids = [c[0] for c in other_class_ids]
-
-    # ---- conflict check
-    conflict = TimetableEntry.query.filter(
-        TimetableEntry.class_id.in_(other_class_ids),
-        TimetableEntry.day == day,
-        TimetableEntry.start_time < end_time,
-        TimetableEntry.end_time > start_time
-    ).first()
-
-    if conflict:
-        return jsonify({
-            "error": "Time slot already occupied by another class."
-        }), 400
-
-    entry = TimetableEntry(
-        class_id=class_id,
-        day=day,
-        start_time=start_time,
-        end_time=end_time,
-        period=period,
-        subject=classroom.subject,
-        teacher_name=current_user.name
-    )
-
-    db.session.add(entry)
-    db.session.commit()
+    entries, errors = plan_week(classroom, [data], current_user.name)
+    if errors:
+        return jsonify(errors[0]), 400
+
+    save_week(classroom, entries)
 
     return jsonify({"message": "Timetable added successfully"}), 201
 
 
+# =========================================================
+# TEACHER: BULK WEEKLY UPLOAD
+# =========================================================
+@timetable_api.post("/teacher/timetable/bulk")
+@teacher_required
+def bulk_timetable():
+    """
+    {"class_id": 1, "replace": false,
+     "entries": [{"day", "period", "start_time", "end_time"}, ...]}
+
+    All periods are checked against the cohort and against each other; either
+    every period is inserted or none is and all problems are returned.
+    """
+    data = request.get_json(silent=True) or {}
+    rows = data.get("entries")
+
+    classroom = owned_classroom(data.get("class_id"), current_user.id)
+    if not classroom:
+        return jsonify({"error": "Invalid class"}), 404
+    if not isinstance(rows, list) or not rows:
+        return jsonify({"error": "entries must be a non-empty list"}), 400
+
+    replace = bool(data.get("replace"))
+    entries, errors = plan_week(classroom, rows, current_user.name, replace=replace)
+    if errors:
+        return jsonify({"error": "timetable not saved", "conflicts": errors}), 409
+
+    save_week(classroom, entries, replace=replace)
+
+    return jsonify({"message": "Timetable saved", "created": len(entries)}), 201
+
+
 # =========================================================
 # TEACHER: VIEW CLASS TIMETABLE
 # =========================================================
@@ -103,8 +99,12 @@ def teacher_view_timetable(class_id):
 @teacher_required
 def delete_timetable(id):
     entry = TimetableEntry.query.get_or_404(id)
+    class_id = entry.class_id
     db.session.delete(entry)
+    bump_timetable_version(class_id)
     db.session.commit()
+    timetable_index.invalidate_class(class_id)
+    grid_cache.invalidate_class(class_id)
     return jsonify({"message": "Deleted successfully"})
 
 
@@ -114,42 +114,11 @@ def delete_timetable(id):
 @timetable_api.get("/student/grid")
 @student_required
 def student_timetable_grid():
-    from collections import defaultdict
-
-    days = ["Monday","Tuesday","Wednesday","Thursday","Friday","Saturday"]
-    periods = range(1, 9)
-
-    # student ke classes
-    class_ids = (
-        db.session.query(ClassMember.class_id)
-        .filter_by(student_id=current_user.id)
-        .all()
-    )
-    class_ids = [c[0] for c in class_ids]
-
-    entries = TimetableEntry.query.filter(
-        TimetableEntry.class_id.in_(class_ids)
-    ).all()
-
-    # grid structure
-    grid = {
-        day: {p: {"subject": None, "teacher": None} for p in periods}
-        for day in days
-    }
-
-    period_times = {}
-
-    for e in entries:
-        grid[e.day][e.period] = {
-            "subject": e.subject,
-            "teacher": e.teacher_name
-        }
-
-        # period timing store (once is enough)
-        if e.period not in period_times:
-            period_times[e.period] = f"{e.start_time.strftime('%I:%M %p')} - {e.end_time.strftime('%I:%M %p')}"
-
-    return jsonify({
-        "period_times": period_times,
-        "grid": grid
-    })
+    # rendered once per distinct class set, see utils/timetable_utils.py
+    etag, body = grid_cache.grid(grid_cache.class_versions(current_user.id))
+
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True      # always revalidate, usually a 304
+    return response.make_conditional(request)
@@ -3,6 +3,7 @@
 # ===============================
 
 from flask import Flask, render_template, redirect, url_for
+import click
 from config import Config
 import os
 
@@ -10,7 +11,7 @@ import os
 # DATABASE + LOGIN
 # -----------------------------
 from utils.auth_utils import (
-    db, login_manager,
+    db, login_manager, user_cache,
     login_user_fn, logout_user_fn, register_user_fn,
     teacher_required, student_required
 )
@@ -19,6 +20,8 @@ from utils.auth_utils import (
 # REGISTER MODELS (ONCE)
 # -----------------------------
 import models.classroom_models
+import models.job_models
+import models.whiteboard_models
 
 # -----------------------------
 # API BLUEPRINTS
@@ -31,6 +34,19 @@ from api.dashboard_api import dashboard_api
 from api.emotions_api import emotions_api
 from api.classes_api import classes_api
 from api.live_session_api import live_session_api
+from api.jobs_api import jobs_api
+
+from utils.attendance_buffer import attendance_buffer
+from utils.db_migrations import upgrade, explain_hot_queries
+from utils.db_utils import configure_engine
+from utils.metrics import metrics
+from utils.timetable_utils import grid_cache
+from utils.upload_store import upload_store, resumable_uploads
+from utils.job_queue import job_queue, run_worker_processes
+from utils.attendance_rollup import rebuild as rebuild_rollups
+from utils.suggestion_engine import suggestion_engine
+from utils.assets import assets, build as build_assets
+import utils.job_tasks  # noqa: F401  (registers the job kinds)
 
 
 def create_app():
@@ -40,9 +56,42 @@ def create_app():
     os.makedirs("instance", exist_ok=True)
 
     db.init_app(app)
+    configure_engine(app)
     login_manager.init_app(app)
     login_manager.login_view = "login"
 
+    # write-behind flusher for live session join/leave
+    attendance_buffer.init_app(app)
+
+    # background jobs (in-process workers start with the first request)
+    job_queue.init_app(app)
+
+    # per-request latency / SQL metrics (/debug/metrics)
+    metrics.init_app(app)
+    metrics.register_gauge(
+        "smart_user_cache", "Flask-Login user cache hits/misses/invalidations/size",
+        user_cache.counters
+    )
+    metrics.register_gauge(
+        "smart_timetable_grid_cache", "Student timetable grid cache hits/misses/size",
+        grid_cache.counters
+    )
+    upload_store.init_app(app)
+    metrics.register_gauge(
+        "smart_upload_store", "Assignment uploads stored/deduplicated and bytes saved",
+        upload_store.counters, metric_type="counter"
+    )
+    metrics.register_gauge(
+        "smart_jobs", "Background jobs by status", job_queue.counts
+    )
+    metrics.register_gauge(
+        "smart_suggestion_cache", "At-risk class matrices served from cache / reloaded",
+        suggestion_engine.counters
+    )
+
+    # fingerprinted css/js (asset_url() in templates, /assets/<hashed name>)
+    assets.init_app(app)
+
     # -----------------------------
     # REGISTER BLUEPRINTS
     # -----------------------------
@@ -54,6 +103,7 @@ def create_app():
     app.register_blueprint(classes_api, url_prefix="/api/classes")
     app.register_blueprint(timetable_api, url_prefix="/api/timetable")
     app.register_blueprint(live_session_api, url_prefix="/api/session")
+    app.register_blueprint(jobs_api, url_prefix="/api/jobs")
 
     # -----------------------------
     # MAIN ROUTES
@@ -106,6 +156,11 @@ def create_app():
     def teacher_classroom_detail_page(class_id):
         return render_template("teacher_classroom_detail.html", class_id=class_id)
 
+    @app.route("/teacher/reports")
+    @teacher_required
+    def teacher_reports_page():
+        return render_template("reports.html")
+
     # -----------------------------
     # STUDENT ROUTES
     # -----------------------------
@@ -144,6 +199,7 @@ def create_app():
     # -----------------------------
     @app.route("/session/<string:session_link>")
     def live_session_page(session_link):
+        from flask_login import current_user
         from models.classroom_models import LiveSession, Classroom
 
         session_obj = LiveSession.query.filter_by(session_link=session_link).first()
@@ -155,15 +211,69 @@ def create_app():
         return render_template(
             "live_session.html",
             session_obj=session_obj,
-            classroom=classroom
+            classroom=classroom,
+            # only the session's teacher draws on the shared board
+            board_owner=current_user.is_authenticated and current_user.id == session_obj.teacher_id,
+            # only students join/leave (the teacher's page would hit student_required)
+            is_student=current_user.is_authenticated and current_user.role == "student"
         )
 
 
     # -----------------------------
-    # CREATE TABLES
+    # CLI COMMANDS
+    # -----------------------------
+    @app.cli.command("db-upgrade")
+    def db_upgrade_command():
+        """Add missing columns and indexes to an existing database."""
+        upgrade(db.engine)
+        print("Database schema is up to date.")
+
+    @app.cli.command("db-explain")
+    def db_explain_command():
+        """Show the query plan of every hot lookup (fails on full scans)."""
+        failed = False
+        for name, plan, uses_index in explain_hot_queries(db.engine):
+            print(("OK   " if uses_index else "SCAN ") + name)
+            for line in plan:
+                print("       " + line)
+            failed = failed or not uses_index
+        if failed:
+            raise SystemExit(1)
+
+    @app.cli.command("uploads-sweep")
+    def uploads_sweep_command():
+        """Delete abandoned resumable uploads and orphaned temp files."""
+        removed = resumable_uploads.sweep()
+        print(f"Removed {removed} stale upload(s).")
+
+    @app.cli.command("attendance-rollup-rebuild")
+    @click.option("--class-id", type=int, default=None, help="Only this class.")
+    def attendance_rollup_rebuild_command(class_id):
+        """Recompute attendance rollups from the attendance history."""
+        classes, rows = rebuild_rollups(db.engine, class_id)
+        print(f"Rebuilt {rows} rollup row(s) for {classes} class(es).")
+
+    @app.cli.command("assets-build")
+    @click.option("--prune", is_flag=True, help="Delete outputs of earlier builds.")
+    def assets_build_command(prune):
+        """Fingerprint and precompress static css/js into static/dist."""
+        manifest = build_assets(app.static_folder, assets.out_dir, prune=prune)
+        assets.load()
+        for source, hashed in sorted(manifest.items()):
+            print(f"{source} -> {hashed}")
+
+    @app.cli.command("jobs-worker")
+    @click.option("--processes", default=1, show_default=True, help="Worker processes to run.")
+    def jobs_worker_command(processes):
+        """Run background job workers until interrupted."""
+        run_worker_processes(processes)
+
+    # -----------------------------
+    # CREATE TABLES + MIGRATE
     # -----------------------------
     with app.app_context():
         db.create_all()
+        upgrade(db.engine)
 
     return app
 
@@ -9,12 +9,19 @@ class Assignment(db.Model):
     description = db.Column(db.Text, nullable=True)
     subject = db.Column(db.String(200), nullable=True)
     teacher_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    class_id = db.Column(db.Integer, db.ForeignKey('classroom.id'), nullable=True)
     due_date = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    file_url = db.Column(db.String(400), nullable=True)  # optional attached file
+    file_url = db.Column(db.String(400), nullable=True)  # optional attached file(s), comma separated
 
     teacher = db.relationship("User", backref=db.backref("assignments", lazy="dynamic"))
 
+    __table_args__ = (
+        # student feed: one ordered keyset walk per class (due_date DESC, id DESC,
+        # then due_date IS NULL by id DESC), see api/assignments_api.py
+        db.Index("ix_assignment_class_due", "class_id", "due_date", "id"),
+    )
+
 class AssignmentSubmission(db.Model):
     __tablename__ = "assignment_submission"
     id = db.Column(db.Integer, primary_key=True)
@@ -27,3 +34,10 @@ class AssignmentSubmission(db.Model):
 
     assignment = db.relationship("Assignment", backref=db.backref("submissions", lazy="dynamic"))
     student = db.relationship("User")
+
+    __table_args__ = (
+        # submission state of one student for a page of assignments
+        db.Index("ix_assignment_submission_student", "student_id", "assignment_id"),
+        # submissions of a class's assignments (utils/suggestion_engine.py)
+        db.Index("ix_assignment_submission_assignment", "assignment_id", "student_id", "submitted_at"),
+    )
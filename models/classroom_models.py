@@ -10,9 +10,15 @@ class Classroom(db.Model):
     subject = db.Column(db.String(200), nullable=True)
     classroom_code = db.Column(db.String(10), unique=True, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # bumped with every timetable write; part of the student grid cache key
+    timetable_version = db.Column(db.Integer, nullable=True)
 
     teacher = db.relationship("User", backref=db.backref("classrooms", lazy="dynamic"))
 
+    __table_args__ = (
+        db.Index("ix_classroom_teacher", "teacher_id"),
+    )
+
 
 class ClassMember(db.Model):
     __tablename__ = "class_member"
@@ -24,6 +30,13 @@ class ClassMember(db.Model):
     classroom = db.relationship("Classroom", backref=db.backref("members", lazy="dynamic"))
     student = db.relationship("User", backref=db.backref("classes_joined", lazy="dynamic"))
 
+    __table_args__ = (
+        # join_class / roster lookups; a student joins a class once
+        db.Index("uq_class_member_class_student", "class_id", "student_id", unique=True),
+        # "my classes" lookups by student
+        db.Index("ix_class_member_student", "student_id", "class_id"),
+    )
+
 
 class Session(db.Model):
     __tablename__ = "session"
@@ -51,6 +64,11 @@ class TimetableEntry(db.Model):
     subject = db.Column(db.String(100), nullable=False)
     teacher_name = db.Column(db.String(100), nullable=False)
 
+    __table_args__ = (
+        # conflict check: class_id IN (...) AND day = ? AND start/end overlap
+        db.Index("ix_timetable_entry_slot", "class_id", "day", "start_time", "end_time"),
+    )
+
 # ===============================
 # LIVE SESSION MODELS (PHASE-1)
 # ===============================
@@ -76,6 +94,11 @@ class LiveSession(db.Model):
         cascade="all, delete-orphan"
     )
 
+    __table_args__ = (
+        db.Index("ix_live_sessions_class", "class_id", "started_at"),
+        db.Index("ix_live_sessions_teacher_open", "teacher_id", "ended_at"),
+    )
+
     def end_session(self):
         self.ended_at = datetime.utcnow()
         self.duration = int((self.ended_at - self.started_at).total_seconds())
@@ -99,6 +122,38 @@ class SessionAttendance(db.Model):
 
     duration = db.Column(db.Integer, nullable=True)
 
+    # added to the class attendance rollup (utils/attendance_rollup.py)
+    rollup_counted = db.Column(db.Boolean, nullable=True)
+
+    __table_args__ = (
+        # one attendance row per student per session; also serves
+        # (session_id, student_id, left_at) lookups through its prefix
+        db.Index("uq_session_attendance_session_student", "session_id", "student_id", unique=True),
+        # open attendances of a session (left_at IS NULL)
+        db.Index("ix_session_attendance_open", "session_id", "left_at"),
+        # attendance history of a student
+        db.Index("ix_session_attendance_student", "student_id"),
+    )
+
     def leave(self):
         self.left_at = datetime.utcnow()
         self.duration = int((self.left_at - self.joined_at).total_seconds())
+
+
+class AttendanceRollup(db.Model):
+    """Running attendance totals of one student in one class (utils/attendance_rollup.py)."""
+    __tablename__ = "attendance_rollup"
+
+    id = db.Column(db.Integer, primary_key=True)
+    class_id = db.Column(db.Integer, db.ForeignKey("classroom.id"), nullable=False)
+    student_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+
+    sessions_held = db.Column(db.Integer, nullable=False, default=0)
+    sessions_attended = db.Column(db.Integer, nullable=False, default=0)
+    total_seconds = db.Column(db.Integer, nullable=False, default=0)
+    last_seen_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index("uq_attendance_rollup_class_student", "class_id", "student_id", unique=True),
+        db.Index("ix_attendance_rollup_student", "student_id"),
+    )
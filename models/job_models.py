@@ -0,0 +1,44 @@
+# models/job_models.py
+from datetime import datetime
+from utils.auth_utils import db
+
+
+# ===============================
+# BACKGROUND JOBS (utils/job_queue.py)
+# ===============================
+
+class Job(db.Model):
+    __tablename__ = "job"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    kind = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=True)     # JSON, cleared once the job is finished
+    owner_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
+
+    # queued -> running -> done | failed (| cancelled)
+    status = db.Column(db.String(20), nullable=False, default="queued")
+    priority = db.Column(db.Integer, nullable=False, default=0)    # higher runs first
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+
+    progress = db.Column(db.Float, nullable=False, default=0.0)    # 0..1
+    message = db.Column(db.String(255), nullable=True)
+    result = db.Column(db.Text, nullable=True)      # JSON
+    error = db.Column(db.Text, nullable=True)
+
+    worker = db.Column(db.String(100), nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # claim: status = 'queued' AND run_after <= now ORDER BY priority DESC, id
+        db.Index("ix_job_claim", "status", "priority", "run_after", "id"),
+        # "my jobs"
+        db.Index("ix_job_owner", "owner_id", "created_at"),
+    )
@@ -0,0 +1,48 @@
+# models/whiteboard_models.py
+from datetime import datetime
+from utils.auth_utils import db
+
+
+# ===============================
+# SHARED WHITEBOARD (utils/whiteboard.py)
+# ===============================
+
+class WhiteboardStroke(db.Model):
+    """One entry of a live session's append-only board log."""
+    __tablename__ = "whiteboard_stroke"
+
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey("live_sessions.id"), nullable=False)
+    seq = db.Column(db.Integer, nullable=False)     # 1, 2, 3 ... per session
+
+    author_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
+    kind = db.Column(db.String(10), nullable=False, default="stroke")   # stroke | clear
+    tool = db.Column(db.String(10), nullable=True)      # pen | eraser
+    color = db.Column(db.String(7), nullable=True)      # #rrggbb
+    width = db.Column(db.Integer, nullable=True)
+    points = db.Column(db.LargeBinary, nullable=True)   # zigzag varint deltas, see utils/whiteboard.py
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # "everything since seq N" and seq allocation
+        db.Index("uq_whiteboard_stroke_session_seq", "session_id", "seq", unique=True),
+    )
+
+
+class WhiteboardSnapshot(db.Model):
+    """Visible strokes of a board up to `seq` (everything after the last clear)."""
+    __tablename__ = "whiteboard_snapshot"
+
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey("live_sessions.id"), nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    strokes = db.Column(db.Integer, nullable=False, default=0)
+    data = db.Column(db.Text, nullable=False)     # JSON list of wire strokes
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # only the latest snapshot of a session is kept
+        db.Index("uq_whiteboard_snapshot_session", "session_id", unique=True),
+    )
@@ -2,15 +2,17 @@
 // LIVE SESSION – PHASE 1 STEP 4
 // ===============================
 
-// ---------- AUTO JOIN ----------
-fetch(`/api/session/join/${SESSION_LINK}`, {
-    method: "POST"
-})
-.then(res => res.json())
-.then(data => {
-    console.log("Joined session:", data);
-})
-.catch(err => console.error(err));
+// ---------- AUTO JOIN (students only) ----------
+if (IS_STUDENT) {
+    fetch(`/api/session/join/${SESSION_LINK}`, {
+        method: "POST"
+    })
+    .then(res => res.json())
+    .then(data => {
+        console.log("Joined session:", data);
+    })
+    .catch(err => console.error(err));
+}
 
 
 // ---------- SESSION TIMER ----------
@@ -49,12 +51,14 @@ if (leaveBtn) {
     leaveBtn.onclick = leaveSession;
 }
 
-// browser/tab closed → auto leave
-window.addEventListener("beforeunload", () => {
-    navigator.sendBeacon(
-        `/api/session/leave/${SESSION_LINK}`
-    );
-});
+// browser/tab closed → auto leave (students only)
+if (IS_STUDENT) {
+    window.addEventListener("beforeunload", () => {
+        navigator.sendBeacon(
+            `/api/session/leave/${SESSION_LINK}`
+        );
+    });
+}
 
 
 // ---------- TEACHER: END SESSION ----------
@@ -71,3 +75,48 @@ if (endBtn) {
         });
     };
 }
+
+
+// ---------- TEACHER: LIVE PRESENCE (SSE) ----------
+const presenceList = document.getElementById("presenceList");
+if (presenceList && window.EventSource) {
+    const presenceCount = document.getElementById("presenceCount");
+    const roster = new Map();
+    let lastSeq = 0;
+
+    function renderRoster() {
+        presenceList.innerHTML = "";
+        roster.forEach(s => {
+            const li = document.createElement("li");
+            li.className = "list-group-item";
+            li.dataset.studentId = s.id;
+            li.innerText = s.name;
+            presenceList.appendChild(li);
+        });
+        presenceCount.innerText = roster.size;
+    }
+
+    const stream = new EventSource(`/api/session/presence/${SESSION_LINK}/stream`);
+
+    stream.onmessage = (e) => {
+        const ev = JSON.parse(e.data);
+
+        if (ev.type === "snapshot") {
+            roster.clear();
+            ev.students.forEach(s => roster.set(s.id, s));
+            lastSeq = ev.seq;
+        } else if (ev.seq <= lastSeq) {
+            return;  // already part of the snapshot
+        } else if (ev.type === "joined") {
+            roster.set(ev.student.id, ev.student);
+            lastSeq = ev.seq;
+        } else if (ev.type === "left") {
+            roster.delete(ev.student_id);
+            lastSeq = ev.seq;
+        } else if (ev.type === "ended") {
+            stream.close();
+            roster.clear();
+        }
+        renderRoster();
+    };
+}
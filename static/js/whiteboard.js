@@ -1,69 +1,305 @@
+// ===============================
+// SHARED WHITEBOARD
+// ===============================
+// The teacher's strokes go to /api/session/whiteboard/<link>; every client
+// polls "since seq N" and draws what it gets (a late joiner first gets one
+// snapshot of the visible board). Coordinates are in the board's logical
+// size so all screens agree; points are sent as zigzag varint deltas,
+// base64 encoded (same format as utils/whiteboard.py).
+//
+// Pointer moves are coalesced to one point per animation frame and each
+// piece is simplified (Ramer-Douglas-Peucker) before it is sent.
+
 const canvas = document.getElementById("whiteboard");
 const ctx = canvas.getContext("2d");
 
+const BOARD_W = 1600;
+const BOARD_H = 520;
+const BOARD_BG = "#dff5df"; // light green
+const ERASER_WIDTH = 20;
+const SEND_MS = 200;        // a stroke in progress is sent in pieces this often
+const POLL_MS = 1000;
+const MAX_BATCH = 100;
+const SIMPLIFY_TOLERANCE = 1.5;   // board units, same as the server
+
+const CAN_DRAW = typeof WHITEBOARD_CAN_DRAW !== "undefined" && WHITEBOARD_CAN_DRAW;
+const BOARD_URL = `/api/session/whiteboard/${SESSION_LINK}`;
+
 let drawing = false;
 let mode = "pen";
+let current = null;     // stroke being drawn: {tool, color, width, points, sent}
+let pieceTimer = null;
+let pendingPos = null;  // latest pointer position, drawn on the next frame
+let frameQueued = false;
+let outbox = [];        // log entries waiting to be sent
+let sending = false;
+let lastSeq = 0;
 
-canvas.width = canvas.offsetWidth;
-canvas.height = 400;
+canvas.width = BOARD_W;
+canvas.height = BOARD_H;
+clearBoard();
 
-// default board background
-ctx.fillStyle = "#dff5df"; // light green
-ctx.fillRect(0, 0, canvas.width, canvas.height);
 
-function getPos(e) {
-  const rect = canvas.getBoundingClientRect();
-  return {
-    x: (e.clientX || e.touches[0].clientX) - rect.left,
-    y: (e.clientY || e.touches[0].clientY) - rect.top
-  };
+// ---------- POINT ENCODING ----------
+function encodePoints(points) {
+  const bytes = [];
+  let px = 0, py = 0;
+  for (const [x, y] of points) {
+    for (const d of [x - px, y - py]) {
+      let z = d >= 0 ? d * 2 : -d * 2 - 1;
+      while (z >= 0x80) {
+        bytes.push((z & 0x7f) | 0x80);
+        z = Math.floor(z / 128);
+      }
+      bytes.push(z);
+    }
+    px = x;
+    py = y;
+  }
+  return btoa(String.fromCharCode(...bytes));
+}
+
+function decodePoints(b64) {
+  const raw = atob(b64);
+  const values = [];
+  let z = 0, shift = 0;
+  for (let i = 0; i < raw.length; i++) {
+    const b = raw.charCodeAt(i);
+    z += (b & 0x7f) * 2 ** shift;
+    if (b & 0x80) {
+      shift += 7;
+      continue;
+    }
+    values.push(z % 2 ? -(z + 1) / 2 : z / 2);
+    z = 0;
+    shift = 0;
+  }
+  const points = [];
+  let x = 0, y = 0;
+  for (let i = 0; i + 1 < values.length; i += 2) {
+    x += values[i];
+    y += values[i + 1];
+    points.push([x, y]);
+  }
+  return points;
 }
 
-canvas.addEventListener("mousedown", start);
-canvas.addEventListener("mousemove", draw);
-canvas.addEventListener("mouseup", stop);
-canvas.addEventListener("mouseleave", stop);
 
-canvas.addEventListener("touchstart", start);
-canvas.addEventListener("touchmove", draw);
-canvas.addEventListener("touchend", stop);
+// ---------- SIMPLIFICATION (RAMER-DOUGLAS-PEUCKER) ----------
+function simplify(points, tolerance = SIMPLIFY_TOLERANCE) {
+  const n = points.length;
+  if (n < 3) return points.slice();
 
-function start(e) {
-  drawing = true;
-  ctx.beginPath();
-  const p = getPos(e);
-  ctx.moveTo(p.x, p.y);
+  const keep = new Uint8Array(n);
+  keep[0] = keep[n - 1] = 1;
+  const limit = tolerance * tolerance;
+  const stack = [[0, n - 1]];
+  while (stack.length) {
+    const [a, b] = stack.pop();
+    const [ax, ay] = points[a];
+    const dx = points[b][0] - ax, dy = points[b][1] - ay;
+    const norm = dx * dx + dy * dy;
+    let worst = -1, index = -1;
+    for (let i = a + 1; i < b; i++) {
+      const px = points[i][0] - ax, py = points[i][1] - ay;
+      let d2;
+      if (norm) {
+        const cross = px * dy - py * dx;
+        d2 = cross * cross / norm;
+      } else {
+        d2 = px * px + py * py;
+      }
+      if (d2 > worst) {
+        worst = d2;
+        index = i;
+      }
+    }
+    if (worst > limit) {
+      keep[index] = 1;
+      stack.push([a, index], [index, b]);
+    }
+  }
+  return points.filter((_, i) => keep[i]);
 }
 
-function draw(e) {
-  if (!drawing) return;
-  const p = getPos(e);
 
+// ---------- RENDERING ----------
+function clearBoard() {
+  ctx.fillStyle = BOARD_BG;
+  ctx.fillRect(0, 0, canvas.width, canvas.height);
+}
+
+function setStyle(s) {
   ctx.lineCap = "round";
   ctx.lineJoin = "round";
+  ctx.strokeStyle = s.tool === "eraser" ? BOARD_BG : s.color;
+  ctx.lineWidth = s.tool === "eraser" ? ERASER_WIDTH : s.width;
+}
+
+function drawStroke(s, points) {
+  if (!points.length) return;
+  setStyle(s);
+  ctx.beginPath();
+  ctx.moveTo(points[0][0], points[0][1]);
+  if (points.length === 1) ctx.lineTo(points[0][0], points[0][1]);   // a dot
+  for (let i = 1; i < points.length; i++) ctx.lineTo(points[i][0], points[i][1]);
+  ctx.stroke();
+}
+
+function applyEntry(entry) {
+  if (entry.kind === "clear") clearBoard();
+  else drawStroke(entry, decodePoints(entry.points));
+}
+
+
+// ---------- SYNC: RECEIVE ----------
+async function pull() {
+  const res = await fetch(`${BOARD_URL}?since=${lastSeq}`);
+  if (!res.ok) return false;
+  const data = await res.json();
+
+  if (data.snapshot) {
+    clearBoard();
+    data.snapshot.strokes.forEach(applyEntry);
+  }
+  data.strokes.forEach(applyEntry);
+  lastSeq = data.seq;
+  return data.more;
+}
 
-  if (mode === "pen") {
-    ctx.strokeStyle = document.getElementById("penColor").value;
-    ctx.lineWidth = document.getElementById("penSize").value;
-  } else {
-    ctx.strokeStyle = "#dff5df";
-    ctx.lineWidth = 20;
+async function syncLoop() {
+  for (;;) {
+    try {
+      if (await pull()) continue;     // more pages waiting
+    } catch (err) {
+      console.error(err);
+    }
+    await new Promise(r => setTimeout(r, POLL_MS));
   }
+}
+
+syncLoop();
+
+
+// ---------- SYNC: SEND (TEACHER) ----------
+function flush() {
+  if (sending || !outbox.length) return;
+  sending = true;
+  const batch = outbox.splice(0, MAX_BATCH);
+
+  fetch(BOARD_URL, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ strokes: batch })
+  })
+  .then(res => {
+    if (res.status >= 500) outbox = batch.concat(outbox);   // retry later
+  })
+  .catch(err => {
+    console.error(err);
+    outbox = batch.concat(outbox);
+  })
+  .finally(() => {
+    sending = false;
+    if (outbox.length) setTimeout(flush, SEND_MS);
+  });
+}
+
+function sendPiece(final) {
+  if (!current) return;
+  const pts = current.points;
+  // a piece needs a new segment, or is a dot that was never sent
+  if (pts.length > 1 || (final && !current.sent && pts.length)) {
+    outbox.push({
+      kind: "stroke",
+      tool: current.tool,
+      color: current.color,
+      width: current.width,
+      points: encodePoints(simplify(pts))
+    });
+    current.sent = true;
+    // the next piece continues from where this one ended
+    current.points = [pts[pts.length - 1]];
+    flush();
+  }
+}
+
+
+// ---------- LOCAL INPUT (TEACHER) ----------
+function getPos(e) {
+  const rect = canvas.getBoundingClientRect();
+  const t = e.touches ? e.touches[0] : e;
+  return [
+    Math.round((t.clientX - rect.left) * BOARD_W / rect.width),
+    Math.round((t.clientY - rect.top) * BOARD_H / rect.height)
+  ];
+}
+
+function start(e) {
+  e.preventDefault();
+  drawing = true;
+  current = {
+    tool: mode,
+    color: document.getElementById("penColor").value,
+    width: Number(document.getElementById("penSize").value),
+    points: [getPos(e)],
+    sent: false
+  };
+  pieceTimer = setInterval(() => sendPiece(false), SEND_MS);
+}
+
+function draw(e) {
+  if (!drawing) return;
+  e.preventDefault();
+  // many moves per frame: keep the latest, draw once per frame
+  pendingPos = getPos(e);
+  if (!frameQueued) {
+    frameQueued = true;
+    requestAnimationFrame(drawFrame);
+  }
+}
 
-  ctx.lineTo(p.x, p.y);
+function drawFrame() {
+  frameQueued = false;
+  if (!pendingPos || !current) return;
+  const p = pendingPos;
+  const last = current.points[current.points.length - 1];
+  pendingPos = null;
+  if (p[0] === last[0] && p[1] === last[1]) return;
+
+  setStyle(current);
+  ctx.beginPath();
+  ctx.moveTo(last[0], last[1]);
+  ctx.lineTo(p[0], p[1]);
   ctx.stroke();
+  current.points.push(p);
 }
 
 function stop() {
+  if (!drawing) return;
+  drawFrame();      // the last position of the stroke
   drawing = false;
-  ctx.closePath();
+  clearInterval(pieceTimer);
+  sendPiece(true);
+  current = null;
 }
 
-// Toolbar buttons
-document.getElementById("penBtn").onclick = () => mode = "pen";
-document.getElementById("eraserBtn").onclick = () => mode = "eraser";
-document.getElementById("clearBtn").onclick = () => {
-  ctx.clearRect(0, 0, canvas.width, canvas.height);
-  ctx.fillStyle = "#dff5df";
-  ctx.fillRect(0, 0, canvas.width, canvas.height);
-};
+if (CAN_DRAW) {
+  canvas.addEventListener("mousedown", start);
+  canvas.addEventListener("mousemove", draw);
+  canvas.addEventListener("mouseup", stop);
+  canvas.addEventListener("mouseleave", stop);
+
+  canvas.addEventListener("touchstart", start, { passive: false });
+  canvas.addEventListener("touchmove", draw, { passive: false });
+  canvas.addEventListener("touchend", stop);
+
+  // Toolbar buttons
+  document.getElementById("penBtn").onclick = () => mode = "pen";
+  document.getElementById("eraserBtn").onclick = () => mode = "eraser";
+  document.getElementById("clearBtn").onclick = () => {
+    clearBoard();
+    outbox.push({ kind: "clear" });
+    flush();
+  };
+}
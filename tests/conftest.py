@@ -0,0 +1,76 @@
+# tests/conftest.py
+# ===============================
+# TEST APP ON A THROWAWAY DATABASE
+# ===============================
+#
+# Config is pointed at a temp directory before app.py is imported (it builds
+# the app at import time), so tests never touch instance/smart.db.
+
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+
+TMP_DIR = tempfile.mkdtemp(prefix="smart-tests-")
+Config.SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(TMP_DIR, "test.db")
+Config.UPLOAD_STORE_DIR = os.path.join(TMP_DIR, "uploads")
+Config.FACE_STORE_DIR = os.path.join(TMP_DIR, "face_store")
+Config.JOB_WORKER_THREADS = 0
+Config.TESTING = True
+
+from app import app as flask_app  # noqa: E402
+from utils.attendance_buffer import attendance_buffer  # noqa: E402
+from utils.auth_utils import User, db, user_cache  # noqa: E402
+from utils.suggestion_engine import suggestion_engine  # noqa: E402
+
+PASSWORD = "pw"
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def app():
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+    user_cache.clear()
+    suggestion_engine.clear()
+    # session ids are reused by the next test's fresh database
+    with attendance_buffer.lock:
+        attendance_buffer.sessions.clear()
+        attendance_buffer.refs.clear()
+        attendance_buffer.dirty.clear()
+    yield flask_app
+
+
+@pytest.fixture
+def make_user(app):
+    def make(email, role="student"):
+        with app.app_context():
+            user = User(
+                email=email, name=email.split("@")[0], role=role,
+                password=generate_password_hash(PASSWORD, method="pbkdf2:sha256:1000"),
+            )
+            db.session.add(user)
+            db.session.commit()
+            return user.id
+    return make
+
+
+@pytest.fixture
+def login(app):
+    def client(email):
+        c = app.test_client()
+        r = c.post("/login", data={"email": email, "password": PASSWORD})
+        assert r.status_code == 302
+        return c
+    return client
@@ -0,0 +1,37 @@
+# The student feed pages through every class's assignments, dated ones
+# newest first and undated ones last, without skipping or repeating rows.
+
+import random
+
+
+def test_feed_pages_merge_classes_and_end_with_undated(make_user, login):
+    make_user("t@x.com", "teacher")
+    make_user("s@x.com")
+    teacher, student = login("t@x.com"), login("s@x.com")
+
+    rnd = random.Random(7)
+    dated, undated = [], []
+    for c in range(3):
+        created = teacher.post("/api/classes/create", json={"class_name": f"C{c}", "subject": "Math"}).get_json()
+        student.post("/api/classes/join-class", json={"classroom_code": created["classroom_code"]})
+        for n in range(7):
+            due = rnd.choice([None, "2030-01-01T00:00", f"2030-0{rnd.randint(1, 9)}-1{rnd.randint(0, 9)}T00:00"])
+            r = teacher.post("/api/assignments/teacher/create", data={
+                "class_id": created["class_id"], "title": f"{c}-{n}", "due_date": due or "",
+            })
+            (undated if due is None else dated).append((due, r.get_json()["assignment_id"]))
+    expected = [i for _, i in sorted(dated, reverse=True)] + sorted((i for _, i in undated), reverse=True)
+
+    seen, cursor = [], None
+    while True:
+        args = {"limit": 4, "cursor": cursor} if cursor else {"limit": 4}
+        body = student.get("/api/assignments/student/all", query_string=args).get_json()
+        assert len(body["items"]) <= 4
+        seen += [item["id"] for item in body["items"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+
+    assert seen == expected
+    pending = student.get("/api/assignments/student/all", query_string={"status": "pending", "limit": 100})
+    assert [item["id"] for item in pending.get_json()["items"]] == expected
@@ -0,0 +1,30 @@
+# Each worker process has its own AttendanceBuffer; a join served by one
+# worker must be visible to a leave served by another.
+
+from models.classroom_models import LiveSession, SessionAttendance
+from utils.attendance_buffer import AttendanceBuffer, attendance_buffer
+from utils.auth_utils import db
+
+
+def test_leave_finds_a_join_made_by_another_worker(app, make_user, login):
+    make_user("t@x.com", "teacher")
+    student_id = make_user("s@x.com")
+    teacher, student = login("t@x.com"), login("s@x.com")
+    created = teacher.post("/api/classes/create", json={"class_name": "Math", "subject": "Math"}).get_json()
+    student.post("/api/classes/join-class", json={"classroom_code": created["classroom_code"]})
+    token = teacher.post(f"/api/classes/teacher/{created['class_id']}/generate_session").get_json()["session_token"]
+
+    other = AttendanceBuffer()      # another worker, no flush thread
+    with app.app_context():
+        session_id = LiveSession.query.filter_by(session_link=token).one().id
+        assert other.open_students(session_id) == {}    # loaded before the join
+
+    assert student.post(f"/api/session/join/{token}").status_code == 201
+    with app.app_context():
+        attendance_buffer.flush()
+
+        assert other.join(session_id, student_id)[0] is False
+        assert other.leave(session_id, student_id) is not None
+        other.flush()
+        row = SessionAttendance.query.filter_by(session_id=session_id, student_id=student_id).one()
+        assert row.left_at is not None
@@ -0,0 +1,9 @@
+def test_csv_report_content_type(make_user, login):
+    make_user("t@x.com", "teacher")
+    teacher = login("t@x.com")
+    class_id = teacher.post("/api/classes/create", json={"class_name": "Math", "subject": "Math"}).get_json()["class_id"]
+
+    r = teacher.get(f"/api/attendance/class/{class_id}/report.csv")
+
+    assert r.status_code == 200
+    assert r.headers["Content-Type"] == "text/csv; charset=utf-8"
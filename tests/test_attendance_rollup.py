@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.classroom_models import AttendanceRollup, LiveSession, SessionAttendance
+from utils.attendance_buffer import attendance_buffer
+from utils.attendance_rollup import rebuild, record_flushed, record_session_end
+from utils.auth_utils import db
+
+
+@pytest.fixture
+def live_class(make_user, login):
+    make_user("t@x.com", "teacher")
+    students = [make_user(f"s{i}@x.com") for i in range(2)]
+    teacher = login("t@x.com")
+    clients = [login(f"s{i}@x.com") for i in range(2)]
+
+    created = teacher.post("/api/classes/create", json={"class_name": "Math", "subject": "Math"}).get_json()
+    for c in clients:
+        c.post("/api/classes/join-class", json={"classroom_code": created["classroom_code"]})
+    token = teacher.post(f"/api/classes/teacher/{created['class_id']}/generate_session").get_json()["session_token"]
+    for c in clients:
+        assert c.post(f"/api/session/join/{token}").status_code == 201
+    return teacher, clients, token, students
+
+
+def rollups(app):
+    with app.app_context():
+        return {
+            r.student_id: (r.sessions_held, r.sessions_attended)
+            for r in db.session.query(AttendanceRollup)
+        }
+
+
+def test_session_end_counts_each_attendance_once(app, live_class):
+    teacher, clients, token, students = live_class
+    clients[0].post(f"/api/session/leave/{token}")
+    with app.app_context():
+        attendance_buffer.flush()
+        session = LiveSession.query.filter_by(session_link=token).one()
+        # a flush that ran alongside the end sees the same closed leave
+        record_flushed(db.session.connection(), [session.id])
+        db.session.commit()
+
+    assert teacher.post(f"/api/session/end/{token}").status_code == 200
+    assert teacher.post(f"/api/session/end/{token}").get_json()["message"] == "Session already ended"
+
+    with app.app_context():
+        session = LiveSession.query.filter_by(session_link=token).one()
+        record_session_end(db.session.connection(), session.id, session.class_id, session.ended_at)
+        record_flushed(db.session.connection(), [session.id])
+        db.session.rollback()
+
+    assert rollups(app) == {students[0]: (1, 1), students[1]: (1, 1)}
+    with app.app_context():
+        rebuild(db.engine)
+    assert rollups(app) == {students[0]: (1, 1), students[1]: (1, 1)}
+
+
+def test_attendance_flushed_after_the_end_is_counted(app, live_class, make_user):
+    teacher, clients, token, students = live_class
+    late = make_user("late@x.com")
+    teacher.post(f"/api/session/end/{token}")
+
+    # another worker's buffer reaches the database after the end
+    with app.app_context():
+        session = LiveSession.query.filter_by(session_link=token).one()
+        db.session.add(SessionAttendance(
+            session_id=session.id, student_id=late,
+            joined_at=session.ended_at - timedelta(minutes=5), left_at=datetime.utcnow(),
+        ))
+        db.session.flush()
+        record_flushed(db.session.connection(), [session.id])
+        record_flushed(db.session.connection(), [session.id])
+        db.session.commit()
+
+    assert rollups(app)[late] == (1, 1)
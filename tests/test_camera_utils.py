@@ -0,0 +1,44 @@
+# The capture pipeline runs headless on SyntheticSource frames (no OpenCV).
+
+from utils.camera_utils import CameraCapture, LatestFrameBuffer, SyntheticSource
+
+
+def run_to_end(capture):
+    capture.start()
+    capture._thread.join(5)
+    assert not capture.running
+    return capture
+
+
+def test_buffer_drops_oldest_and_hands_out_the_newest():
+    buf = LatestFrameBuffer(capacity=2)
+    for n in range(5):
+        buf.put(n)
+    assert buf.dropped == 3             # overwritten while full
+
+    seq, _, frame = buf.get_latest(timeout=0)
+    assert (seq, frame) == (5, 4)
+    assert buf.dropped == 4             # the older one still buffered
+    assert buf.get_latest(timeout=0) is None
+
+
+def test_stride_skips_frames_before_they_are_buffered():
+    capture = run_to_end(CameraCapture(
+        SyntheticSource(width=8, height=6, fps=0, count=10), scale=1.0, stride=3, buffer_size=16
+    ))
+    assert capture.stats()["frames_read"] == 10
+    assert capture.stats()["frames_skipped"] == 6       # kept frames 0, 3, 6, 9
+
+    frame = capture.read(timeout=0)
+    assert frame[0, 0, 0] == 9
+    assert capture.stats()["frames_dropped"] == 3
+
+
+def test_consumer_gets_latest_frame_downscaled_then_stops():
+    capture = run_to_end(CameraCapture(
+        SyntheticSource(width=8, height=6, fps=0, count=5), scale=0.5, buffer_size=2
+    ))
+    frames = list(capture.frames(timeout=0))
+    assert [(seq, f[0, 0, 0]) for seq, _, f in frames] == [(5, 4)]
+    assert frames[0][2].shape == (3, 4, 3)
+    assert capture.stats()["frames_dropped"] == 4
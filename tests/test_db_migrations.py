@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from utils.auth_utils import db
+from utils.db_migrations import DuplicateRowsError, remove_duplicates, upgrade
+
+
+@pytest.fixture
+def old_db(tmp_path):
+    """A database from before the unique indexes, with a duplicated attendance."""
+    engine = create_engine("sqlite:///" + str(tmp_path / "old.db"))
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX uq_session_attendance_session_student"))
+        conn.execute(text(
+            "INSERT INTO session_attendance (id, session_id, student_id, joined_at, left_at, duration) "
+            "VALUES (1, 1, 1, '2025-01-01 09:00:00', NULL, NULL), "
+            "(2, 1, 1, '2025-01-01 09:00:05', '2025-01-01 10:00:00', 3595)"
+        ))
+    yield engine
+    engine.dispose()
+
+
+def test_upgrade_refuses_to_start_with_duplicates(old_db):
+    with pytest.raises(DuplicateRowsError, match="session_attendance: 1"):
+        upgrade(old_db)
+    with old_db.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM session_attendance")).scalar() == 2
+
+
+def test_dedupe_keeps_the_row_with_attendance_data(old_db):
+    with old_db.begin() as conn:
+        assert remove_duplicates(conn, dry_run=True) == {"session_attendance": [1]}
+        assert conn.execute(text("SELECT COUNT(*) FROM session_attendance")).scalar() == 2
+        remove_duplicates(conn)
+        assert conn.execute(text("SELECT id, duration FROM session_attendance")).all() == [(2, 3595)]
+
+    upgrade(old_db)
@@ -0,0 +1,60 @@
+# EmotionScheduler groups crops into micro-batches and routes every result
+# back to its crop and its session (real process pool, stub model).
+
+import time
+from concurrent.futures import wait
+
+import numpy as np
+import pytest
+
+from utils.emotion_utils import EMOTIONS, EmotionScheduler
+
+
+def settle(check, timeout=5):
+    # listeners run right after their future is resolved
+    deadline = time.monotonic() + timeout
+    while not check() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return check()
+
+
+def crop(value):
+    return np.full((48, 48), value, dtype=np.uint8)
+
+
+@pytest.fixture
+def scheduler():
+    s = EmotionScheduler("tests.emotion_model_stub:load", max_batch=4, max_wait_ms=200, workers=1)
+    yield s
+    s.shutdown()
+
+
+def test_crops_are_batched_up_to_max_batch(scheduler):
+    seen = []
+    scheduler.register_session("a", lambda key, result: seen.append((key, result["emotion"])))
+    futures = scheduler.submit_many("a", [crop(n % 7) for n in range(10)])
+    done, _ = wait(futures, timeout=30)
+    assert len(done) == 10
+
+    assert [f.result()["emotion"] for f in futures] == [EMOTIONS[n % 7] for n in range(10)]
+    assert futures[0].result()["confidence"] == pytest.approx(0.94)
+    assert settle(lambda: len(seen) == 10)
+    assert sorted(seen) == sorted(("a", EMOTIONS[n % 7]) for n in range(10))
+    assert scheduler.stats()["batches"] == 3        # 4 + 4 + 2
+    assert scheduler.stats()["crops"] == 10
+
+
+def test_lone_crop_leaves_after_max_wait_and_sessions_stay_apart(scheduler):
+    seen = {"a": [], "b": []}
+    for key in seen:
+        scheduler.register_session(key, lambda k, result: seen[k].append(result["emotion"]))
+    scheduler.unregister_session("b")
+
+    a = scheduler.submit("a", crop(3))
+    assert a.result(timeout=30)["emotion"] == EMOTIONS[3]
+    b = scheduler.submit("b", crop(5))
+    assert b.result(timeout=30)["emotion"] == EMOTIONS[5]
+
+    assert scheduler.stats()["batches"] == 2
+    assert settle(lambda: seen["a"])
+    assert seen == {"a": [EMOTIONS[3]], "b": []}
@@ -0,0 +1,27 @@
+# Only the session's teacher and members of its class may post face crops.
+
+import pytest
+
+
+@pytest.fixture
+def crops_url(make_user, login, monkeypatch):
+    monkeypatch.setattr("api.emotions_api.get_scheduler", lambda: object())
+    monkeypatch.setattr("api.emotions_api.cv2", object())
+    make_user("t@x.com", "teacher")
+    teacher = login("t@x.com")
+    created = teacher.post("/api/classes/create", json={"class_name": "Math", "subject": "Math"}).get_json()
+    token = teacher.post(f"/api/classes/teacher/{created['class_id']}/generate_session").get_json()["session_token"]
+    return teacher, created["classroom_code"], f"/api/emotions/session/{token}/crops"
+
+
+def test_outsiders_cannot_post_crops(make_user, login, crops_url):
+    teacher, code, url = crops_url
+    make_user("member@x.com")
+    make_user("outsider@x.com")
+    member, outsider = login("member@x.com"), login("outsider@x.com")
+    member.post("/api/classes/join-class", json={"classroom_code": code})
+
+    assert outsider.post(url).status_code == 404
+    # allowed through to input validation
+    assert member.post(url).status_code == 400
+    assert teacher.post(url).status_code == 400
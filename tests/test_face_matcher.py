@@ -0,0 +1,53 @@
+# ClassroomFaceMatcher on synthetic 128-d encodings.
+
+import numpy as np
+
+from utils.attendance_utils import ClassroomFaceMatcher
+
+rng = np.random.default_rng(3)
+
+
+def classroom(n=120):
+    # random faces lie ~1.6 apart, far outside the 0.6 tolerance
+    return np.arange(1000, 1000 + n), rng.normal(scale=0.1, size=(n, 128)).astype(np.float32)
+
+
+def test_every_face_gets_its_nearest_student():
+    ids, enc = classroom()
+    matcher = ClassroomFaceMatcher(1, ids, enc)
+    picks = [5, 17, 99, 17]
+    faces = enc[picks] + rng.normal(scale=0.005, size=(len(picks), 128))
+    stranger = rng.normal(scale=0.1, size=(1, 128))
+
+    results = matcher.match(np.vstack([faces, stranger]))
+
+    assert [r["student_id"] for r in results] == [int(ids[p]) for p in picks] + [None]
+    assert all(r["matched"] for r in results[:-1]) and not results[-1]["matched"]
+    assert all(r["margin"] > 1.0 for r in results[:-1])
+    assert results[-1]["distance"] > matcher.tolerance
+    # same answer as a brute-force search
+    brute = np.linalg.norm(faces[:, None, :] - enc[None, :, :], axis=2).argmin(axis=1)
+    assert [r["student_id"] for r in results[:-1]] == [int(ids[i]) for i in brute]
+
+
+def test_look_alikes_are_rejected_below_the_margin():
+    ids, enc = classroom(10)
+    enc[1] = enc[0] + rng.normal(scale=0.002, size=128)
+    face = enc[0] + rng.normal(scale=0.002, size=(1, 128))
+
+    guessed = ClassroomFaceMatcher(1, ids, enc).match(face)[0]
+    assert guessed["matched"] and guessed["margin"] < 0.05
+
+    strict = ClassroomFaceMatcher(1, ids, enc, min_margin=0.05)
+    assert strict.match(face)[0]["student_id"] is None
+    # a clear match still passes the margin check
+    assert strict.match(enc[[4]])[0]["student_id"] == int(ids[4])
+
+
+def test_single_and_empty_classrooms():
+    ids, enc = classroom(1)
+    only = ClassroomFaceMatcher(1, ids, enc, min_margin=0.05).match(enc)[0]
+    assert only["student_id"] == int(ids[0]) and only["margin"] is None
+
+    empty = ClassroomFaceMatcher(1, [], []).match(enc)
+    assert empty == [{"student_id": None, "distance": None, "margin": None, "matched": False}]
@@ -0,0 +1,27 @@
+# /api/students/face/register validates a posted encoding before storing it.
+
+import pytest
+
+from utils.face_store import ENCODING_DIM
+
+
+@pytest.mark.parametrize("encoding", [
+    ["0.1"] * ENCODING_DIM,
+    [0.1] * (ENCODING_DIM - 1) + [None],
+    [0.1] * (ENCODING_DIM - 1) + [True],
+    [0.1] * (ENCODING_DIM - 1) + [[0.1]],
+    [0.1] * (ENCODING_DIM - 1) + [float("nan")],
+    [0.1] * (ENCODING_DIM - 1) + [float("inf")],
+    [0.1] * (ENCODING_DIM + 1),
+])
+def test_bad_encodings_are_rejected(make_user, login, encoding):
+    make_user("s@x.com")
+    r = login("s@x.com").post("/api/students/face/register", json={"encoding": encoding})
+    assert r.status_code == 400
+    assert "finite numbers" in r.get_json()["error"]
+
+
+def test_valid_encoding_is_stored(make_user, login):
+    make_user("s@x.com")
+    r = login("s@x.com").post("/api/students/face/register", json={"encoding": [0] * 64 + [0.5] * 64})
+    assert r.status_code == 201
@@ -0,0 +1,39 @@
+import os
+
+import numpy as np
+
+from utils.face_store import FaceEmbeddingStore
+
+
+def encoding(value):
+    return np.full(8, value, dtype=np.float32)
+
+
+def test_compaction_switches_both_files_at_once(tmp_path):
+    store = FaceEmbeddingStore(str(tmp_path), dim=8)
+    for round_ in range(40):
+        for student_id in (1, 2):
+            store.append("class_1", student_id, encoding(student_id * 100 + round_))
+
+    assert store._generation("class_1") > 0
+    assert not os.path.exists(tmp_path / "class_1.f32")
+
+    ids, vecs = store.load("class_1")
+    assert sorted(ids.tolist()) == [1, 2]
+    for student_id, vec in zip(ids, vecs):
+        assert vec[0] == student_id * 100 + 39
+
+
+def test_reader_retries_when_pair_is_compacted_away(tmp_path, monkeypatch):
+    store = FaceEmbeddingStore(str(tmp_path), dim=8)
+    store.append("user", 1, encoding(1))
+    store._set_generation("user", 5)       # the pointer moved past files that are gone
+    store.append("user", 1, encoding(2))
+
+    reads = iter([0, 5, 5])     # stale pointer, re-check, retry
+    monkeypatch.setattr(store, "_generation", lambda segment: next(reads))
+    os.unlink(tmp_path / "user.f32")
+
+    ids, vecs = store.load("user")
+    assert ids.tolist() == [1]
+    assert vecs[0][0] == 2
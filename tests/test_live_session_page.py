@@ -0,0 +1,16 @@
+# The live session page only makes students join and leave the session.
+
+import re
+
+
+def test_only_students_get_the_join_flag(make_user, login):
+    make_user("t@x.com", "teacher")
+    make_user("s@x.com")
+    teacher, student = login("t@x.com"), login("s@x.com")
+    created = teacher.post("/api/classes/create", json={"class_name": "Math", "subject": "Math"}).get_json()
+    student.post("/api/classes/join-class", json={"classroom_code": created["classroom_code"]})
+    token = teacher.post(f"/api/classes/teacher/{created['class_id']}/generate_session").get_json()["session_token"]
+
+    flag = re.compile(r"const IS_STUDENT = (\w+);")
+    assert flag.search(teacher.get(f"/session/{token}").get_data(as_text=True)).group(1) == "false"
+    assert flag.search(student.get(f"/session/{token}").get_data(as_text=True)).group(1) == "true"
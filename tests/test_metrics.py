@@ -0,0 +1,49 @@
+def test_metrics_hidden_without_token(app):
+    assert app.test_client().get("/debug/metrics").status_code == 404
+
+
+def test_metrics_require_configured_token(app, monkeypatch):
+    monkeypatch.setitem(app.config, "METRICS_TOKEN", "s3cret")
+    client = app.test_client()
+
+    assert client.get("/debug/metrics").status_code == 403
+    r = client.get("/debug/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert r.status_code == 200
+    assert b"smart_request_duration_seconds" in r.data
+
+
+def test_endpoint_and_blueprint_series_are_separate_families(app, monkeypatch):
+    monkeypatch.setitem(app.config, "METRICS_TOKEN", "s3cret")
+    client = app.test_client()
+    client.get("/api/students/all")
+    body = client.get("/debug/metrics", headers={"Authorization": "Bearer s3cret"}).get_data(as_text=True)
+
+    families = {}
+    for line in body.splitlines():
+        if line.startswith(("smart_requests_total", "smart_blueprint_requests_total")):
+            name, value = line.rsplit(" ", 1)
+            families.setdefault(name.split("{")[0], set()).add(name.split("{")[1].split("=")[0])
+    assert families["smart_requests_total"] == {"endpoint"}
+    assert families["smart_blueprint_requests_total"] == {"blueprint"}
+
+
+def test_overhead_includes_every_hook(app, make_user, login, monkeypatch):
+    from utils.metrics import metrics
+
+    make_user("t@x.com", "teacher")
+    client = login("t@x.com")
+    key = ("endpoint", "classes_api.teacher_classes")
+    stats = metrics.endpoints.get(key)
+    statements = stats.sql_count.sum if stats else 0
+    overhead = metrics.overhead.sum
+
+    # every hook takes exactly one tick of a fake clock
+    monkeypatch.setattr(metrics, "slow_threshold", float("inf"))
+    clock = iter(range(10_000))
+    monkeypatch.setattr("utils.metrics.time.perf_counter", lambda: next(clock))
+    assert client.get("/api/classes/teacher/list").status_code == 200
+
+    sql = metrics.endpoints[key].sql_count.sum - statements
+    assert sql > 0
+    # before_request + two cursor events per statement + the final record
+    assert metrics.overhead.sum - overhead == 2 + 2 * sql
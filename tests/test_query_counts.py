@@ -0,0 +1,57 @@
+# List endpoints must issue the same number of SQL statements for one row as
+# for many (no per-row lazy loads).
+
+import pytest
+from sqlalchemy import event
+
+from utils.auth_utils import db
+
+ROWS = 8
+
+
+@pytest.fixture
+def count_queries(app):
+    with app.app_context():
+        engine = db.engine
+    counter = {"n": 0}
+
+    def count(*args):
+        counter["n"] += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    yield counter
+    event.remove(engine, "before_cursor_execute", count)
+
+
+def add_class_with_assignment(teacher, student, n):
+    created = teacher.post("/api/classes/create", json={"class_name": f"C{n}", "subject": "Math"}).get_json()
+    student.post("/api/classes/join-class", json={"classroom_code": created["classroom_code"]})
+    r = teacher.post("/api/assignments/teacher/create", data={
+        "class_id": created["class_id"], "title": f"HW {n}", "due_date": "2030-01-01T00:00",
+    })
+    assert r.status_code in (200, 201)
+
+
+@pytest.mark.parametrize("url, owner, size", [
+    ("/api/classes/teacher/list", "teacher", len),
+    ("/api/classes/student/joined", "student", len),
+    ("/api/assignments/student/all", "student", lambda body: len(body["items"])),
+])
+def test_list_query_count_does_not_grow_with_rows(make_user, login, count_queries, url, owner, size):
+    make_user("t@x.com", "teacher")
+    make_user("s@x.com")
+    clients = {"teacher": login("t@x.com"), "student": login("s@x.com")}
+    client = clients[owner]
+
+    counts = {}
+    for n in range(1, ROWS + 1):
+        add_class_with_assignment(clients["teacher"], clients["student"], n)
+        if n in (1, ROWS):
+            count_queries["n"] = 0
+            r = client.get(url)
+            assert r.status_code == 200
+            assert size(r.get_json()) == n
+            counts[n] = count_queries["n"]
+
+    assert counts[1] == counts[ROWS]
+    assert counts[ROWS] <= 2     # the list query (+ user loader on a cache miss)
@@ -0,0 +1,50 @@
+import io
+import json
+import os
+
+import pytest
+
+from models.job_models import Job
+from utils.auth_utils import db
+from utils.job_queue import job_queue
+
+
+def test_background_import_hashes_in_the_job(app, make_user, login):
+    make_user("t@x.com", "teacher")
+    teacher = login("t@x.com")
+
+    r = teacher.post("/api/students/import", json={
+        "background": True,
+        "students": [{"name": "Ann", "email": "ann@x.com", "password": "secret-pw"}],
+    })
+    assert r.status_code == 202
+
+    with app.app_context():
+        payload = db.session.get(Job, r.get_json()["job_id"]).payload
+        assert "secret-pw" not in payload
+        rows_path = json.loads(payload)["rows_path"]
+        assert oct(os.stat(rows_path).st_mode & 0o777) == "0o600"
+        job_queue.run_one("test")
+        assert not os.path.exists(rows_path)
+
+    assert app.test_client().post(
+        "/login", data={"email": "ann@x.com", "password": "secret-pw"}
+    ).status_code == 302
+
+
+@pytest.mark.parametrize("class_id", ["abc", "1.5", [1], {"id": 1}, True, 2.5])
+def test_non_numeric_class_id_is_a_bad_request(make_user, login, class_id):
+    make_user("t@x.com", "teacher")
+    r = login("t@x.com").post("/api/students/import", json={
+        "class_id": class_id,
+        "students": [{"name": "Ann", "email": "ann@x.com", "password": "pw"}],
+    })
+    assert r.status_code == 400
+
+
+def test_non_numeric_form_class_id_is_a_bad_request(make_user, login):
+    make_user("t@x.com", "teacher")
+    r = login("t@x.com").post("/api/students/import", data={
+        "class_id": "x1", "roster": (io.BytesIO(b"name,email,password\nAnn,ann@x.com,pw\n"), "r.csv"),
+    })
+    assert r.status_code == 400
@@ -0,0 +1,33 @@
+import numpy as np
+
+from utils.suggestion_engine import ClassMatrices, at_risk_students, score
+
+
+def empty(columns):
+    return np.zeros((0, columns))
+
+
+def test_score_class_without_ended_sessions():
+    members = np.array([[1, 10, 0.0], [1, 11, 0.0]])
+    m = ClassMatrices(1, members, empty(4), empty(4), empty(3), empty(4))
+
+    s = score(m, now=0.0)
+
+    assert s["streak"].tolist() == [0, 0]
+    assert s["held"].tolist() == [0, 0]
+    assert at_risk_students(s) == []
+
+
+def test_at_risk_endpoint_with_live_session_only(make_user, login):
+    make_user("t@x.com", "teacher")
+    make_user("s@x.com")
+    teacher, student = login("t@x.com"), login("s@x.com")
+
+    created = teacher.post("/api/classes/create", json={"class_name": "Math", "subject": "Math"}).get_json()
+    student.post("/api/classes/join-class", json={"classroom_code": created["classroom_code"]})
+    teacher.post(f"/api/classes/teacher/{created['class_id']}/generate_session")
+
+    r = teacher.get("/api/dashboard/at-risk")
+
+    assert r.status_code == 200
+    assert r.get_json()["classes"][0]["students"] == []
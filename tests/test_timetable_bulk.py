@@ -0,0 +1,50 @@
+# A bulk week is saved with a constant number of statements, and the cached
+# conflict index learns the new periods without reloading.
+
+from sqlalchemy import event
+
+from utils.auth_utils import db
+from utils.timetable_utils import DAYS, timetable_index
+
+
+def week(days, periods=range(1, 9)):
+    return [
+        {"day": day, "period": p, "start_time": f"{7 + p:02d}:00", "end_time": f"{7 + p:02d}:50"}
+        for day in days for p in periods
+    ]
+
+
+def test_bulk_week_statements_do_not_grow_with_periods(app, make_user, login):
+    make_user("t@x.com", "teacher")
+    teacher = login("t@x.com")
+    timetable_index.clear()
+    one = teacher.post("/api/classes/create", json={"class_name": "A", "subject": "Math"}).get_json()
+    many = teacher.post("/api/classes/create", json={"class_name": "B", "subject": "Art"}).get_json()
+
+    with app.app_context():
+        engine = db.engine
+    counter = {"n": 0}
+
+    def count(*args):
+        counter["n"] += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        counts = {}
+        for created, rows in ((one, week(DAYS[:1], [1])), (many, week(DAYS[:5]))):
+            counter["n"] = 0
+            r = teacher.post("/api/timetable/teacher/timetable/bulk",
+                             json={"class_id": created["class_id"], "entries": rows})
+            assert r.status_code == 201
+            assert r.get_json()["created"] == len(rows)
+            counts[len(rows)] = counter["n"]
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert counts[1] == counts[40]
+
+    # the index cached for class B already holds its week
+    clash = teacher.post("/api/timetable/teacher/timetable/bulk",
+                         json={"class_id": many["class_id"], "entries": week(DAYS[:1], [1])})
+    assert clash.status_code == 409
+    assert clash.get_json()["conflicts"][0]["conflicts_with"][0]["id"] is not None
@@ -0,0 +1,47 @@
+from datetime import time
+
+from models.classroom_models import TimetableEntry
+from utils.auth_utils import db
+from utils.timetable_utils import bump_timetable_version
+
+
+def test_grid_sees_edits_made_by_another_process(app, make_user, login):
+    make_user("t@x.com", "teacher")
+    make_user("s@x.com")
+    teacher, student = login("t@x.com"), login("s@x.com")
+    created = teacher.post("/api/classes/create", json={"class_name": "Math", "subject": "Math"}).get_json()
+    student.post("/api/classes/join-class", json={"classroom_code": created["classroom_code"]})
+
+    first = student.get("/api/timetable/student/grid")
+    assert student.get("/api/timetable/student/grid", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+    # written elsewhere: this process's cache is never told
+    with app.app_context():
+        db.session.add(TimetableEntry(
+            class_id=created["class_id"], day="Monday", period=1,
+            start_time=time(9), end_time=time(10), subject="Math", teacher_name="t",
+        ))
+        bump_timetable_version(created["class_id"])
+        db.session.commit()
+
+    second = student.get("/api/timetable/student/grid", headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 200
+    assert second.get_json()["grid"]["Monday"]["1"]["subject"] == "Math"
+
+
+def test_grid_cache_evicts_without_lookups_of_old_keys(app, monkeypatch):
+    from utils.timetable_utils import GridCache
+
+    now = [1000.0]
+    monkeypatch.setattr("utils.timetable_utils.time.monotonic", lambda: now[0])
+    cache = GridCache(ttl=60, max_entries=2)
+
+    with app.test_request_context():
+        cache.grid(frozenset({(1, 1)}))
+        now[0] += 61                                # (1, 1) expired, never asked again
+        cache.grid(frozenset({(1, 2)}))
+        assert set(cache.grids) == {frozenset({(1, 2)})}
+
+        cache.grid(frozenset({(2, 1)}))
+        cache.grid(frozenset({(3, 1)}))             # over max_entries: oldest goes
+        assert set(cache.grids) == {frozenset({(2, 1)}), frozenset({(3, 1)})}
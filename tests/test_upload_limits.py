@@ -0,0 +1,14 @@
+import io
+
+
+def test_oversized_submission_rejected_before_reading(app, make_user, login, monkeypatch):
+    make_user("s@x.com")
+    student = login("s@x.com")
+    monkeypatch.setitem(app.config, "MAX_CONTENT_LENGTH", 1024)
+
+    r = student.post("/api/assignments/student/submit", data={
+        "assignment_id": "1", "file": (io.BytesIO(b"x" * 4096), "big.pdf"),
+    }, content_type="multipart/form-data")
+
+    assert r.status_code == 413
+    assert "error" in r.get_json()
@@ -0,0 +1,181 @@
+# utils/assets.py
+# ===============================
+# FINGERPRINTED STATIC ASSETS
+# ===============================
+#
+# `flask assets-build` copies static/css/*.css and static/js/*.js to
+# static/dist/ under content-hashed names (style.css -> style.3f2a9c1b04de.css)
+# next to precompressed .gz (and .br when the brotli package is installed)
+# variants, and writes manifest.json (source path -> hashed path).
+#
+# Templates link assets with asset_url("css/style.css") (same argument as
+# url_for("static", filename=...)). With a manifest it points at /assets/<hashed
+# name>, served with Cache-Control: immutable for a year and the precompressed
+# variant the client accepts, so repeat page loads never ask for them again;
+# a changed file gets a new name. Without a build it falls back to /static.
+
+import glob
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import time
+
+from flask import abort, request, send_file, url_for
+from flask.sessions import SecureCookieSessionInterface
+from werkzeug.security import safe_join
+
+from config import Config
+
+try:
+    import brotli
+except ImportError:     # .br variants are optional
+    brotli = None
+
+SOURCES = ("css/*.css", "js/*.js")
+MANIFEST = "manifest.json"
+HASH_LENGTH = 12
+URL_PREFIX = "/assets"
+RELOAD_CHECK_SECONDS = 5    # how often a running app looks for a new manifest
+
+# best first; (Accept-Encoding token, file suffix)
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def fingerprinted(relative, digest):
+    stem, ext = os.path.splitext(relative)
+    return f"{stem}.{digest[:HASH_LENGTH]}{ext}"
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+# -------------------------
+# BUILD
+# -------------------------
+def build(static_dir, out_dir, prune=False):
+    """
+    Fingerprint and precompress every source asset; returns the manifest.
+    Outputs of earlier builds are kept (pages cached by clients may still
+    reference them) unless prune=True.
+    """
+    manifest = {}
+    for pattern in SOURCES:
+        for source in sorted(glob.glob(os.path.join(static_dir, pattern))):
+            relative = os.path.relpath(source, static_dir).replace(os.sep, "/")
+            with open(source, "rb") as f:
+                data = f.read()
+
+            hashed = fingerprinted(relative, hashlib.sha256(data).hexdigest())
+            target = os.path.join(out_dir, hashed)
+            manifest[relative] = hashed
+            if os.path.exists(target):
+                continue
+
+            _write(target, data)
+            variants = [(".gz", gzip.compress(data, 9, mtime=0))]
+            if brotli is not None:
+                variants.append((".br", brotli.compress(data, quality=11)))
+            for suffix, packed in variants:
+                if len(packed) < len(data):     # tiny files don't shrink
+                    _write(target + suffix, packed)
+
+    if prune:
+        keep = {os.path.join(out_dir, h) for h in manifest.values()}
+        for path in glob.glob(os.path.join(out_dir, "**", "*"), recursive=True):
+            base = path
+            for _, suffix in ENCODINGS:
+                base = base[:-len(suffix)] if base.endswith(suffix) else base
+            if os.path.isfile(path) and base not in keep and not path.endswith(MANIFEST):
+                os.unlink(path)
+
+    _write(os.path.join(out_dir, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return manifest
+
+
+# -------------------------
+# TEMPLATES + SERVING
+# -------------------------
+class AssetSessionInterface(SecureCookieSessionInterface):
+    """
+    Asset requests get a null session: Flask then never saves it, so the
+    responses carry no Set-Cookie or Vary: Cookie (which would make every
+    cache, the browser's included, key them on the login cookie).
+    """
+
+    def open_session(self, app, request):
+        if request.path.startswith(URL_PREFIX + "/"):
+            return self.make_null_session(app)
+        return super().open_session(app, request)
+
+
+class AssetManifest:
+    def __init__(self, out_dir, max_age):
+        self.out_dir = out_dir
+        self.max_age = max_age
+        self.manifest = {}
+        self.loaded_mtime = None
+        self.checked_at = 0.0
+
+    def load(self):
+        """(Re)read manifest.json when it changed; a missing one means no build."""
+        self.checked_at = time.monotonic()
+        path = os.path.join(self.out_dir, MANIFEST)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            self.manifest, self.loaded_mtime = {}, None
+            return
+        if mtime != self.loaded_mtime:
+            with open(path) as f:
+                self.manifest = json.load(f)
+            self.loaded_mtime = mtime
+
+    def url(self, filename):
+        """url_for("static", filename=...) replacement for templates."""
+        if time.monotonic() - self.checked_at > RELOAD_CHECK_SECONDS:
+            self.load()
+        hashed = self.manifest.get(filename)
+        if hashed is None:
+            return url_for("static", filename=filename)
+        return f"{URL_PREFIX}/{hashed}"
+
+    def serve(self, filename):
+        path = safe_join(self.out_dir, filename)
+        if path is None or filename == MANIFEST or not os.path.isfile(path):
+            abort(404)
+
+        mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        accepted = request.accept_encodings
+        for encoding, suffix in ENCODINGS:
+            if accepted[encoding] and os.path.isfile(path + suffix):
+                response = send_file(path + suffix, mimetype=mimetype, conditional=True,
+                                     max_age=self.max_age)
+                response.headers["Content-Encoding"] = encoding
+                break
+        else:
+            response = send_file(path, mimetype=mimetype, conditional=True, max_age=self.max_age)
+
+        response.vary.add("Accept-Encoding")
+        response.cache_control.public = True
+        response.cache_control.immutable = True     # the name changes with the content
+        return response
+
+    def init_app(self, app):
+        self.load()
+        app.jinja_env.globals["asset_url"] = self.url
+        if type(app.session_interface) is SecureCookieSessionInterface:
+            app.session_interface = AssetSessionInterface()
+
+        @app.route(f"{URL_PREFIX}/<path:filename>")
+        def fingerprinted_asset(filename):
+            return self.serve(filename)
+
+
+assets = AssetManifest(Config.ASSET_DIST_DIR, Config.ASSET_MAX_AGE)
@@ -0,0 +1,263 @@
+# utils/attendance_buffer.py
+# ===============================
+# WRITE-BEHIND SESSION ATTENDANCE
+# ===============================
+#
+# join/leave requests only touch memory: the attendance state of a session
+# is loaded once (one query), join/leave update it and mark it dirty, and a
+# background thread writes all dirty rows in a single transaction every
+# ATTENDANCE_FLUSH_MS (or as soon as ATTENDANCE_FLUSH_MAX events pile up).
+# end_session flushes synchronously, so an ended session is always complete
+# in the database. Flushed attendances are counted into the per-class
+# rollups (utils/attendance_rollup.py) in the same transaction.
+#
+# Every worker process keeps its own copy of a session's state, loaded on
+# first touch. A join or leave for a student that copy does not know re-reads
+# that student's row, so a join served (and flushed) by another worker is
+# found. A join still sitting in another worker's buffer is only visible once
+# that buffer flushes (ATTENDANCE_FLUSH_MS). end_session can only flush
+# the buffer of the process that serves it; joins/leaves buffered elsewhere
+# reach the database up to ATTENDANCE_FLUSH_MS after the session ended (the
+# rollups still count them).
+
+import atexit
+import logging
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import bindparam, update
+
+from utils.auth_utils import db
+from utils.db_utils import insert_ignore
+from utils.attendance_rollup import record_flushed
+from models.classroom_models import LiveSession, SessionAttendance
+
+log = logging.getLogger(__name__)
+
+SessionRef = namedtuple("SessionRef", "id session_link class_id teacher_id")
+
+
+class AttendanceState:
+    __slots__ = ("joined_at", "left_at", "persisted", "dirty")
+
+    def __init__(self, joined_at, left_at=None, persisted=False):
+        self.joined_at = joined_at
+        self.left_at = left_at
+        self.persisted = persisted
+        self.dirty = not persisted
+
+    @property
+    def duration(self):
+        if self.left_at is None:
+            return None
+        return int((self.left_at - self.joined_at).total_seconds())
+
+
+class AttendanceBuffer:
+    def __init__(self, flush_interval_ms=250, max_pending=500):
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_pending = max_pending
+        self.app = None
+
+        self.lock = threading.RLock()
+        self.flush_lock = threading.Lock()
+        self.refs = {}          # session_link -> SessionRef
+        self.sessions = {}      # session_id -> {student_id: AttendanceState}
+        self.dirty = set()      # (session_id, student_id)
+        self.wakeup = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        self.app = app
+        self.flush_interval = app.config.get("ATTENDANCE_FLUSH_MS", 250) / 1000.0
+        self.max_pending = app.config.get("ATTENDANCE_FLUSH_MAX", 500)
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="attendance-flush", daemon=True)
+            self._thread.start()
+            atexit.register(self._flush_at_exit)
+
+    # -------------------------
+    # LOOKUPS (CACHED)
+    # -------------------------
+    def session_ref(self, session_link):
+        ref = self.refs.get(session_link)
+        if ref is None:
+            s = LiveSession.query.filter_by(session_link=session_link).first()
+            if not s:
+                return None
+            ref = SessionRef(s.id, s.session_link, s.class_id, s.teacher_id)
+            with self.lock:
+                self.refs[session_link] = ref
+        return ref
+
+    def _state(self, session_id):
+        """Attendance of one session; loaded from the DB on first touch."""
+        state = self.sessions.get(session_id)
+        if state is None:
+            rows = (
+                db.session.query(
+                    SessionAttendance.student_id,
+                    SessionAttendance.joined_at,
+                    SessionAttendance.left_at
+                )
+                .filter_by(session_id=session_id)
+                .all()
+            )
+            loaded = {
+                student_id: AttendanceState(joined_at, left_at, persisted=True)
+                for student_id, joined_at, left_at in rows
+            }
+            with self.lock:
+                state = self.sessions.setdefault(session_id, loaded)
+        return state
+
+    def _refresh(self, session_id, student_id, state):
+        """A student this process has not seen: read their row (written by another worker)."""
+        row = (
+            db.session.query(SessionAttendance.joined_at, SessionAttendance.left_at)
+            .filter_by(session_id=session_id, student_id=student_id)
+            .first()
+        )
+        if row is None:
+            return None
+        with self.lock:
+            return state.setdefault(student_id, AttendanceState(row[0], row[1], persisted=True))
+
+    def open_students(self, session_id):
+        """{student_id: joined_at} of everybody currently in the session."""
+        state = self._state(session_id)
+        with self.lock:
+            return {
+                sid: a.joined_at for sid, a in state.items() if a.left_at is None
+            }
+
+    # -------------------------
+    # EVENTS
+    # -------------------------
+    def join(self, session_id, student_id):
+        """Returns (created, AttendanceState)."""
+        state = self._state(session_id)
+        if student_id not in state:
+            self._refresh(session_id, student_id, state)
+        with self.lock:
+            existing = state.get(student_id)
+            if existing:
+                return False, existing
+            attendance = state[student_id] = AttendanceState(datetime.utcnow())
+            self._mark(session_id, student_id)
+            return True, attendance
+
+    def leave(self, session_id, student_id):
+        """Closes the open attendance; None when there is none."""
+        state = self._state(session_id)
+        if student_id not in state:
+            self._refresh(session_id, student_id, state)
+        with self.lock:
+            attendance = state.get(student_id)
+            if not attendance or attendance.left_at is not None:
+                return None
+            attendance.left_at = datetime.utcnow()
+            attendance.dirty = True
+            self._mark(session_id, student_id)
+            return attendance
+
+    def _mark(self, session_id, student_id):
+        self.dirty.add((session_id, student_id))
+        if len(self.dirty) >= self.max_pending:
+            self.wakeup.set()
+
+    # -------------------------
+    # FLUSH
+    # -------------------------
+    def flush(self, session_id=None):
+        """Write dirty rows (all, or one session's) in one transaction."""
+        with self.flush_lock:
+            with self.lock:
+                keys = [k for k in self.dirty if session_id is None or k[0] == session_id]
+                if not keys:
+                    return 0
+                self.dirty.difference_update(keys)
+
+                inserts, updates, batch = [], [], []
+                for sid, student_id in keys:
+                    a = self.sessions[sid][student_id]
+                    batch.append(a)
+                    if not a.persisted:
+                        inserts.append({
+                            "session_id": sid,
+                            "student_id": student_id,
+                            "joined_at": a.joined_at,
+                            "left_at": a.left_at,
+                            "duration": a.duration
+                        })
+                    else:
+                        updates.append({
+                            "b_session_id": sid,
+                            "b_student_id": student_id,
+                            "b_left_at": a.left_at,
+                            "b_duration": a.duration
+                        })
+                    a.dirty = False
+
+            try:
+                conn = db.session.connection()
+                if inserts:
+                    conn.execute(insert_ignore(conn, SessionAttendance), inserts)
+                if updates:
+                    conn.execute(
+                        update(SessionAttendance)
+                        .where(
+                            SessionAttendance.session_id == bindparam("b_session_id"),
+                            SessionAttendance.student_id == bindparam("b_student_id"),
+                            SessionAttendance.left_at.is_(None)
+                        )
+                        .values(
+                            left_at=bindparam("b_left_at"),
+                            duration=bindparam("b_duration")
+                        ),
+                        updates
+                    )
+                record_flushed(conn, {sid for sid, _ in keys})
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                with self.lock:
+                    self.dirty.update(keys)     # retried on the next tick
+                    for a in batch:
+                        a.dirty = True
+                raise
+
+            with self.lock:
+                for a in batch:
+                    a.persisted = True
+            return len(keys)
+
+    def forget(self, session_id):
+        """Drop a finished session's state (after its final flush)."""
+        with self.lock:
+            self.sessions.pop(session_id, None)
+            for link, ref in list(self.refs.items()):
+                if ref.id == session_id:
+                    del self.refs[link]
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            if not self.dirty:
+                continue
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception:
+                log.exception("attendance flush failed, will retry")
+
+    def _flush_at_exit(self):
+        if self.app is not None and self.dirty:
+            with self.app.app_context():
+                self.flush()
+
+
+attendance_buffer = AttendanceBuffer()
@@ -0,0 +1,274 @@
+# utils/attendance_rollup.py
+# ===============================
+# ATTENDANCE ROLLUPS (PER CLASS, PER STUDENT)
+# ===============================
+#
+# AttendanceRollup keeps sessions held / attended, seconds present and last
+# seen for every (class_id, student_id), so percentages are one row per
+# student instead of a scan of every session ever held. Kept up to date by:
+#   - the attendance flush: closed attendances of running sessions are added,
+#     and so is anything flushed late for an ended session (another worker's
+#     buffer, see utils/attendance_buffer.py),
+#   - end_session: every attendance not counted yet is counted up to the
+#     session end and every member (and attendee) gets one more session held.
+# Both run in the transaction that writes the attendance itself. Each
+# SessionAttendance row is counted once: it is claimed by setting
+# rollup_counted with an UPDATE ... WHERE rollup_counted IS NOT TRUE, so a
+# flush racing end_session cannot count the same leave twice.
+# `flask attendance-rollup-rebuild` recomputes everything from history.
+
+import bisect
+from collections import defaultdict
+
+from sqlalchemy import bindparam, case, delete, insert, or_, select, union, update
+
+from utils.db_utils import insert_ignore
+from models.classroom_models import (
+    AttendanceRollup, ClassMember, Classroom, LiveSession, SessionAttendance
+)
+
+YIELD_PER = 1000
+
+_attended = (
+    update(AttendanceRollup)
+    .where(
+        AttendanceRollup.class_id == bindparam("b_class_id"),
+        AttendanceRollup.student_id == bindparam("b_student_id")
+    )
+    .values(
+        sessions_attended=AttendanceRollup.sessions_attended + 1,
+        total_seconds=AttendanceRollup.total_seconds + bindparam("b_seconds"),
+        last_seen_at=case(
+            (or_(
+                AttendanceRollup.last_seen_at.is_(None),
+                AttendanceRollup.last_seen_at < bindparam("b_seen")
+            ), bindparam("b_seen")),
+            else_=AttendanceRollup.last_seen_at
+        )
+    )
+)
+
+_held = (
+    update(AttendanceRollup)
+    .where(
+        AttendanceRollup.class_id == bindparam("b_class_id"),
+        AttendanceRollup.student_id == bindparam("b_student_id")
+    )
+    .values(sessions_held=AttendanceRollup.sessions_held + 1)
+)
+
+
+def session_seconds(joined_at, left_at, duration, ended_at):
+    """Seconds counted for one attendance of an ended session (capped at its end)."""
+    if left_at is not None and left_at <= ended_at:
+        return duration if duration is not None else int((left_at - joined_at).total_seconds())
+    return max(int((ended_at - joined_at).total_seconds()), 0)
+
+
+def ensure_rows(conn, pairs):
+    pairs = set(pairs)
+    if pairs:
+        conn.execute(insert_ignore(conn, AttendanceRollup), [
+            {"class_id": c, "student_id": s, "sessions_held": 0,
+             "sessions_attended": 0, "total_seconds": 0}
+            for c, s in pairs
+        ])
+
+
+def record_attendance(conn, items):
+    """items: [(class_id, student_id, seconds, seen_at)]"""
+    if not items:
+        return
+    ensure_rows(conn, ((c, s) for c, s, _, _ in items))
+    conn.execute(_attended, [
+        {"b_class_id": c, "b_student_id": s, "b_seconds": seconds, "b_seen": seen}
+        for c, s, seconds, seen in items
+    ])
+
+
+# -------------------------
+# INCREMENTAL UPDATES
+# -------------------------
+def claim(conn, *where):
+    """Mark uncounted attendances as counted; returns only the rows this call marked."""
+    return conn.execute(
+        update(SessionAttendance)
+        .where(SessionAttendance.rollup_counted.isnot(True), *where)
+        .values(rollup_counted=True)
+        .returning(
+            SessionAttendance.session_id, SessionAttendance.student_id,
+            SessionAttendance.joined_at, SessionAttendance.left_at, SessionAttendance.duration
+        )
+    ).all()
+
+
+def counted(rows, class_of, ended):
+    """record_attendance items of claimed rows; ended: {session_id: ended_at}"""
+    items = []
+    for session_id, student_id, joined_at, left_at, duration in rows:
+        end = ended.get(session_id)
+        if end is None:
+            items.append((class_of[session_id], student_id, duration or 0, left_at))
+        else:
+            seen = min(left_at, end) if left_at else end
+            items.append((class_of[session_id], student_id,
+                          session_seconds(joined_at, left_at, duration, end), seen))
+    return items
+
+
+def record_flushed(conn, session_ids):
+    """
+    After the attendance flush wrote rows of these sessions: count closed
+    attendances of running sessions, and every uncounted attendance of an
+    ended one (flushed after its end, so end_session did not see it).
+    """
+    if not session_ids:
+        return
+    sessions = conn.execute(
+        select(LiveSession.id, LiveSession.class_id, LiveSession.ended_at)
+        .where(LiveSession.id.in_(set(session_ids)))
+    ).all()
+    class_of = {s: c for s, c, _ in sessions}
+    ended = {s: e for s, _, e in sessions if e is not None}
+    running = [s for s in class_of if s not in ended]
+
+    rows = []
+    if running:
+        rows += claim(conn, SessionAttendance.session_id.in_(running),
+                      SessionAttendance.left_at.isnot(None))
+    if ended:
+        late = claim(conn, SessionAttendance.session_id.in_(list(ended)))
+        rows += late
+        # end_session gave members (and the attendees it saw) their session held
+        late_pairs = {(class_of[s], student_id) for s, student_id, *_ in late}
+        members = set(conn.execute(
+            select(ClassMember.class_id, ClassMember.student_id)
+            .where(ClassMember.student_id.in_({p[1] for p in late_pairs}))
+        ).all()) if late_pairs else set()
+        outsiders = late_pairs - members
+        if outsiders:
+            ensure_rows(conn, outsiders)
+            conn.execute(_held, [{"b_class_id": c, "b_student_id": s} for c, s in outsiders])
+    record_attendance(conn, counted(rows, class_of, ended))
+
+
+def record_session_end(conn, session_id, class_id, ended_at):
+    # everything not counted by a flush yet (still present, or left meanwhile)
+    rows = claim(conn, SessionAttendance.session_id == session_id)
+    record_attendance(conn, counted(rows, {session_id: class_id}, {session_id: ended_at}))
+
+    students = union(
+        select(ClassMember.student_id).where(ClassMember.class_id == class_id),
+        select(SessionAttendance.student_id).where(SessionAttendance.session_id == session_id)
+    )
+    ensure_rows(conn, ((class_id, s) for (s,) in conn.execute(students)))
+    conn.execute(
+        update(AttendanceRollup)
+        .where(
+            AttendanceRollup.class_id == class_id,
+            AttendanceRollup.student_id.in_(students)
+        )
+        .values(sessions_held=AttendanceRollup.sessions_held + 1)
+    )
+
+
+# -------------------------
+# REBUILD (BACKFILL)
+# -------------------------
+def rebuild_class(conn, class_id):
+    ended = dict(conn.execute(
+        select(LiveSession.id, LiveSession.ended_at).where(
+            LiveSession.class_id == class_id,
+            LiveSession.ended_at.isnot(None)
+        )
+    ).all())
+    ended_sorted = sorted(ended.values())
+    members = dict(conn.execute(
+        select(ClassMember.student_id, ClassMember.joined_at).where(ClassMember.class_id == class_id)
+    ).all())
+
+    # held, attended, seconds, last seen
+    totals = defaultdict(lambda: [0, 0, 0, None])
+    for student_id, joined_at in members.items():
+        # sessions that ended while the student was a member
+        start = bisect.bisect_left(ended_sorted, joined_at) if joined_at else 0
+        totals[student_id][0] = len(ended_sorted) - start
+
+    rows = conn.execute(
+        select(
+            SessionAttendance.student_id,
+            SessionAttendance.session_id,
+            SessionAttendance.joined_at,
+            SessionAttendance.left_at,
+            SessionAttendance.duration
+        )
+        .where(SessionAttendance.session_id.in_(list(ended)))
+        .execution_options(yield_per=YIELD_PER)
+    ) if ended else ()
+
+    for student_id, session_id, joined_at, left_at, duration in rows:
+        session_end = ended[session_id]
+        t = totals[student_id]
+        joined_class = members.get(student_id)
+        if joined_class is None or joined_class > session_end:
+            t[0] += 1       # attended without being counted as a member
+        t[1] += 1
+        t[2] += session_seconds(joined_at, left_at, duration, session_end)
+        seen = min(left_at, session_end) if left_at else session_end
+        t[3] = seen if t[3] is None or seen > t[3] else t[3]
+
+    # the totals hold every attendance of an ended session; those of running
+    # sessions are counted (again) by the next flush or end_session
+    conn.execute(
+        update(SessionAttendance)
+        .where(SessionAttendance.session_id.in_(list(ended)))
+        .values(rollup_counted=True)
+    )
+    conn.execute(
+        update(SessionAttendance)
+        .where(SessionAttendance.session_id.in_(
+            select(LiveSession.id).where(LiveSession.class_id == class_id, LiveSession.ended_at.is_(None))
+        ))
+        .values(rollup_counted=None)
+    )
+
+    conn.execute(delete(AttendanceRollup).where(AttendanceRollup.class_id == class_id))
+    if totals:
+        conn.execute(insert(AttendanceRollup), [
+            {"class_id": class_id, "student_id": s, "sessions_held": held,
+             "sessions_attended": attended, "total_seconds": seconds, "last_seen_at": seen}
+            for s, (held, attended, seconds, seen) in totals.items()
+        ])
+    return len(totals)
+
+
+def rebuild(engine, class_id=None):
+    """Recompute rollups from the attendance history; one transaction per class."""
+    with engine.connect() as conn:
+        if class_id is not None:
+            class_ids = [class_id]
+        else:
+            class_ids = [c for (c,) in conn.execute(select(Classroom.id).order_by(Classroom.id))]
+
+    rows = 0
+    for cid in class_ids:
+        with engine.begin() as conn:
+            rows += rebuild_class(conn, cid)
+    return len(class_ids), rows
+
+
+# -------------------------
+# READS
+# -------------------------
+def percentage(attended, held):
+    return round(100.0 * attended / held, 1) if held else None
+
+
+def rollup_dict(r):
+    return {
+        "sessions_held": r.sessions_held or 0,
+        "sessions_attended": r.sessions_attended or 0,
+        "attendance_percent": percentage(r.sessions_attended or 0, r.sessions_held or 0),
+        "total_minutes": round((r.total_seconds or 0) / 60, 1),
+        "last_seen_at": r.last_seen_at.isoformat() if r.last_seen_at else None
+    }
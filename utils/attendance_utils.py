@@ -0,0 +1,152 @@
+# utils/attendance_utils.py
+# ===============================
+# FACE MATCHING (PER CLASSROOM)
+# ===============================
+#
+# Every enrolled student of a classroom lives as one row of a single
+# contiguous (N x D) float32 matrix. All faces found in a camera frame are
+# matched against that matrix with one batched distance computation instead
+# of a Python loop per student per face. A face is matched to its nearest
+# student within the tolerance; with min_margin set, a face almost as close
+# to the runner-up (a look-alike) is rejected instead of guessed.
+
+import threading
+
+import numpy as np
+
+ENCODING_DIM = 128          # face_recognition / dlib embedding size
+MATCH_TOLERANCE = 0.6       # same default as face_recognition.compare_faces
+MATCH_MIN_MARGIN = 0.0      # runner-up distance - best distance; 0 = off
+
+
+class ClassroomFaceMatcher:
+    def __init__(self, class_id, student_ids, encodings, tolerance=MATCH_TOLERANCE,
+                 min_margin=MATCH_MIN_MARGIN):
+        encodings = np.asarray(encodings, dtype=np.float32)
+        if encodings.size == 0:
+            encodings = np.empty((0, ENCODING_DIM), dtype=np.float32)
+        if encodings.ndim != 2:
+            raise ValueError("encodings must be a 2-D (students x dim) array")
+
+        self.class_id = class_id
+        self.tolerance = tolerance
+        self.min_margin = min_margin
+        self.student_ids = np.asarray(student_ids, dtype=np.int64)
+        # contiguous, so the BLAS matmul below never copies
+        self.encodings = np.ascontiguousarray(encodings)
+        self.sq_norms = np.einsum("ij,ij->i", self.encodings, self.encodings)
+
+        if len(self.student_ids) != len(self.encodings):
+            raise ValueError("student_ids and encodings length mismatch")
+
+    def __len__(self):
+        return len(self.student_ids)
+
+    def distances(self, faces):
+        """Euclidean distance matrix (faces x students)."""
+        faces = np.asarray(faces, dtype=np.float32).reshape(-1, self.encodings.shape[1])
+
+        # |a - b|^2 = |a|^2 + |b|^2 - 2 a.b  -> one GEMM for the whole frame
+        face_sq = np.einsum("ij,ij->i", faces, faces)
+        d2 = face_sq[:, None] + self.sq_norms[None, :] - 2.0 * (faces @ self.encodings.T)
+        np.maximum(d2, 0.0, out=d2)
+        return np.sqrt(d2, out=d2)
+
+    def match(self, faces):
+        """
+        Match every face of a frame in one pass.
+
+        Returns one dict per face: best student_id (None if above tolerance
+        or the margin is below min_margin), its distance and the margin to the
+        runner-up (bigger = more certain, None when the classroom has a single
+        enrolled face).
+        """
+        faces = np.asarray(faces, dtype=np.float32)
+        if faces.size == 0:
+            return []
+        if len(self) == 0:
+            return [
+                {"student_id": None, "distance": None, "margin": None, "matched": False}
+                for _ in range(len(faces.reshape(-1, self.encodings.shape[1])))
+            ]
+
+        dist = self.distances(faces)
+        rows = np.arange(dist.shape[0])
+
+        if dist.shape[1] > 1:
+            # two smallest per row without a full sort
+            top2 = np.argpartition(dist, 1, axis=1)[:, :2]
+            d_top2 = dist[rows[:, None], top2]
+            order = np.argsort(d_top2, axis=1)
+            best_idx = top2[rows, order[:, 0]]
+            best = d_top2[rows, order[:, 0]]
+            margin = d_top2[rows, order[:, 1]] - best
+        else:
+            best_idx = np.zeros(dist.shape[0], dtype=np.int64)
+            best = dist[:, 0]
+            margin = np.full(dist.shape[0], np.nan, dtype=np.float32)
+
+        matched = best <= self.tolerance
+        if self.min_margin:
+            matched &= ~(margin < self.min_margin)     # NaN (one student) passes
+        best_ids = self.student_ids[best_idx]
+
+        return [
+            {
+                "student_id": int(best_ids[i]) if matched[i] else None,
+                "distance": float(best[i]),
+                "margin": None if np.isnan(margin[i]) else float(margin[i]),
+                "matched": bool(matched[i]),
+            }
+            for i in range(len(best))
+        ]
+
+    def present_students(self, faces):
+        """Set of student ids recognised in a frame (each face counted once)."""
+        return {m["student_id"] for m in self.match(faces) if m["matched"]}
+
+
+# -------------------------
+# PER-CLASSROOM REGISTRY
+# -------------------------
+_matchers = {}
+_matchers_lock = threading.Lock()
+
+
+def set_matcher(class_id, student_ids, encodings, tolerance=MATCH_TOLERANCE,
+                min_margin=MATCH_MIN_MARGIN):
+    matcher = ClassroomFaceMatcher(class_id, student_ids, encodings, tolerance, min_margin)
+    with _matchers_lock:
+        _matchers[class_id] = matcher
+    return matcher
+
+
+def get_matcher(class_id):
+    with _matchers_lock:
+        return _matchers.get(class_id)
+
+
+def drop_matcher(class_id):
+    with _matchers_lock:
+        _matchers.pop(class_id, None)
+
+
+def matcher_for_class(class_id, store=None):
+    """
+    Matcher backed by the class segment of the face store. Reloaded only when
+    the segment changed on disk (FaceEmbeddingStore.version per lookup otherwise).
+    """
+    from utils.face_store import face_store, class_segment
+
+    store = store or face_store
+    segment = class_segment(class_id)
+    version = store.version(segment)
+
+    matcher = get_matcher(class_id)
+    if matcher is not None and getattr(matcher, "store_version", None) == version:
+        return matcher
+
+    student_ids, encodings = store.load(segment)
+    matcher = set_matcher(class_id, student_ids, encodings)
+    matcher.store_version = version
+    return matcher
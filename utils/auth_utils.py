@@ -4,6 +4,12 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from functools import wraps
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+from config import Config
+import threading
+import time
 
 db = SQLAlchemy()
 login_manager = LoginManager()
@@ -22,9 +28,118 @@ class User(UserMixin, db.Model):
     def is_student(self):
         return self.role == "student"
 
+# ---- Cached identity for Flask-Login ----
+class CachedUser(UserMixin):
+    """Read-only snapshot of a User row, kept between requests."""
+
+    def __init__(self, id, email, role, name, photo_url):
+        self.id = id
+        self.email = email
+        self.role = role
+        self.name = name
+        self.photo_url = photo_url
+
+    def is_teacher(self):
+        return self.role == "teacher"
+
+    def is_student(self):
+        return self.role == "student"
+
+
+class UserCache:
+    """Bounded LRU of CachedUser with a TTL; invalidated when a User changes."""
+
+    def __init__(self, ttl=300, maxsize=10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.entries = OrderedDict()    # user_id -> (expires_at, CachedUser)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry and entry[0] > now:
+                self.entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self.entries[user_id]
+            self.misses += 1
+            return None
+
+    def put(self, user):
+        with self.lock:
+            self.entries[user.id] = (time.monotonic() + self.ttl, user)
+            self.entries.move_to_end(user.id)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id):
+        with self.lock:
+            if self.entries.pop(user_id, None):
+                self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def counters(self):
+        return {
+            (("event", "hit"),): self.hits,
+            (("event", "miss"),): self.misses,
+            (("event", "invalidation"),): self.invalidations,
+            (("event", "size"),): len(self.entries),
+        }
+
+
+user_cache = UserCache(Config.USER_CACHE_TTL, Config.USER_CACHE_SIZE)
+
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    user_id = int(user_id)
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    row = (
+        db.session.query(User.id, User.email, User.role, User.name, User.photo_url)
+        .filter_by(id=user_id)
+        .first()
+    )
+    if row is None:
+        return None
+    return user_cache.put(CachedUser(*row))
+
+
+# changed/deleted users: drop at flush, and again after commit so a reload
+# racing the transaction cannot keep the old row cached
+@event.listens_for(OrmSession, "after_flush")
+def _collect_changed_users(session, flush_context):
+    changed = {
+        obj.id for obj in list(session.dirty) + list(session.deleted)
+        if isinstance(obj, User) and obj.id is not None
+    }
+    if changed:
+        session.info.setdefault("changed_user_ids", set()).update(changed)
+        for user_id in changed:
+            user_cache.invalidate(user_id)
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _forget_changed_users(session):
+    session.info.pop("changed_user_ids", None)
 
 
 # ---- Decorators for role based access ----
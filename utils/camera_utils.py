@@ -0,0 +1,190 @@
+# utils/camera_utils.py
+# ===============================
+# CAMERA CAPTURE PIPELINE
+# ===============================
+#
+# A producer thread reads frames as fast as the source delivers them and
+# pushes every `stride`-th frame (downscaled) into a small ring buffer.
+# Consumers (detection / recognition) always get the newest frame; anything
+# they were too slow to pick up is dropped instead of queueing, so
+# attendance never lags behind the camera.
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+try:
+    import cv2
+except ImportError:  # headless / test machines
+    cv2 = None
+
+
+# -------------------------
+# FRAME SOURCES
+# -------------------------
+class VideoSource:
+    """Camera index or video file, read through OpenCV."""
+
+    def __init__(self, target=0, realtime=False):
+        if cv2 is None:
+            raise RuntimeError("opencv-python is required for VideoSource")
+        self.cap = cv2.VideoCapture(target)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"cannot open video source {target!r}")
+        # a file is paced at its own fps when realtime=True (replays a recording)
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 0
+        self.frame_interval = 1.0 / fps if realtime and fps > 0 else 0.0
+
+    def read(self):
+        ok, frame = self.cap.read()
+        if self.frame_interval:
+            time.sleep(self.frame_interval)
+        return frame if ok else None
+
+    def close(self):
+        self.cap.release()
+
+
+class SyntheticSource:
+    """Generated frames for tests and headless machines."""
+
+    def __init__(self, width=640, height=480, fps=30, count=None):
+        self.width = width
+        self.height = height
+        self.frame_interval = 1.0 / fps if fps else 0.0
+        self.count = count
+        self.produced = 0
+
+    def read(self):
+        if self.count is not None and self.produced >= self.count:
+            return None
+        if self.frame_interval:
+            time.sleep(self.frame_interval)
+        frame = np.full((self.height, self.width, 3), self.produced % 256, dtype=np.uint8)
+        self.produced += 1
+        return frame
+
+    def close(self):
+        pass
+
+
+# -------------------------
+# LATEST-FRAME RING BUFFER
+# -------------------------
+class LatestFrameBuffer:
+    """
+    Bounded buffer of (seq, timestamp, frame). put() never blocks: when full
+    the oldest frame is dropped. get_latest() hands out the newest frame and
+    discards everything older than it.
+    """
+
+    def __init__(self, capacity=2):
+        self.frames = deque(maxlen=capacity)
+        self.cond = threading.Condition()
+        self.seq = 0
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, frame):
+        with self.cond:
+            if len(self.frames) == self.frames.maxlen:
+                self.dropped += 1
+            self.seq += 1
+            self.frames.append((self.seq, time.monotonic(), frame))
+            self.cond.notify_all()
+
+    def get_latest(self, timeout=None):
+        """Newest frame as (seq, timestamp, frame); None on timeout/close."""
+        with self.cond:
+            if not self.frames and not self.closed:
+                self.cond.wait(timeout)
+            if not self.frames:
+                return None
+            item = self.frames.pop()
+            self.dropped += len(self.frames)
+            self.frames.clear()
+            return item
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+# -------------------------
+# CAPTURE THREAD
+# -------------------------
+def downscale(frame, scale):
+    if scale >= 1.0:
+        return frame
+    if cv2 is not None:
+        return cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    step = max(1, int(round(1.0 / scale)))
+    return frame[::step, ::step]
+
+
+class CameraCapture:
+    def __init__(self, source, scale=0.5, stride=1, buffer_size=2):
+        self.source = source
+        self.scale = scale
+        self.stride = max(1, int(stride))
+        self.buffer = LatestFrameBuffer(buffer_size)
+        self.frames_read = 0
+        self.frames_skipped = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="camera-capture", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                frame = self.source.read()
+                if frame is None:
+                    break
+                self.frames_read += 1
+                if (self.frames_read - 1) % self.stride:
+                    self.frames_skipped += 1
+                    continue
+                self.buffer.put(downscale(frame, self.scale))
+        finally:
+            self.source.close()
+            self.buffer.close()
+
+    def read(self, timeout=1.0):
+        """Latest processed frame or None (timeout / source exhausted)."""
+        item = self.buffer.get_latest(timeout)
+        return item[2] if item else None
+
+    def frames(self, timeout=1.0):
+        """Iterate the newest frames until the source ends or stop() is called."""
+        while True:
+            item = self.buffer.get_latest(timeout)
+            if item is None:
+                if self.buffer.closed:
+                    return
+                continue
+            yield item
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def stats(self):
+        return {
+            "frames_read": self.frames_read,
+            "frames_skipped": self.frames_skipped,
+            "frames_dropped": self.buffer.dropped,
+            "running": self.running,
+        }
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
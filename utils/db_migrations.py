@@ -0,0 +1,200 @@
+# utils/db_migrations.py
+# ===============================
+# SCHEMA UPGRADE FOR EXISTING DATABASES
+# ===============================
+#
+# db.create_all() only creates missing tables; it never touches tables that
+# already exist in an old instance/smart.db. upgrade() brings such a file up
+# to date in place:
+#   1. adds model columns missing from old tables (nullable ones only),
+#   2. refuses to go on (DuplicateRowsError) while duplicate rows block one
+#      of the new unique indexes,
+#   3. creates every index declared on the models (IF NOT EXISTS).
+# It is idempotent and runs on every start-up.
+#
+# Duplicates are never deleted on start-up. Review and remove them explicitly:
+#   python -m utils.db_migrations dedupe --dry-run
+#   python -m utils.db_migrations dedupe
+
+import logging
+
+from sqlalchemy import inspect, text
+
+from utils.auth_utils import db
+
+log = logging.getLogger(__name__)
+
+# (table, columns that became unique, which duplicate is kept: the first by this
+# order; terms on columns an old table does not have yet are skipped)
+UNIQUE_KEYS = [
+    ("class_member", ("class_id", "student_id"),
+     ("joined_at IS NULL", "joined_at", "id")),
+    # the row with the attendance data (longest duration, closed) wins
+    ("session_attendance", ("session_id", "student_id"),
+     ("duration IS NULL", "duration DESC", "left_at IS NULL", "id")),
+]
+
+
+class DuplicateRowsError(RuntimeError):
+    """Duplicate rows block a unique index; see `python -m utils.db_migrations dedupe`."""
+
+
+def add_missing_columns(conn):
+    inspector = inspect(conn)
+    existing_tables = set(inspector.get_table_names())
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        have = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in have or not column.nullable:
+                continue
+            col_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {col_type}'))
+            log.info("added column %s.%s", table.name, column.name)
+
+
+def _duplicate_queries(conn):
+    """(table, SELECT of the ids of its duplicate rows) for every existing table."""
+    inspector = inspect(conn)
+    existing_tables = set(inspector.get_table_names())
+    for table, cols, keep_order in UNIQUE_KEYS:
+        if table not in existing_tables:
+            continue
+        have = {c["name"] for c in inspector.get_columns(table)}
+        order = ", ".join(term for term in keep_order if term.split()[0] in have)
+        yield table, (
+            f"SELECT id FROM (SELECT id, ROW_NUMBER() OVER "
+            f"(PARTITION BY {', '.join(cols)} ORDER BY {order}) AS n FROM {table}) ranked "
+            f"WHERE n > 1"
+        )
+
+
+def find_duplicates(conn):
+    """{table: ids of the rows that block its unique index}"""
+    found = {}
+    for table, query in _duplicate_queries(conn):
+        ids = [row[0] for row in conn.execute(text(query))]
+        if ids:
+            found[table] = ids
+    return found
+
+
+def remove_duplicates(conn, dry_run=False):
+    """Delete (or with dry_run only list) duplicate rows; returns find_duplicates()."""
+    found = find_duplicates(conn)
+    if not dry_run:
+        for table, query in _duplicate_queries(conn):
+            if table in found:
+                conn.execute(text(f"DELETE FROM {table} WHERE id IN ({query})"))
+                log.warning("removed %s duplicate rows from %s", len(found[table]), table)
+    return found
+
+
+def create_indexes(conn):
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def upgrade(engine):
+    with engine.begin() as conn:
+        add_missing_columns(conn)
+        duplicates = find_duplicates(conn)
+        if duplicates:
+            raise DuplicateRowsError(
+                "duplicate rows block the unique indexes ("
+                + ", ".join(f"{table}: {len(ids)}" for table, ids in duplicates.items())
+                + "); review them with `python -m utils.db_migrations dedupe --dry-run`, "
+                "then remove them with `python -m utils.db_migrations dedupe`"
+            )
+        create_indexes(conn)
+
+
+# -------------------------
+# QUERY PLAN CHECK (SQLITE)
+# -------------------------
+# The hot lookups of the API, with representative parameters.
+HOT_QUERIES = {
+    "live_session.join (attendance by session+student)":
+        "SELECT id FROM session_attendance WHERE session_id = 1 AND student_id = 1",
+    "live_session.leave (open attendance)":
+        "SELECT id FROM session_attendance "
+        "WHERE session_id = 1 AND student_id = 1 AND left_at IS NULL",
+    "presence seed (open attendances of a session)":
+        "SELECT student_id FROM session_attendance WHERE session_id = 1 AND left_at IS NULL",
+    "classes.join_class (membership)":
+        "SELECT id FROM class_member WHERE class_id = 1 AND student_id = 1",
+    "classes.student_joined (memberships of a student)":
+        "SELECT class_id FROM class_member WHERE student_id = 1",
+    "timetable.add (slot conflict)":
+        "SELECT id FROM timetable_entry WHERE class_id IN (1, 2, 3) AND day = 'Monday' "
+        "AND start_time < '10:00:00' AND end_time > '09:00:00'",
+    "timetable.student_grid (entries of classes)":
+        "SELECT id FROM timetable_entry WHERE class_id IN (1, 2, 3)",
+    "assignments.student_feed (keyset page of the student's classes)":
+        "SELECT id FROM assignment WHERE class_id IN (1, 2, 3) "
+        "AND (due_date < '2025-01-01' OR (due_date = '2025-01-01' AND id < 10)) "
+        "ORDER BY due_date DESC, id DESC LIMIT 21",
+    "assignments.student_feed (submission state)":
+        "SELECT assignment_id FROM assignment_submission WHERE student_id = 1 "
+        "AND assignment_id IN (1, 2, 3)",
+    "suggestion_engine (submissions of a class)":
+        "SELECT student_id, submitted_at FROM assignment_submission WHERE assignment_id IN (1, 2, 3)",
+    "whiteboard (log since seq N)":
+        "SELECT seq, kind, points FROM whiteboard_stroke WHERE session_id = 1 AND seq > 10 "
+        "ORDER BY seq LIMIT 501",
+    "job_queue.claim (next runnable job)":
+        "SELECT id FROM job WHERE status = 'queued' AND run_after <= '2025-01-01' "
+        "ORDER BY priority DESC, id LIMIT 1",
+    "live_session lookup by link":
+        "SELECT id FROM live_sessions WHERE session_link = 'x'",
+    "dashboard running sessions of a teacher":
+        "SELECT id FROM live_sessions WHERE teacher_id = 1 AND ended_at IS NULL",
+}
+
+
+def explain_hot_queries(engine):
+    """
+    EXPLAIN QUERY PLAN for every hot query. Returns a list of
+    (name, plan_lines, uses_index); a plan without a full table SCAN counts
+    as indexed.
+    """
+    results = []
+    with engine.connect() as conn:
+        for name, sql in HOT_QUERIES.items():
+            plan = [row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql))]
+            full_scan = any(
+                line.startswith("SCAN") and "USING" not in line for line in plan
+            )
+            results.append((name, plan, not full_scan))
+    return results
+
+
+# -------------------------
+# EXPLICIT DUPLICATE REPAIR
+# -------------------------
+# Runs without the app (create_app refuses to start while duplicates exist).
+if __name__ == "__main__":
+    import argparse
+
+    from sqlalchemy import create_engine
+
+    from config import Config
+
+    parser = argparse.ArgumentParser(prog="python -m utils.db_migrations")
+    commands = parser.add_subparsers(dest="command", required=True)
+    dedupe = commands.add_parser("dedupe", help="Remove rows that block the unique indexes.")
+    dedupe.add_argument("--dry-run", action="store_true", help="Only list them.")
+    args = parser.parse_args()
+
+    engine = create_engine(Config.SQLALCHEMY_DATABASE_URI)
+    with engine.begin() as conn:
+        found = remove_duplicates(conn, dry_run=args.dry_run)
+    for table, ids in found.items():
+        verb = "would remove" if args.dry_run else "removed"
+        print(f"{table}: {verb} {len(ids)} row(s), ids {', '.join(map(str, ids[:50]))}"
+              + (" ..." if len(ids) > 50 else ""))
+    if not found:
+        print("No duplicate rows.")
@@ -0,0 +1,232 @@
+# utils/emotion_utils.py
+# ===============================
+# EMOTION INFERENCE (MICRO-BATCHED)
+# ===============================
+#
+# Face crops from every active LiveSession go into one queue. A dispatcher
+# thread groups them into micro-batches (up to MAX_BATCH crops, or whatever
+# arrived within MAX_WAIT_MS of the first one) and runs each batch through a
+# process pool, so the model is called once per batch instead of once per
+# face. Results are routed back per crop (Future) and per session (listener).
+#
+# The model itself is pluggable: EMOTION_MODEL = "package.module:factory",
+# where factory() returns a callable mapping a (B, 48, 48) float32 batch of
+# grayscale crops in [0, 1] to (B, len(EMOTIONS)) probabilities. It is loaded
+# once per worker process.
+
+import importlib
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import numpy as np
+
+from config import Config
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+EMOTIONS = ("angry", "disgust", "fear", "happy", "sad", "surprise", "neutral")
+CROP_SIZE = 48  # FER-2013 input size
+
+
+# -------------------------
+# PREPROCESSING
+# -------------------------
+def preprocess(crop):
+    """Any HxW(xC) uint8 crop -> 48x48 float32 grayscale in [0, 1]."""
+    crop = np.asarray(crop)
+    if crop.ndim == 3:
+        if cv2 is not None:
+            crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+        else:
+            crop = crop[..., :3].mean(axis=2)
+
+    if crop.shape != (CROP_SIZE, CROP_SIZE):
+        if cv2 is not None:
+            crop = cv2.resize(crop, (CROP_SIZE, CROP_SIZE), interpolation=cv2.INTER_AREA)
+        else:
+            ys = np.linspace(0, crop.shape[0] - 1, CROP_SIZE).astype(np.intp)
+            xs = np.linspace(0, crop.shape[1] - 1, CROP_SIZE).astype(np.intp)
+            crop = crop[ys[:, None], xs[None, :]]
+
+    return crop.astype(np.float32) / 255.0
+
+
+# -------------------------
+# WORKER PROCESS SIDE
+# -------------------------
+_worker_model = None
+
+
+def load_model(spec):
+    module_name, _, attr = spec.partition(":")
+    factory = getattr(importlib.import_module(module_name), attr or "load_model")
+    return factory()
+
+
+def _init_worker(spec):
+    global _worker_model
+    _worker_model = load_model(spec)
+
+
+def _predict_batch(batch):
+    return np.asarray(_worker_model(batch), dtype=np.float32)
+
+
+# -------------------------
+# SCHEDULER
+# -------------------------
+class EmotionScheduler:
+    def __init__(self, model_spec, max_batch=32, max_wait_ms=20, workers=None):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        workers = workers or max(1, (os.cpu_count() or 2) - 1)
+
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(model_spec,),
+        )
+        # at most two batches queued per worker; beyond that the dispatcher
+        # blocks and keeps growing the next batch instead
+        self.inflight = threading.BoundedSemaphore(workers * 2)
+
+        self.queue = queue.Queue()
+        self.listeners = {}
+        self.listeners_lock = threading.Lock()
+        self.batches_run = 0
+        self.crops_run = 0
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._dispatch, name="emotion-batcher", daemon=True)
+        self._thread.start()
+
+    # ---- session routing
+    def register_session(self, session_key, callback):
+        """callback(session_key, result) is called for every crop of the session."""
+        with self.listeners_lock:
+            self.listeners[session_key] = callback
+
+    def unregister_session(self, session_key):
+        with self.listeners_lock:
+            self.listeners.pop(session_key, None)
+
+    # ---- producer side
+    def submit(self, session_key, crop):
+        future = Future()
+        self.queue.put((session_key, preprocess(crop), future))
+        return future
+
+    def submit_many(self, session_key, crops):
+        return [self.submit(session_key, c) for c in crops]
+
+    # ---- dispatcher
+    def _collect(self):
+        try:
+            first = self.queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+
+        items = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _dispatch(self):
+        while not self._stop.is_set():
+            items = self._collect()
+            if not items:
+                continue
+
+            self.inflight.acquire()
+            batch = np.stack([crop for _, crop, _ in items])
+            try:
+                job = self.pool.submit(_predict_batch, batch)
+            except RuntimeError as exc:  # pool shut down
+                self.inflight.release()
+                for _, _, future in items:
+                    future.set_exception(exc)
+                continue
+            job.add_done_callback(lambda f, items=items: self._route(items, f))
+
+    def _route(self, items, job):
+        self.inflight.release()
+        try:
+            probs = job.result()
+        except Exception as exc:
+            for _, _, future in items:
+                future.set_exception(exc)
+            return
+
+        self.batches_run += 1
+        self.crops_run += len(items)
+
+        labels = probs.argmax(axis=1)
+        for (session_key, _, future), row, label in zip(items, probs, labels):
+            result = {
+                "emotion": EMOTIONS[label],
+                "confidence": float(row[label]),
+                "scores": dict(zip(EMOTIONS, map(float, row))),
+            }
+            future.set_result(result)
+
+            with self.listeners_lock:
+                callback = self.listeners.get(session_key)
+            if callback:
+                try:
+                    callback(session_key, result)
+                except Exception:
+                    pass
+
+    def stats(self):
+        return {
+            "queued": self.queue.qsize(),
+            "batches": self.batches_run,
+            "crops": self.crops_run,
+            "avg_batch": round(self.crops_run / self.batches_run, 2) if self.batches_run else 0,
+        }
+
+    def shutdown(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+# -------------------------
+# PROCESS-WIDE INSTANCE
+# -------------------------
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Shared scheduler, or None when no EMOTION_MODEL is configured."""
+    global _scheduler
+    if _scheduler is None and Config.EMOTION_MODEL:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = EmotionScheduler(
+                    Config.EMOTION_MODEL,
+                    max_batch=Config.EMOTION_MAX_BATCH,
+                    max_wait_ms=Config.EMOTION_MAX_WAIT_MS,
+                    workers=Config.EMOTION_WORKERS,
+                )
+    return _scheduler
+
+
+def release_session(session_key):
+    """Drop a finished session's listener without starting a scheduler."""
+    if _scheduler is not None:
+        _scheduler.unregister_session(session_key)
@@ -0,0 +1,231 @@
+# utils/face_store.py
+# ===============================
+# FACE EMBEDDING STORE (ON DISK)
+# ===============================
+#
+# One append-only segment per key:
+#   user.f32 / user.i64            -> latest encoding of every registered student
+#   class_<id>.f32 / class_<id>.i64 -> encodings of the students of one classroom
+#
+# *.f32 is a raw (rows x dim) float32 matrix, *.i64 the matching student ids.
+# Readers np.memmap both files read-only, so every gunicorn worker shares the
+# same page-cache pages instead of holding its own copy. Writers append the
+# vector first and the id second; a row only becomes visible once its id is
+# on disk. Re-registering a student appends a new row (last one wins) and the
+# segment is compacted once stale rows pile up.
+#
+# Compaction writes a new generation of the pair (class_<id>.<n>.f32/.i64)
+# and then repoints <segment>.gen at it with one rename, so a reader in any
+# process sees either the old pair or the new one, never a mix. Generation 0
+# is the plain names above (no .gen file).
+
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
+
+ENCODING_DIM = 128
+USER_SEGMENT = "user"
+
+
+def class_segment(class_id):
+    return f"class_{int(class_id)}"
+
+
+class FaceEmbeddingStore:
+    def __init__(self, root, dim=ENCODING_DIM):
+        self.root = root
+        self.dim = dim
+        self._lock = threading.Lock()
+
+    # -------------------------
+    # PATHS / LOCKING
+    # -------------------------
+    def _paths(self, segment, generation=0):
+        base = os.path.join(self.root, segment)
+        if generation:
+            base = f"{base}.{generation}"
+        return base + ".f32", base + ".i64"
+
+    def _generation(self, segment):
+        """Current generation of a segment's file pair (0 without a .gen file)."""
+        try:
+            with open(os.path.join(self.root, segment + ".gen")) as fh:
+                return int(fh.read())
+        except (OSError, ValueError):
+            return 0
+
+    def _set_generation(self, segment, generation):
+        path = os.path.join(self.root, segment + ".gen")
+        with open(path + ".tmp", "w") as fh:
+            fh.write(str(generation))
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(path + ".tmp", path)
+
+    @contextmanager
+    def _write_lock(self, segment):
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock:
+            with open(os.path.join(self.root, segment + ".lock"), "a") as lf:
+                if fcntl:
+                    fcntl.flock(lf, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lf, fcntl.LOCK_UN)
+
+    def _rows_on_disk(self, segment, generation=0):
+        """Complete rows of one generation; raises OSError if its files are missing."""
+        vec_path, ids_path = self._paths(segment, generation)
+        n_ids = os.path.getsize(ids_path) // 8
+        n_vec = os.path.getsize(vec_path) // (4 * self.dim)
+        return min(n_ids, n_vec)
+
+    def version(self, segment):
+        """Cheap staleness token (pointer read + one stat) for callers that cache loads."""
+        generation = self._generation(segment)
+        _, ids_path = self._paths(segment, generation)
+        try:
+            st = os.stat(ids_path)
+        except OSError:
+            return None
+        return (generation, st.st_size)
+
+    # -------------------------
+    # READ
+    # -------------------------
+    def load(self, segment):
+        """
+        Returns (student_ids, encodings) for a segment.
+
+        Both are read-only memmaps when the segment has no superseded rows;
+        otherwise only the latest row per student is gathered.
+        """
+        while True:
+            generation = self._generation(segment)
+            try:
+                return self._load(segment, generation)
+            except FileNotFoundError:
+                if self._generation(segment) == generation:
+                    return (
+                        np.empty(0, dtype=np.int64),
+                        np.empty((0, self.dim), dtype=np.float32),
+                    )
+                # compacted between reading the pointer and opening the pair
+
+    def _load(self, segment, generation):
+        rows = self._rows_on_disk(segment, generation)
+        if rows == 0:
+            return (
+                np.empty(0, dtype=np.int64),
+                np.empty((0, self.dim), dtype=np.float32),
+            )
+
+        vec_path, ids_path = self._paths(segment, generation)
+        ids = np.memmap(ids_path, dtype=np.int64, mode="r", shape=(rows,))
+        vecs = np.memmap(vec_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+
+        latest = self._latest_rows(ids)
+        if latest is None:
+            return ids, vecs
+        return np.asarray(ids[latest]), np.asarray(vecs[latest])
+
+    @staticmethod
+    def _latest_rows(ids):
+        """Row indices of the last entry per id, or None if ids are unique."""
+        rev = np.asarray(ids[::-1])
+        _, first_in_rev = np.unique(rev, return_index=True)
+        if len(first_in_rev) == len(ids):
+            return None
+        return np.sort(len(ids) - 1 - first_in_rev)
+
+    def get(self, segment, student_id):
+        ids, vecs = self.load(segment)
+        hit = np.flatnonzero(ids == student_id)
+        if len(hit) == 0:
+            return None
+        return np.array(vecs[hit[-1]])
+
+    # -------------------------
+    # WRITE
+    # -------------------------
+    def append(self, segment, student_id, encoding):
+        vec = np.asarray(encoding, dtype=np.float32).reshape(-1)
+        if vec.shape[0] != self.dim:
+            raise ValueError(f"encoding must have {self.dim} values")
+
+        with self._write_lock(segment):
+            generation = self._generation(segment)
+            vec_path, ids_path = self._paths(segment, generation)
+            try:
+                rows = self._rows_on_disk(segment, generation)
+            except OSError:
+                rows = 0
+            # drop a torn write from a crashed writer before appending
+            for path, width in ((vec_path, 4 * self.dim), (ids_path, 8)):
+                if os.path.exists(path) and os.path.getsize(path) != rows * width:
+                    with open(path, "r+b") as fh:
+                        fh.truncate(rows * width)
+
+            with open(vec_path, "ab") as fh:
+                fh.write(vec.tobytes())
+                fh.flush()
+                os.fsync(fh.fileno())
+            with open(ids_path, "ab") as fh:
+                fh.write(np.int64(student_id).tobytes())
+
+            self._maybe_compact(segment, generation, rows + 1)
+
+    def _maybe_compact(self, segment, generation, rows):
+        if rows < 64:
+            return
+        vec_path, ids_path = self._paths(segment, generation)
+        ids = np.fromfile(ids_path, dtype=np.int64, count=rows)
+        latest = self._latest_rows(ids)
+        if latest is None or len(latest) > rows // 2:
+            return
+
+        vecs = np.fromfile(vec_path, dtype=np.float32, count=rows * self.dim)
+        vecs = vecs.reshape(rows, self.dim)[latest]
+        new_vec_path, new_ids_path = self._paths(segment, generation + 1)
+        for path, data in ((new_vec_path, vecs), (new_ids_path, ids[latest])):
+            with open(path, "wb") as fh:
+                data.tofile(fh)
+                fh.flush()
+                os.fsync(fh.fileno())
+        # the one atomic switch; readers keep their old mapping until they reload
+        self._set_generation(segment, generation + 1)
+        for path in (vec_path, ids_path):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    # -------------------------
+    # HIGH LEVEL
+    # -------------------------
+    def enroll_student(self, student_id, encoding, class_ids=()):
+        self.append(USER_SEGMENT, student_id, encoding)
+        for class_id in class_ids:
+            self.append(class_segment(class_id), student_id, encoding)
+
+    def add_student_to_class(self, class_id, student_id):
+        """Copy a registered face into a classroom segment (join_class)."""
+        encoding = self.get(USER_SEGMENT, student_id)
+        if encoding is None:
+            return False
+        self.append(class_segment(class_id), student_id, encoding)
+        return True
+
+
+face_store = FaceEmbeddingStore(Config.FACE_STORE_DIR)
@@ -0,0 +1,339 @@
+# utils/job_queue.py
+# ===============================
+# BACKGROUND JOB QUEUE (DATABASE BACKED)
+# ===============================
+#
+# Expensive work (roster imports, report builds, face enrollment) is stored as
+# a Job row and the request returns 202 with the job id right away. Workers
+# claim the oldest job of the highest priority with a conditional UPDATE
+# (status = 'queued'), so several threads or processes can share the table.
+#
+#   - tasks register with @task("kind") and run as fn(ctx, **payload)
+#   - ctx.progress(done, total, message) is visible on /api/jobs/<id>
+#   - a failing job is retried with exponential backoff up to max_attempts
+#   - a running job keeps a heartbeat; jobs whose worker died are re-queued
+#
+# Web processes run JOB_WORKER_THREADS in-process workers (started with the
+# first request); `flask jobs-worker --processes N` runs dedicated ones.
+
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, update
+
+from utils.auth_utils import db
+from models.job_models import Job
+
+log = logging.getLogger(__name__)
+
+FINISHED = ("done", "failed", "cancelled")
+
+
+# -------------------------
+# TASK REGISTRY
+# -------------------------
+TASKS = {}      # kind -> (fn, max_attempts, priority)
+
+
+def task(kind, max_attempts=3, priority=0):
+    def register(fn):
+        TASKS[kind] = (fn, max_attempts, priority)
+        return fn
+    return register
+
+
+class JobContext:
+    def __init__(self, queue, job_id, owner_id, attempt, max_attempts=1):
+        self.queue = queue
+        self.job_id = job_id
+        self.owner_id = owner_id
+        self.attempt = attempt
+        self.max_attempts = max_attempts
+        self._last_write = 0.0
+
+    @property
+    def last_attempt(self):
+        """No retry follows if this attempt fails (clean up its inputs)."""
+        return self.attempt >= self.max_attempts
+
+    def progress(self, done, total=None, message=None, force=False):
+        """Record progress (fraction, or done/total); throttled to 2 writes/s."""
+        now = time.monotonic()
+        if not force and now - self._last_write < 0.5:
+            return
+        self._last_write = now
+        fraction = done / total if total else done
+        self.queue._touch(self.job_id, progress=min(max(fraction, 0.0), 1.0), message=message)
+
+
+# -------------------------
+# QUEUE
+# -------------------------
+class JobQueue:
+    def __init__(self):
+        self.app = None
+        self.threads = []
+        self.wakeup = threading.Event()
+        self.stop = threading.Event()
+        self._lock = threading.Lock()
+        self.poll = 1.0
+        self.stale_after = 300
+        self.heartbeat = 30
+        self.retry_base = 5
+
+    def init_app(self, app):
+        self.app = app
+        self.poll = app.config.get("JOB_POLL_SECONDS", 1.0)
+        self.stale_after = app.config.get("JOB_STALE_SECONDS", 300)
+        self.heartbeat = app.config.get("JOB_HEARTBEAT_SECONDS", 30)
+        self.retry_base = app.config.get("JOB_RETRY_BASE_SECONDS", 5)
+        self.n_threads = app.config.get("JOB_WORKER_THREADS", 1)
+        app.before_request(self._ensure_threads)
+
+    def _ensure_threads(self):
+        if len(self.threads) >= self.n_threads:
+            return
+        with self._lock:
+            while len(self.threads) < self.n_threads:
+                name = f"{socket.gethostname()}:{os.getpid()}:t{len(self.threads)}"
+                t = threading.Thread(target=self._thread_main, args=(name,), name="job-worker", daemon=True)
+                t.start()
+                self.threads.append(t)
+
+    def _thread_main(self, name):
+        with self.app.app_context():
+            self.work(name)
+
+    # -------------------------
+    # PRODUCER SIDE
+    # -------------------------
+    def enqueue(self, kind, payload=None, owner_id=None, priority=None, max_attempts=None, delay=0):
+        """Store a job and return its id (commits the current session)."""
+        if kind not in TASKS:
+            raise KeyError(f"unknown job kind {kind!r}")
+        _, default_attempts, default_priority = TASKS[kind]
+
+        job = Job(
+            kind=kind,
+            payload=json.dumps(payload or {}),
+            owner_id=owner_id,
+            priority=default_priority if priority is None else priority,
+            max_attempts=default_attempts if max_attempts is None else max_attempts,
+            run_after=datetime.utcnow() + timedelta(seconds=delay)
+        )
+        db.session.add(job)
+        db.session.commit()
+        self.wakeup.set()
+        return job.id
+
+    def cancel(self, job_id):
+        """Cancel a job that has not started; True when it was cancelled."""
+        n = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == "queued")
+            .values(status="cancelled", finished_at=datetime.utcnow(), payload=None)
+        ).rowcount
+        db.session.commit()
+        return n == 1
+
+    # -------------------------
+    # WORKER SIDE
+    # -------------------------
+    def claim(self, worker):
+        """Take the next runnable job; returns the Job or None."""
+        while True:
+            now = datetime.utcnow()
+            job_id = db.session.query(Job.id).filter(
+                Job.status == "queued",
+                Job.run_after <= now
+            ).order_by(Job.priority.desc(), Job.id).limit(1).scalar()
+
+            if job_id is None:
+                db.session.rollback()
+                return None
+
+            won = db.session.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == "queued")
+                .values(
+                    status="running",
+                    worker=worker,
+                    attempts=Job.attempts + 1,
+                    started_at=now,
+                    heartbeat_at=now,
+                    error=None
+                )
+            ).rowcount
+            db.session.commit()
+            if won:
+                return db.session.get(Job, job_id)
+            # another worker got it first; try the next one
+
+    def run_one(self, worker):
+        job = self.claim(worker)
+        if job is None:
+            return False
+
+        job_id, kind, attempts, max_attempts = job.id, job.kind, job.attempts, job.max_attempts
+        payload = json.loads(job.payload or "{}")
+        ctx = JobContext(self, job_id, job.owner_id, attempts, max_attempts)
+        spec = TASKS.get(kind)
+
+        beat = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(job_id, beat), daemon=True).start()
+        try:
+            if spec is None:
+                raise LookupError(f"no task registered for {kind!r}")
+            result = spec[0](ctx, **payload)
+        except Exception as exc:
+            beat.set()
+            db.session.rollback()
+            log.exception("job %s (%s) failed, attempt %s/%s", job_id, kind, attempts, max_attempts)
+            error = "".join(traceback.format_exception_only(type(exc), exc)).strip()
+            if spec is not None and attempts < max_attempts:
+                values = dict(
+                    status="queued",
+                    run_after=datetime.utcnow() + timedelta(seconds=self.retry_base * 2 ** (attempts - 1)),
+                    error=error, worker=None
+                )
+            else:
+                values = dict(status="failed", error=error, finished_at=datetime.utcnow(), payload=None)
+            db.session.execute(update(Job).where(Job.id == job_id).values(**values))
+            db.session.commit()
+            return True
+
+        beat.set()
+        db.session.execute(
+            update(Job).where(Job.id == job_id).values(
+                status="done",
+                progress=1.0,
+                result=json.dumps(result) if result is not None else None,
+                finished_at=datetime.utcnow(),
+                payload=None
+            )
+        )
+        db.session.commit()
+        return True
+
+    def recover_stale(self):
+        """Re-queue jobs whose worker stopped sending heartbeats."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        stale = Job.status == "running", Job.heartbeat_at < cutoff
+        retried = db.session.execute(
+            update(Job).where(*stale, Job.attempts < Job.max_attempts)
+            .values(status="queued", worker=None, error="worker stopped responding")
+        ).rowcount
+        failed = db.session.execute(
+            update(Job).where(*stale)
+            .values(status="failed", error="worker stopped responding",
+                    finished_at=datetime.utcnow(), payload=None)
+        ).rowcount
+        db.session.commit()
+        return retried + failed
+
+    def work(self, worker, max_jobs=None):
+        """Worker loop (needs an app context)."""
+        done = 0
+        last_recover = 0.0
+        while not self.stop.is_set():
+            if time.monotonic() - last_recover > self.stale_after / 2:
+                last_recover = time.monotonic()
+                try:
+                    self.recover_stale()
+                except Exception:
+                    db.session.rollback()
+                    log.exception("recovering stale jobs failed")
+            try:
+                ran = self.run_one(worker)
+            except Exception:
+                db.session.rollback()
+                log.exception("job worker %s error", worker)
+                ran = False
+            finally:
+                db.session.remove()
+
+            if ran:
+                done += 1
+                if max_jobs is not None and done >= max_jobs:
+                    return done
+                continue
+            self.wakeup.wait(self.poll)
+            self.wakeup.clear()
+        return done
+
+    # -------------------------
+    # HEARTBEAT / PROGRESS (own connection, never the task's transaction)
+    # -------------------------
+    def _touch(self, job_id, **values):
+        values["heartbeat_at"] = datetime.utcnow()
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(update(Job).where(Job.id == job_id, Job.status == "running").values(**values))
+        except Exception:
+            log.warning("could not update job %s", job_id, exc_info=True)
+
+    def _heartbeat(self, job_id, stop):
+        with self.app.app_context():
+            while not stop.wait(self.heartbeat):
+                self._touch(job_id)
+
+    # -------------------------
+    # STATUS
+    # -------------------------
+    @staticmethod
+    def describe(job):
+        return {
+            "id": job.id,
+            "kind": job.kind,
+            "status": job.status,
+            "progress": round(job.progress or 0.0, 3),
+            "message": job.message,
+            "attempts": job.attempts,
+            "max_attempts": job.max_attempts,
+            "result": json.loads(job.result) if job.result else None,
+            "error": job.error,
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+            "started_at": job.started_at.isoformat() if job.started_at else None,
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None
+        }
+
+    def counts(self):
+        rows = db.session.query(Job.status, func.count(Job.id)).group_by(Job.status).all()
+        return {(("status", status),): n for status, n in rows}
+
+
+job_queue = JobQueue()
+
+
+# -------------------------
+# DEDICATED WORKER PROCESSES
+# -------------------------
+def _worker_process(index):
+    from app import app     # builds the app (and registers the tasks) in the child
+
+    with app.app_context():
+        job_queue.work(f"{socket.gethostname()}:{os.getpid()}:p{index}")
+
+
+def run_worker_processes(processes=1):
+    if processes <= 1:
+        _worker_process(0)
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    children = [ctx.Process(target=_worker_process, args=(i,), daemon=False) for i in range(processes)]
+    for p in children:
+        p.start()
+    try:
+        for p in children:
+            p.join()
+    except KeyboardInterrupt:
+        for p in children:
+            p.terminate()
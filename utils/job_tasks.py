@@ -0,0 +1,98 @@
+# utils/job_tasks.py
+# ===============================
+# BACKGROUND JOB TASKS
+# ===============================
+#
+# Everything registered here can be enqueued with job_queue.enqueue(kind, payload).
+# Payloads are JSON; files travel as paths on the local upload store.
+
+import json
+import os
+import tempfile
+from collections import Counter
+
+from utils.auth_utils import db
+from utils.face_store import face_store
+from utils.job_queue import task
+from utils.report_utils import attendance_matrix, EXPORTS
+from utils.roster_utils import import_roster
+from utils.upload_store import upload_store
+from models.classroom_models import ClassMember, Classroom
+
+MAX_REPORTED_ROWS = 200
+
+
+# -------------------------
+# ROSTER IMPORT
+# -------------------------
+@task("roster_import", max_attempts=2)
+def roster_import_task(ctx, rows_path=None, class_id=None, rows=None):
+    """rows_path: JSON rows with plaintext passwords, deleted once the job is over."""
+    done = False
+    try:
+        if rows is None:
+            with open(rows_path, encoding="utf-8") as fh:
+                rows = json.load(fh)
+        counts = Counter()
+        problems = []
+        for n, result in enumerate(import_roster(rows, class_id=class_id), start=1):
+            counts[result["status"]] += 1
+            if result["status"] not in ("created", "exists") and len(problems) < MAX_REPORTED_ROWS:
+                problems.append(result)
+            ctx.progress(n, len(rows), f"{n}/{len(rows)} rows")
+        done = True
+    finally:
+        # kept for the retry of a failed attempt (re-importing skips existing emails)
+        if rows_path and (done or ctx.last_attempt) and os.path.exists(rows_path):
+            os.unlink(rows_path)
+    return {"counts": dict(counts), "problems": problems}
+
+
+# -------------------------
+# ATTENDANCE REPORT FILE
+# -------------------------
+@task("attendance_report", priority=-1)
+def attendance_report_task(ctx, class_id, fmt="xlsx"):
+    chunks, _ = EXPORTS[fmt]
+    classroom = db.session.get(Classroom, class_id)
+    total = db.session.query(ClassMember.id).filter_by(class_id=class_id).count() or 1
+
+    def rows():
+        for n, row in enumerate(attendance_matrix(class_id)):
+            if n:
+                ctx.progress(n, total, f"{n} students")
+            yield row
+
+    fd, path = tempfile.mkstemp(dir=upload_store.tmp_dir(), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in chunks(rows()):
+                out.write(chunk.encode() if isinstance(chunk, str) else chunk)
+        stored = upload_store.commit_path(path, f"attendance_{classroom.class_name}.{fmt}")
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+    return {"file_url": stored.url, "size": stored.size}
+
+
+# -------------------------
+# FACE ENROLLMENT FROM A PHOTO
+# -------------------------
+@task("face_enroll", max_attempts=1, priority=1)     # the photo is gone after one try
+def face_enroll_task(ctx, student_id, image_path):
+    ctx.progress(0.1, message="detecting face", force=True)
+    try:
+        import face_recognition
+        encodings = face_recognition.face_encodings(face_recognition.load_image_file(image_path))
+    finally:
+        # uploaded faces are never kept, whatever happened
+        if os.path.exists(image_path):
+            os.unlink(image_path)
+    if len(encodings) != 1:
+        return {"enrolled": False, "error": "exactly one face must be visible in the photo"}
+
+    class_ids = [
+        c[0] for c in db.session.query(ClassMember.class_id).filter_by(student_id=student_id)
+    ]
+    face_store.enroll_student(student_id, encodings[0], class_ids)
+    return {"enrolled": True, "classes_updated": len(class_ids)}
@@ -0,0 +1,155 @@
+# utils/live_stats.py
+# ===============================
+# ROLLING LIVE SESSION STATS
+# ===============================
+#
+# Per LiveSession sliding-window aggregates for presence, attention and
+# emotion distribution. Each window is a fixed ring of time buckets, so
+# memory per session is constant and reading a window touches only the
+# bucket ring (no event history is ever kept or scanned).
+
+import threading
+import time
+
+from utils.emotion_utils import EMOTIONS
+
+WINDOW_SECONDS = 300
+BUCKET_SECONDS = 5
+
+
+class RollingWindow:
+    """count / sum / per-label counts over the last `window` seconds."""
+
+    def __init__(self, window=WINDOW_SECONDS, bucket=BUCKET_SECONDS, labels=()):
+        self.bucket = bucket
+        self.size = max(1, int(window // bucket))
+        self.labels = {label: i for i, label in enumerate(labels)}
+
+        self.slots = [-1] * self.size          # bucket number held by each slot
+        self.counts = [0] * self.size
+        self.sums = [0.0] * self.size
+        self.label_counts = [[0] * len(labels) for _ in range(self.size)]
+
+    def _slot(self, now):
+        number = int(now // self.bucket)
+        i = number % self.size
+        if self.slots[i] != number:             # slot is from an older lap: recycle
+            self.slots[i] = number
+            self.counts[i] = 0
+            self.sums[i] = 0.0
+            row = self.label_counts[i]
+            for j in range(len(row)):
+                row[j] = 0
+        return i
+
+    def add(self, value=1.0, label=None, now=None):
+        i = self._slot(time.time() if now is None else now)
+        self.counts[i] += 1
+        self.sums[i] += value
+        if label is not None and label in self.labels:
+            self.label_counts[i][self.labels[label]] += 1
+
+    def totals(self, now=None):
+        now = time.time() if now is None else now
+        oldest = int(now // self.bucket) - self.size + 1
+
+        count, total = 0, 0.0
+        labels = [0] * len(self.labels)
+        for i in range(self.size):
+            if self.slots[i] >= oldest:
+                count += self.counts[i]
+                total += self.sums[i]
+                for j, c in enumerate(self.label_counts[i]):
+                    labels[j] += c
+        return count, total, labels
+
+
+class SessionStats:
+    def __init__(self, present=0, window=WINDOW_SECONDS, bucket=BUCKET_SECONDS):
+        self.lock = threading.Lock()
+        self.window = window
+        self.present = present
+        self.peak_present = present
+        self.joins = RollingWindow(window, bucket)
+        self.leaves = RollingWindow(window, bucket)
+        self.attention = RollingWindow(window, bucket)
+        self.emotions = RollingWindow(window, bucket, labels=EMOTIONS)
+
+    def record_join(self):
+        with self.lock:
+            self.present += 1
+            self.peak_present = max(self.peak_present, self.present)
+            self.joins.add()
+
+    def record_leave(self):
+        with self.lock:
+            self.present = max(0, self.present - 1)
+            self.leaves.add()
+
+    def record_attention(self, score):
+        with self.lock:
+            self.attention.add(min(1.0, max(0.0, float(score))))
+
+    def record_emotion(self, label, confidence=1.0):
+        with self.lock:
+            self.emotions.add(confidence, label=label)
+
+    def snapshot(self):
+        with self.lock:
+            joins = self.joins.totals()[0]
+            leaves = self.leaves.totals()[0]
+            att_n, att_sum, _ = self.attention.totals()
+            emo_n, _, emo_counts = self.emotions.totals()
+            present, peak = self.present, self.peak_present
+
+        return {
+            "present": present,
+            "peak_present": peak,
+            "joins": joins,
+            "leaves": leaves,
+            "attention": round(att_sum / att_n, 3) if att_n else 0,
+            "attention_samples": att_n,
+            "emotions": {
+                label: round(c / emo_n, 3) if emo_n else 0
+                for label, c in zip(EMOTIONS, emo_counts)
+            },
+            "emotion_samples": emo_n,
+            "window_seconds": self.window,
+        }
+
+
+# -------------------------
+# REGISTRY (KEYED BY session_link)
+# -------------------------
+class LiveStatsRegistry:
+    def __init__(self):
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def get(self, session_link, seed_present=None):
+        """
+        Stats of a session. seed_present() (e.g. a COUNT of open attendance
+        rows) is only called the first time this process sees the session.
+        """
+        stats = self.sessions.get(session_link)
+        if stats is None:
+            present = seed_present() if seed_present else 0
+            with self.lock:
+                stats = self.sessions.setdefault(session_link, SessionStats(present))
+        return stats
+
+    def peek(self, session_link):
+        return self.sessions.get(session_link)
+
+    def drop(self, session_link):
+        with self.lock:
+            self.sessions.pop(session_link, None)
+
+    def record_emotion_result(self, session_link, result):
+        """Listener signature used by EmotionScheduler.register_session()."""
+        stats = self.sessions.get(session_link)
+        if stats:
+            stats.record_emotion(result["emotion"], result.get("confidence", 1.0))
+
+
+live_stats = LiveStatsRegistry()
@@ -0,0 +1,253 @@
+# utils/metrics.py
+# ===============================
+# REQUEST / SQL METRICS
+# ===============================
+#
+# Per request: wall time, number of SQL statements and total SQL time, taken
+# from SQLAlchemy cursor events. Aggregated per endpoint (smart_request_*) and
+# per blueprint (smart_blueprint_request_*, a separate family so sum() over
+# either counts each request once) in fixed-bucket histograms (a few integer
+# increments per request) and exposed in Prometheus text format on
+# /debug/metrics. Requests slower than
+# SLOW_REQUEST_MS are logged together with their statements (SQL text with
+# placeholders, never the bound parameters).
+#
+# /debug/metrics is denied by default: it answers only with METRICS_TOKEN as
+# a bearer token, or without one in debug mode; otherwise it is a 404.
+#
+# The time a request spends in all of these hooks (before_request, every
+# cursor event, the final recording) is itself recorded per request
+# (smart_metrics_overhead_seconds) so the cost of leaving this on is visible.
+
+import bisect
+import hmac
+import logging
+import threading
+import time
+
+from flask import g, request, has_request_context, Response, abort, current_app
+from sqlalchemy import event
+
+from utils.auth_utils import db
+
+log = logging.getLogger("smart.slow_requests")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+OVERHEAD_BUCKETS = (0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005)
+
+MAX_KEPT_STATEMENTS = 50
+
+# metric name prefix of each aggregation
+FAMILIES = (("endpoint", "smart_request"), ("blueprint", "smart_blueprint_request"))
+
+
+def label_set(labels, **extra):
+    pairs = list(labels.items()) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)     # last slot = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, labels):
+        lines, cumulative = [], 0
+        for bound, c in zip(self.buckets, self.counts):
+            cumulative += c
+            lines.append(f"{name}_bucket{label_set(labels, le=bound)} {cumulative}")
+        lines.append(f'{name}_bucket{label_set(labels, le="+Inf")} {self.count}')
+        lines.append(f"{name}_sum{label_set(labels)} {self.sum:.6f}")
+        lines.append(f"{name}_count{label_set(labels)} {self.count}")
+        return lines
+
+
+class EndpointStats:
+    __slots__ = ("latency", "sql_count", "sql_time", "statuses")
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.sql_count = Histogram(SQL_COUNT_BUCKETS)
+        self.sql_time = Histogram(LATENCY_BUCKETS)
+        self.statuses = {}
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}         # ("endpoint"|"blueprint", name) -> EndpointStats
+        self.overhead = Histogram(OVERHEAD_BUCKETS)
+        self.gauges = {}            # name -> (help, type, callable returning {labels_tuple: value})
+        self.slow_threshold = 0.5
+
+    # -------------------------
+    # SETUP
+    # -------------------------
+    def init_app(self, app):
+        if not app.config.get("METRICS_ENABLED", True):
+            return
+        self.slow_threshold = app.config.get("SLOW_REQUEST_MS", 500) / 1000.0
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+        with app.app_context():
+            event.listen(db.engine, "before_cursor_execute", self._before_cursor)
+            event.listen(db.engine, "after_cursor_execute", self._after_cursor)
+
+        @app.route("/debug/metrics")
+        def debug_metrics():
+            token = current_app.config.get("METRICS_TOKEN")
+            if token:
+                given = request.headers.get("Authorization", "")
+                if not hmac.compare_digest(given.encode(), f"Bearer {token}".encode()):
+                    abort(403)
+            elif not current_app.debug:
+                abort(404)
+            return Response(self.render(), mimetype="text/plain; version=0.0.4")
+
+    def register_gauge(self, name, help_text, collect, metric_type="gauge"):
+        """collect() -> {(("label", "value"), ...): number}"""
+        self.gauges[name] = (help_text, metric_type, collect)
+
+    # -------------------------
+    # REQUEST HOOKS
+    # -------------------------
+    def _before_request(self):
+        t0 = time.perf_counter()
+        m = g._metrics = {
+            "start": t0,
+            "sql_count": 0,
+            "sql_time": 0.0,
+            "statements": [],
+            "overhead": 0.0,
+            "done": False,
+        }
+        m["overhead"] = time.perf_counter() - t0
+
+    def _after_request(self, response):
+        self._record(response.status_code)
+        return response
+
+    def _teardown_request(self, exc):
+        # after_request is skipped when the view raised
+        self._record(500)
+
+    def _record(self, status):
+        m = g.get("_metrics")
+        if m is None or m["done"]:
+            return
+        m["done"] = True
+
+        t0 = time.perf_counter()
+        wall = t0 - m["start"]
+        endpoint = request.endpoint or "<unmatched>"
+        blueprint = request.blueprint or "<app>"
+
+        with self.lock:
+            for key in (("endpoint", endpoint), ("blueprint", blueprint)):
+                stats = self.endpoints.get(key)
+                if stats is None:
+                    stats = self.endpoints[key] = EndpointStats()
+                stats.latency.observe(wall)
+                stats.sql_count.observe(m["sql_count"])
+                stats.sql_time.observe(m["sql_time"])
+                stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+        if wall >= self.slow_threshold:
+            worst = sorted(m["statements"], key=lambda s: -s[1])[:10]
+            log.warning(
+                "slow request %s %s (%s) %.0f ms, %d SQL statements / %.0f ms%s",
+                request.method, request.path, endpoint, wall * 1000,
+                m["sql_count"], m["sql_time"] * 1000,
+                "".join(f"\n  {d * 1000:7.1f} ms  {' '.join(sql.split())[:300]}" for sql, d in worst)
+            )
+
+        spent = m["overhead"] + time.perf_counter() - t0
+        with self.lock:
+            self.overhead.observe(spent)
+
+    # -------------------------
+    # SQLALCHEMY HOOKS
+    # -------------------------
+    def _before_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        t0 = time.perf_counter()
+        conn.info.setdefault("_metrics_t0", []).append(t0)
+        if has_request_context():
+            m = g.get("_metrics")
+            if m is not None:
+                m["overhead"] += time.perf_counter() - t0
+
+    def _after_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        t0 = time.perf_counter()
+        stack = conn.info.get("_metrics_t0")
+        if not stack:
+            return
+        elapsed = t0 - stack.pop()
+
+        if not has_request_context():
+            return      # background threads (attendance flush, workers)
+        m = g.get("_metrics")
+        if m is None:
+            return
+        m["sql_count"] += 1
+        m["sql_time"] += elapsed
+        if len(m["statements"]) < MAX_KEPT_STATEMENTS:
+            m["statements"].append((statement, elapsed))
+        m["overhead"] += time.perf_counter() - t0
+
+    # -------------------------
+    # PROMETHEUS TEXT
+    # -------------------------
+    def render(self):
+        out = []
+        with self.lock:
+            items = sorted(self.endpoints.items())
+
+            for kind, prefix in FAMILIES:
+                family = [(name, stats) for (k, name), stats in items if k == kind]
+                for suffix, attr, help_text in (
+                    ("duration_seconds", "latency", "Request wall time"),
+                    ("sql_statements", "sql_count", "SQL statements per request"),
+                    ("sql_seconds", "sql_time", "SQL time per request"),
+                ):
+                    metric = f"{prefix}_{suffix}"
+                    out.append(f"# HELP {metric} {help_text}, by {kind}")
+                    out.append(f"# TYPE {metric} histogram")
+                    for name, stats in family:
+                        out.extend(getattr(stats, attr).render(metric, {kind: name}))
+
+                metric = f"{prefix}s_total"
+                out.append(f"# HELP {metric} Requests by status, by {kind}")
+                out.append(f"# TYPE {metric} counter")
+                for name, stats in family:
+                    for status, n in sorted(stats.statuses.items()):
+                        out.append(f"{metric}{label_set({kind: name}, status=status)} {n}")
+
+            out.append("# HELP smart_metrics_overhead_seconds Time spent recording request metrics")
+            out.append("# TYPE smart_metrics_overhead_seconds histogram")
+            out.extend(self.overhead.render("smart_metrics_overhead_seconds", {}))
+
+        for name, (help_text, metric_type, collect) in sorted(self.gauges.items()):
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {metric_type}")
+            for labels, value in collect().items():
+                out.append(f"{name}{label_set(dict(labels))} {value}")
+
+        return "\n".join(out) + "\n"
+
+
+metrics = RequestMetrics()
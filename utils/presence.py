@@ -0,0 +1,140 @@
+# utils/presence.py
+# ===============================
+# LIVE SESSION PRESENCE REGISTRY
+# ===============================
+#
+# In-process roster per session_link, updated by join/leave, with a fan-out
+# of joined/left deltas to every connected teacher stream (SSE). Teachers get
+# one snapshot on connect and then only deltas, instead of polling the DB.
+#
+# The registry lives in the web process: run the app with a single worker
+# process (threads/gevent for concurrency) or route a session's requests to
+# the same worker.
+
+import json
+import queue
+import threading
+import time
+
+SUBSCRIBER_BUFFER = 256
+
+
+class SessionPresence:
+    def __init__(self, roster=None):
+        self.roster = dict(roster or {})    # student_id -> {"id", "name", "joined_at"}
+        self.subscribers = set()
+        self.seq = 0
+
+
+class PresenceRegistry:
+    def __init__(self):
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def get(self, session_link, seed_roster=None):
+        """Presence of a session; seed_roster() runs once per process."""
+        presence = self.sessions.get(session_link)
+        if presence is None:
+            roster = seed_roster() if seed_roster else {}
+            with self.lock:
+                presence = self.sessions.setdefault(session_link, SessionPresence(roster))
+        return presence
+
+    # -------------------------
+    # UPDATES
+    # -------------------------
+    def _publish(self, presence, event):
+        presence.seq += 1
+        event["seq"] = presence.seq
+        event["present"] = len(presence.roster)
+        for q in list(presence.subscribers):
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                # slow client: throw its backlog away and make it resync
+                with q.mutex:
+                    q.queue.clear()
+                q.put_nowait({"type": "resync"})
+
+    def join(self, session_link, student, seed_roster=None):
+        presence = self.get(session_link, seed_roster)
+        with self.lock:
+            if student["id"] in presence.roster:
+                return
+            presence.roster[student["id"]] = student
+            self._publish(presence, {"type": "joined", "student": student})
+
+    def leave(self, session_link, student_id, seed_roster=None):
+        presence = self.get(session_link, seed_roster)
+        with self.lock:
+            if presence.roster.pop(student_id, None) is None:
+                return
+            self._publish(presence, {"type": "left", "student_id": student_id})
+
+    def end(self, session_link):
+        with self.lock:
+            presence = self.sessions.pop(session_link, None)
+            if presence:
+                presence.roster.clear()
+                self._publish(presence, {"type": "ended"})
+
+    # -------------------------
+    # SUBSCRIPTIONS
+    # -------------------------
+    def subscribe(self, session_link, seed_roster=None):
+        presence = self.get(session_link, seed_roster)
+        q = queue.Queue(maxsize=SUBSCRIBER_BUFFER)
+        with self.lock:
+            presence.subscribers.add(q)
+        return q
+
+    def unsubscribe(self, session_link, q):
+        with self.lock:
+            presence = self.sessions.get(session_link)
+            if presence:
+                presence.subscribers.discard(q)
+
+    def snapshot(self, session_link):
+        with self.lock:
+            presence = self.sessions.get(session_link)
+            if not presence:
+                return {"type": "snapshot", "seq": 0, "present": 0, "students": []}
+            return {
+                "type": "snapshot",
+                "seq": presence.seq,
+                "present": len(presence.roster),
+                "students": list(presence.roster.values()),
+            }
+
+
+presence_registry = PresenceRegistry()
+
+
+def sse_format(event, name=None):
+    lines = []
+    if name:
+        lines.append(f"event: {name}")
+    lines.append("data: " + json.dumps(event, default=str))
+    return "\n".join(lines) + "\n\n"
+
+
+def event_stream(session_link, q, heartbeat=15):
+    """SSE generator: snapshot, then deltas, with keep-alive comments."""
+    try:
+        yield sse_format(presence_registry.snapshot(session_link))
+        while True:
+            try:
+                event = q.get(timeout=heartbeat)
+            except queue.Empty:
+                yield f": ping {int(time.time())}\n\n"
+                continue
+
+            if event["type"] == "resync":
+                yield sse_format(presence_registry.snapshot(session_link))
+                continue
+
+            yield sse_format(event)
+            if event["type"] == "ended":
+                return
+    finally:
+        presence_registry.unsubscribe(session_link, q)
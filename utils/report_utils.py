@@ -0,0 +1,238 @@
+# utils/report_utils.py
+# ===============================
+# ATTENDANCE REPORT EXPORT (CSV / XLSX)
+# ===============================
+#
+# A class's attendance matrix: one row per student, one column per live
+# session (minutes attended), plus sessions attended and total minutes.
+#
+# Only the session header is held in memory. Students and attendance rows
+# are read with yield_per (a server-side cursor on Postgres), both ordered by
+# student id, and merged row by row, so a full year of sessions streams with
+# flat memory. Both formats are generators for a streamed Response; the
+# header row is the first chunk out.
+#
+# XLSX is a zip of a few XML parts. zipfile writes to a non-seekable sink
+# (data descriptors instead of seeking back), and the sheet is deflated as it
+# is produced, so the file is never assembled in memory either.
+
+import csv
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from sqlalchemy import select, union
+
+from utils.auth_utils import db, User
+from models.classroom_models import ClassMember, LiveSession, SessionAttendance
+
+YIELD_PER = 1000
+FLUSH_BYTES = 64 * 1024
+
+
+# -------------------------
+# MATRIX
+# -------------------------
+def class_sessions(class_id):
+    """[(session_id, started_at, ended_at)] oldest first."""
+    return db.session.execute(
+        select(LiveSession.id, LiveSession.started_at, LiveSession.ended_at)
+        .where(LiveSession.class_id == class_id)
+        .order_by(LiveSession.started_at, LiveSession.id)
+    ).all()
+
+
+def attended_seconds(joined_at, left_at, duration, ended_at):
+    if duration is not None:
+        return duration
+    end = left_at or ended_at
+    if end is None or joined_at is None:
+        return None         # still in a running session
+    return max(int((end - joined_at).total_seconds()), 0)
+
+
+def attendance_matrix(class_id):
+    """
+    Yields the header and then one row per student:
+    ["Student", "Email", <session start>..., "Sessions attended", "Total minutes"]
+    """
+    sessions = class_sessions(class_id)
+    column = {sid: i for i, (sid, _, _) in enumerate(sessions)}
+    ended = {sid: ended_at for sid, _, ended_at in sessions}
+
+    yield (
+        ["Student", "Email"]
+        + [started.strftime("%Y-%m-%d %H:%M") if started else f"Session {sid}" for sid, started, _ in sessions]
+        + ["Sessions attended", "Total minutes"]
+    )
+
+    session_ids = select(LiveSession.id).where(LiveSession.class_id == class_id)
+    student_ids = union(
+        select(ClassMember.student_id).where(ClassMember.class_id == class_id),
+        select(SessionAttendance.student_id).where(SessionAttendance.session_id.in_(session_ids))
+    ).subquery()
+
+    students = db.session.execute(
+        select(User.id, User.name, User.email)
+        .where(User.id.in_(select(student_ids.c[0])))
+        .order_by(User.id)
+        .execution_options(yield_per=YIELD_PER)
+    )
+    attendance = db.session.execute(
+        select(
+            SessionAttendance.student_id,
+            SessionAttendance.session_id,
+            SessionAttendance.joined_at,
+            SessionAttendance.left_at,
+            SessionAttendance.duration
+        )
+        .where(SessionAttendance.session_id.in_(session_ids))
+        .order_by(SessionAttendance.student_id)
+        .execution_options(yield_per=YIELD_PER)
+    )
+
+    pending = next(attendance, None)
+    for student_id, name, email in students:
+        cells = [None] * len(sessions)
+        attended, total = 0, 0
+
+        # both streams are ordered by student id: consume this student's rows
+        while pending is not None and pending.student_id <= student_id:
+            if pending.student_id == student_id:
+                seconds = attended_seconds(
+                    pending.joined_at, pending.left_at, pending.duration, ended[pending.session_id]
+                )
+                attended += 1
+                if seconds is not None:
+                    cells[column[pending.session_id]] = round(seconds / 60, 1)
+                    total += seconds
+                else:
+                    cells[column[pending.session_id]] = "present"
+            pending = next(attendance, None)
+
+        yield [name or "", email] + cells + [attended, round(total / 60, 1)]
+
+
+# -------------------------
+# CSV
+# -------------------------
+def csv_chunks(rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    first = True
+    for row in rows:
+        writer.writerow(["" if v is None else v for v in row])
+        if first or buf.tell() >= FLUSH_BYTES:
+            first = False
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+# -------------------------
+# XLSX
+# -------------------------
+_INVALID_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Attendance" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetData>'
+)
+SHEET_END = '</sheetData></worksheet>'
+
+
+def xlsx_cell(value):
+    if value is None:
+        return "<c/>"
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f"<c><v>{value}</v></c>"
+    text = escape(_INVALID_XML.sub("", str(value)))
+    return f'<c t="inlineStr"><is><t>{text}</t></is></c>'
+
+
+class _Sink:
+    """Write-only file object for zipfile; hands out what was written so far."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def xlsx_chunks(rows):
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", CONTENT_TYPES)
+        zf.writestr("_rels/.rels", ROOT_RELS)
+        zf.writestr("xl/workbook.xml", WORKBOOK)
+        zf.writestr("xl/_rels/workbook.xml.rels", WORKBOOK_RELS)
+        yield sink.drain()
+
+        with zf.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write(SHEET_START.encode())
+            pending = 0
+            for row in rows:
+                line = ("<row>" + "".join(xlsx_cell(v) for v in row) + "</row>").encode()
+                sheet.write(line)
+                pending += len(line)
+                if pending >= FLUSH_BYTES:
+                    pending = 0
+                    data = sink.drain()
+                    if data:
+                        yield data
+            sheet.write(SHEET_END.encode())
+    yield sink.drain()
+
+
+EXPORTS = {
+    "csv": (csv_chunks, "text/csv"),     # werkzeug adds "; charset=utf-8"
+    "xlsx": (xlsx_chunks, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
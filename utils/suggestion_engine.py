@@ -0,0 +1,503 @@
+# utils/suggestion_engine.py
+# ===============================
+# AT-RISK STUDENTS & SUGGESTED INTERVENTIONS (VECTORIZED)
+# ===============================
+#
+# Every classroom becomes a set of dense matrices, built from five bulk column
+# queries (no ORM objects, dates converted to epoch seconds by the database):
+#   students x ended sessions   present (bool), seconds in session (float32)
+#   students x assignments      submitted (bool), days late (float32)
+# Scoring is whole-matrix NumPy arithmetic, so a class of 30 or a school of
+# 5,000 students costs the same handful of Python steps per class.
+#
+# Matrices are cached per class with a fingerprint (count / max id of members,
+# ended sessions, assignments and submissions) read with four GROUP BY
+# queries. A class is reloaded only when its fingerprint moved, i.e. it got a
+# new session, assignment, submission or member; fingerprints are re-checked
+# at most every SUGGESTION_CHECK_SECONDS.
+#
+# `python -m utils.suggestion_engine [students]` benchmarks a synthetic school.
+
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import func, select
+
+from config import Config
+from models.assignment_models import Assignment, AssignmentSubmission
+from models.classroom_models import ClassMember, LiveSession, SessionAttendance
+
+DAY = 86400.0
+CLASS_BATCH = 200           # classes loaded per round of bulk queries
+
+RECENT_HALF_LIFE = 5        # sessions; a session's weight halves every 5 sessions back
+STREAK_FULL = 6             # missed sessions in a row that max out the streak term
+LATE_GRACE_DAYS = 0.0
+
+# risk = weighted sum of terms in 0..1
+WEIGHTS = {
+    "attendance": 0.35,     # 1 - recency weighted attendance rate
+    "streak": 0.15,         # sessions missed since the last one attended
+    "time": 0.10,           # 1 - share of the session actually present
+    "missing": 0.30,        # missing / due assignments
+    "late": 0.10,           # late / submitted assignments
+}
+LEVELS = ((0.5, "high"), (0.3, "medium"), (0.0, "low"))
+MIN_RISK = 0.3
+
+
+def epoch(conn, column):
+    """Seconds since 1970 of a (naive UTC) DateTime column, computed in SQL."""
+    if conn.dialect.name == "postgresql":
+        return func.extract("epoch", column)
+    return (func.julianday(column) - 2440587.5) * DAY
+
+
+# -------------------------
+# FINGERPRINTS
+# -------------------------
+_sub = AssignmentSubmission
+
+FINGERPRINTS = (
+    (ClassMember.class_id,
+     select(ClassMember.class_id, func.count(ClassMember.id), func.max(ClassMember.id))
+     .group_by(ClassMember.class_id)),
+    (LiveSession.class_id,
+     select(LiveSession.class_id, func.count(LiveSession.id), func.max(LiveSession.id))
+     .where(LiveSession.ended_at.isnot(None))
+     .group_by(LiveSession.class_id)),
+    (Assignment.class_id,
+     select(Assignment.class_id, func.count(Assignment.id), func.max(Assignment.id))
+     .where(Assignment.class_id.isnot(None))
+     .group_by(Assignment.class_id)),
+    (Assignment.class_id,
+     select(Assignment.class_id, func.count(_sub.id), func.max(_sub.id))
+     .join(_sub, _sub.assignment_id == Assignment.id)
+     .where(Assignment.class_id.isnot(None))
+     .group_by(Assignment.class_id)),
+)
+EMPTY = (0, None) * len(FINGERPRINTS)
+
+
+def fingerprints(conn, class_ids=None):
+    """class_id -> (count, max id) of members, ended sessions, assignments, submissions."""
+    found = {}
+    for i, (class_col, query) in enumerate(FINGERPRINTS):
+        if class_ids is not None:
+            query = query.where(class_col.in_(class_ids))
+        for class_id, n, last in conn.execute(query):
+            found.setdefault(class_id, list(EMPTY))[2 * i:2 * i + 2] = n, last
+    return {c: tuple(v) for c, v in found.items()}
+
+
+# -------------------------
+# MATRICES
+# -------------------------
+def _array(conn, query, columns):
+    # driver tuples: numbers only, and numpy would probe Row objects key by key
+    rows = conn.execute(query).cursor.fetchall()
+    return np.array(rows, dtype=np.float64).reshape(-1, columns)
+
+
+def _split(rows, class_ids):
+    """{class_id: rows of that class}; column 0 is the class, order inside a class is kept."""
+    rows = rows[np.argsort(rows[:, 0], kind="stable")]
+    keys = np.asarray(class_ids, dtype=np.float64)
+    lo = np.searchsorted(rows[:, 0], keys, "left")
+    hi = np.searchsorted(rows[:, 0], keys, "right")
+    return {c: rows[a:b] for c, a, b in zip(class_ids, lo, hi)}
+
+
+def _lookup(keys, values):
+    """Index of every value in `keys` (unique, any order) and a found mask."""
+    if not len(keys):
+        return np.zeros(len(values), dtype=np.int64), np.zeros(len(values), dtype=bool)
+    order = np.argsort(keys, kind="stable")
+    idx = order[np.minimum(np.searchsorted(keys, values, sorter=order), len(keys) - 1)]
+    return idx, keys[idx] == values
+
+
+class ClassMatrices:
+    """Dense per-class matrices; rows are the current members, ordered by student id."""
+
+    def __init__(self, class_id, members, sessions, attendance, assignments, submissions):
+        self.class_id = class_id
+        members = members[np.argsort(members[:, 1], kind="stable")]
+        self.student_ids = members[:, 1].astype(np.int64)
+        joined = np.nan_to_num(members[:, 2], nan=-np.inf)
+
+        # sessions (columns in the order they were held)
+        self.session_ids = sessions[:, 1].astype(np.int64)
+        self.session_seconds = sessions[:, 3].astype(np.float32)
+        shape = (len(self.student_ids), len(self.session_ids))
+        self.present = np.zeros(shape, dtype=bool)
+        self.seconds = np.zeros(shape, dtype=np.float32)
+        rows, cols, ok = self._cells(attendance, self.session_ids)
+        self.present[rows, cols] = True
+        self.seconds[rows, cols] = attendance[ok, 3]
+        # a session counts for students who were members when it ended
+        self.expected = (joined[:, None] <= sessions[None, :, 2]) | self.present
+
+        # assignments (columns by due date)
+        self.assignment_ids = assignments[:, 1].astype(np.int64)
+        self.due = assignments[:, 2]                # epoch seconds, nan = no due date
+        shape = (len(self.student_ids), len(self.assignment_ids))
+        self.submitted = np.zeros(shape, dtype=bool)
+        self.days_late = np.full(shape, np.nan, dtype=np.float32)
+        rows, cols, ok = self._cells(submissions, self.assignment_ids)
+        self.submitted[rows, cols] = True
+        # resubmissions: the first one counts
+        np.fmin.at(self.days_late, (rows, cols), (submissions[ok, 3] - self.due[cols]) / DAY)
+        self.assigned = joined[:, None] <= np.nan_to_num(self.due, nan=np.inf)[None, :]
+
+    def _cells(self, rows, column_ids):
+        """(row, column) of (class, column id, student id, ...) rows of current members."""
+        r, r_ok = _lookup(self.student_ids, rows[:, 2].astype(np.int64))
+        c, c_ok = _lookup(column_ids, rows[:, 1].astype(np.int64))
+        ok = r_ok & c_ok
+        return r[ok], c[ok], ok
+
+    def __len__(self):
+        return len(self.student_ids)
+
+
+def load_classes(conn, class_ids):
+    """{class_id: ClassMatrices} for the given classes, with five queries in total."""
+    ids = list(class_ids)
+    ended = LiveSession.ended_at.isnot(None)
+
+    members = _array(conn, select(
+        ClassMember.class_id, ClassMember.student_id, epoch(conn, ClassMember.joined_at)
+    ).where(ClassMember.class_id.in_(ids)), 3)
+
+    sessions = _array(conn, select(
+        LiveSession.class_id, LiveSession.id, epoch(conn, LiveSession.ended_at),
+        func.coalesce(LiveSession.duration, 0)
+    ).where(LiveSession.class_id.in_(ids), ended)
+     .order_by(LiveSession.class_id, LiveSession.started_at, LiveSession.id), 4)
+
+    attendance = _array(conn, select(
+        LiveSession.class_id, SessionAttendance.session_id, SessionAttendance.student_id,
+        # still present when the session ended -> counted for the whole session
+        func.coalesce(SessionAttendance.duration, LiveSession.duration, 0)
+    ).join(LiveSession, LiveSession.id == SessionAttendance.session_id)
+     .where(LiveSession.class_id.in_(ids), ended), 4)
+
+    assignments = _array(conn, select(
+        Assignment.class_id, Assignment.id, epoch(conn, Assignment.due_date)
+    ).where(Assignment.class_id.in_(ids))
+     .order_by(Assignment.class_id, Assignment.due_date, Assignment.id), 3)
+
+    submissions = _array(conn, select(
+        Assignment.class_id, _sub.assignment_id, _sub.student_id, epoch(conn, _sub.submitted_at)
+    ).join(_sub, _sub.assignment_id == Assignment.id)
+     .where(Assignment.class_id.in_(ids)), 4)
+
+    parts = [_split(a, ids) for a in (members, sessions, attendance, assignments, submissions)]
+    return {c: ClassMatrices(c, *(p[c] for p in parts)) for c in ids}
+
+
+# -------------------------
+# SCORING
+# -------------------------
+def _ratio(num, den, default):
+    out = np.full(len(num), default, dtype=np.float64)
+    return np.divide(num, den, out=out, where=den > 0)
+
+
+def score(m, now=None):
+    """Per-student indicators and risk of one class, as arrays aligned with m.student_ids."""
+    now = time.time() if now is None else now
+    n, t = m.present.shape
+
+    held = m.expected.sum(axis=1)
+    attended = m.present.sum(axis=1)
+    rate = _ratio(attended, held, 1.0)
+
+    # recent sessions weigh more
+    weights = 0.5 ** (np.arange(t)[::-1] / RECENT_HALF_LIFE)
+    recent = _ratio(m.present @ weights, m.expected @ weights, 1.0)
+    recent = np.where(held > 0, recent, rate)
+
+    # expected sessions since the last one attended
+    last = np.full(n, -1, dtype=np.int64)
+    if t:   # argmax of a class without ended sessions raises
+        last = np.where(m.present.any(axis=1), t - 1 - np.argmax(m.present[:, ::-1], axis=1), -1)
+    after = np.zeros((n, t + 1), dtype=np.int64)
+    after[:, :t] = np.cumsum(m.expected[:, ::-1], axis=1)[:, ::-1]
+    streak = after[np.arange(n), last + 1]
+
+    # share of each attended session actually spent in it
+    length = m.session_seconds[None, :]
+    share = np.where(length > 0, np.clip(m.seconds / np.maximum(length, 1), 0, 1), 1.0)
+    time_share = _ratio((share * m.present).sum(axis=1), attended, 1.0)
+
+    owed = m.assigned & (m.due <= now)[None, :]
+    due_n = owed.sum(axis=1)
+    missing = (owed & ~m.submitted).sum(axis=1)
+    late_cells = m.submitted & (m.days_late > LATE_GRACE_DAYS)
+    late = late_cells.sum(axis=1)
+    submitted = m.submitted.sum(axis=1)
+    days_late = _ratio(np.where(late_cells, m.days_late, 0).sum(axis=1), late, 0.0)
+
+    risk = (
+        WEIGHTS["attendance"] * (1 - recent)
+        + WEIGHTS["streak"] * np.minimum(streak / STREAK_FULL, 1)
+        + WEIGHTS["time"] * (1 - time_share)
+        + WEIGHTS["missing"] * _ratio(missing, due_n, 0.0)
+        + WEIGHTS["late"] * _ratio(late, submitted, 0.0)
+    )
+    return {
+        "student_id": m.student_ids, "risk": risk,
+        "held": held, "attended": attended, "rate": rate, "recent": recent,
+        "streak": streak, "time_share": time_share,
+        "due": due_n, "missing": missing, "late": late, "days_late": days_late,
+    }
+
+
+# (code, mask over the score arrays, message for student i)
+RULES = (
+    ("absent_streak",
+     lambda s: s["streak"] >= 3,
+     lambda s, i: f"Missed the last {s['streak'][i]} sessions: contact the student directly"),
+    ("low_attendance",
+     lambda s: (s["held"] > 0) & (s["rate"] < 0.75),
+     lambda s, i: f"Attendance is {s['rate'][i]:.0%}: discuss attendance with the student and guardian"),
+    ("attendance_dropping",
+     lambda s: s["recent"] < s["rate"] - 0.15,
+     lambda s, i: f"Recent attendance ({s['recent'][i]:.0%}) is below the overall {s['rate'][i]:.0%}: check in early"),
+    ("leaves_early",
+     lambda s: (s["attended"] > 0) & (s["time_share"] < 0.5),
+     lambda s, i: f"Present for {s['time_share'][i]:.0%} of each session on average: check connection or engagement"),
+    ("missing_work",
+     lambda s: s["missing"] >= 2,
+     lambda s, i: f"{s['missing'][i]} of {s['due'][i]} assignments missing: agree on a catch-up plan"),
+    ("late_work",
+     lambda s: s["late"] >= 2,
+     lambda s, i: f"{s['late'][i]} late submissions, {s['days_late'][i]:.1f} days late on average: send deadline reminders"),
+)
+
+
+def level(risk):
+    return next(name for bound, name in LEVELS if risk >= bound)
+
+
+def at_risk_students(s, limit=None, min_risk=MIN_RISK):
+    """Students of one class above min_risk, highest risk first, with suggestions."""
+    flagged = np.flatnonzero(s["risk"] >= min_risk)
+    flagged = flagged[np.argsort(-s["risk"][flagged], kind="stable")][:limit]
+    if not len(flagged):
+        return []
+    masks = np.column_stack([rule(s) for _, rule, _ in RULES])[flagged]
+
+    return [{
+        "student_id": int(s["student_id"][i]),
+        "risk": round(float(s["risk"][i]), 3),
+        "level": level(s["risk"][i]),
+        "sessions_held": int(s["held"][i]),
+        "sessions_attended": int(s["attended"][i]),
+        "attendance_percent": round(100 * float(s["rate"][i]), 1),
+        "recent_attendance_percent": round(100 * float(s["recent"][i]), 1),
+        "missed_streak": int(s["streak"][i]),
+        "time_in_session_percent": round(100 * float(s["time_share"][i]), 1),
+        "assignments_due": int(s["due"][i]),
+        "assignments_missing": int(s["missing"][i]),
+        "assignments_late": int(s["late"][i]),
+        "suggestions": [
+            {"code": code, "message": message(s, i)}
+            for (code, _, message), hit in zip(RULES, row) if hit
+        ],
+    } for i, row in zip(flagged, masks)]
+
+
+# -------------------------
+# CACHE
+# -------------------------
+class SuggestionEngine:
+    def __init__(self, check_seconds=30):
+        self.check_seconds = check_seconds
+        self.lock = threading.Lock()
+        self.classes = {}       # class_id -> (fingerprint, ClassMatrices)
+        self.checked = {}       # class_id -> monotonic time of the last fingerprint check
+        self.hits = 0
+        self.reloads = 0
+
+    def matrices(self, conn, class_ids):
+        """{class_id: ClassMatrices}, reloading only classes whose fingerprint moved."""
+        class_ids = sorted(set(class_ids))
+        now = time.monotonic()
+        to_check = [
+            c for c in class_ids
+            if c not in self.classes or now - self.checked.get(c, 0) >= self.check_seconds
+        ]
+        stale = []
+        if to_check:
+            current = fingerprints(conn, to_check)
+            stale = [
+                c for c in to_check
+                if current.get(c, EMPTY) != self.classes.get(c, (None,))[0]
+            ]
+            loaded = {}
+            for i in range(0, len(stale), CLASS_BATCH):
+                loaded.update(load_classes(conn, stale[i:i + CLASS_BATCH]))
+            with self.lock:
+                for c in stale:
+                    self.classes[c] = (current.get(c, EMPTY), loaded[c])
+                for c in to_check:
+                    self.checked[c] = now
+                self.reloads += len(stale)
+        with self.lock:
+            self.hits += len(class_ids) - len(stale)
+            return {c: self.classes[c][1] for c in class_ids}
+
+    def at_risk(self, conn, class_ids, limit=None, min_risk=MIN_RISK, now=None):
+        """{class_id: [at-risk student, ...]}"""
+        return {
+            c: at_risk_students(score(m, now), limit, min_risk)
+            for c, m in self.matrices(conn, class_ids).items()
+        }
+
+    def invalidate_class(self, class_id):
+        with self.lock:
+            self.checked.pop(class_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.classes.clear()
+            self.checked.clear()
+
+    def counters(self):
+        return {
+            (("event", "hit"),): self.hits,
+            (("event", "reload"),): self.reloads,
+            (("event", "size"),): len(self.classes),
+        }
+
+
+suggestion_engine = SuggestionEngine(Config.SUGGESTION_CHECK_SECONDS)
+
+
+# -------------------------
+# BENCHMARK (SYNTHETIC SCHOOL)
+# -------------------------
+def _synthetic_school(engine, n_students, class_size, classes_per_student, sessions, assignments, seed):
+    from datetime import datetime, timedelta
+
+    rng = np.random.default_rng(seed)
+    n_classes = max(n_students * classes_per_student // class_size, 1)
+    start = datetime(2025, 1, 6, 9, 0)
+    fmt = "%Y-%m-%d %H:%M:%S.%f"
+
+    def ts(dt):
+        return dt.strftime(fmt)
+
+    classes, members, live, attendance, work, submitted = [], [], [], [], [], []
+    session_id = assignment_id = 0
+    for c in range(1, n_classes + 1):
+        classes.append((c, 1, f"Class {c}", f"C{c:07d}", ts(start)))
+        students = rng.choice(n_students, size=min(class_size, n_students), replace=False) + 2
+        # one student in ten joins half way through the term
+        joined = np.where(rng.random(len(students)) < 0.1, sessions // 2, 0)
+        members += [(c, int(s), ts(start + timedelta(days=int(j)))) for s, j in zip(students, joined)]
+        engagement = rng.beta(6, 1.5, size=len(students))
+
+        for k in range(sessions):
+            session_id += 1
+            began = start + timedelta(days=k, hours=1)
+            live.append((session_id, c, 1, f"s{session_id}", ts(began), ts(began + timedelta(hours=1)), 3600))
+            here = (rng.random(len(students)) < engagement) & (joined <= k)
+            seconds = (3600 * rng.uniform(0.3, 1.0, size=len(students))).astype(int)
+            attendance += [
+                (session_id, int(s), ts(began), int(sec))
+                for s, sec in zip(students[here], seconds[here])
+            ]
+
+        for k in range(assignments):
+            assignment_id += 1
+            due = start + timedelta(days=int(k * sessions / assignments) + 3)
+            work.append((assignment_id, f"Work {k}", 1, c, ts(due)))
+            done = rng.random(len(students)) < engagement
+            late = rng.exponential(0.5, size=len(students)) - 0.4
+            submitted += [
+                (assignment_id, int(s), ts(due + timedelta(days=float(d))))
+                for s, d in zip(students[done], late[done])
+            ]
+
+    with engine.begin() as conn:
+        run = conn.exec_driver_sql
+        run("INSERT INTO classroom (id, teacher_id, class_name, classroom_code, created_at) "
+            "VALUES (?, ?, ?, ?, ?)", classes)
+        run("INSERT INTO class_member (class_id, student_id, joined_at) VALUES (?, ?, ?)", members)
+        run("INSERT INTO live_sessions (id, class_id, teacher_id, session_link, started_at, ended_at, "
+            "duration) VALUES (?, ?, ?, ?, ?, ?, ?)", live)
+        run("INSERT INTO session_attendance (session_id, student_id, joined_at, duration) "
+            "VALUES (?, ?, ?, ?)", attendance)
+        run("INSERT INTO assignment (id, title, teacher_id, class_id, due_date) VALUES (?, ?, ?, ?, ?)", work)
+        run("INSERT INTO assignment_submission (assignment_id, student_id, submitted_at) "
+            "VALUES (?, ?, ?)", submitted)
+    return n_classes, len(attendance), len(submitted)
+
+
+def benchmark(n_students=5000, class_size=30, classes_per_student=6, sessions=40, assignments=12, seed=0):
+    """
+    Score every class of a synthetic school: a cold load, a warm pass where
+    only fingerprints are checked, and a pass after one class got a new
+    submission.
+    """
+    import os
+    import tempfile
+
+    from sqlalchemy import create_engine
+    from utils.auth_utils import db
+    import models.classroom_models  # noqa: F401  (tables for create_all)
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine("sqlite:///" + path)
+    db.metadata.create_all(engine)
+    t0 = time.perf_counter()
+    n_classes, n_attendance, n_submissions = _synthetic_school(
+        engine, n_students, class_size, classes_per_student, sessions, assignments, seed
+    )
+    setup = time.perf_counter() - t0
+    class_ids = list(range(1, n_classes + 1))
+    cache = SuggestionEngine(check_seconds=0)
+    now = time.time()
+
+    def timed(fn):
+        start = time.perf_counter()
+        with engine.connect() as conn:
+            result = fn(conn)
+        return result, round(time.perf_counter() - start, 3)
+
+    cold, cold_s = timed(lambda conn: cache.at_risk(conn, class_ids, now=now))
+    _, warm_s = timed(lambda conn: cache.at_risk(conn, class_ids, now=now))
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO assignment_submission (assignment_id, student_id, submitted_at) "
+            "VALUES (1, 1, '2025-01-09 09:00:00.000000')"
+        )
+    reloads = cache.reloads
+    _, changed_s = timed(lambda conn: cache.at_risk(conn, class_ids, now=now))
+
+    scored = time.perf_counter()
+    for _, m in cache.classes.values():
+        at_risk_students(score(m, now))
+    score_s = round(time.perf_counter() - scored, 3)
+    engine.dispose()
+
+    return {
+        "students": n_students, "classes": n_classes,
+        "attendance_rows": n_attendance, "submission_rows": n_submissions,
+        "setup_seconds": round(setup, 1),
+        "cold_seconds": cold_s, "warm_seconds": warm_s,
+        "one_class_changed_seconds": changed_s, "classes_reloaded": cache.reloads - reloads,
+        "score_only_seconds": score_s,
+        "at_risk": sum(len(v) for v in cold.values()),
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    print(benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
@@ -0,0 +1,427 @@
+# utils/timetable_utils.py
+# ===============================
+# TIMETABLE CONFLICT INDEX
+# ===============================
+#
+# A class's "cohort" is the class itself plus every class one of its students
+# is a member of. A period may not overlap any period of the cohort.
+#
+# CohortIndex loads the cohort (one query) and its timetable entries (one
+# query) and keeps, per day, the occupied intervals sorted by start with a
+# running maximum of end times, so an overlap lookup is a bisect plus a short
+# backwards scan instead of a database round trip. Indexes are cached per
+# class, updated in place on add, and dropped when a timetable or a
+# membership changes (TIMETABLE_INDEX_TTL bounds staleness across workers).
+# A saved week is one executemany INSERT; the cached indexes are then updated
+# from plain slots built before the commit, never from expired ORM rows.
+#
+# The student grid is rendered once per distinct set of classes (students of
+# the same cohort share it) and served with a strong ETag of its bytes. Its
+# cache key holds each class's timetable_version, read together with the
+# student's classes in one query per request, so a timetable edit or a new
+# membership in any worker process is seen by every other one at once.
+
+import bisect
+import hashlib
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import insert
+from sqlalchemy.orm import aliased
+
+from config import Config
+from utils.auth_utils import db
+from models.classroom_models import ClassMember, Classroom, TimetableEntry
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+PERIODS = range(1, 9)
+
+
+def minutes(t):
+    return t.hour * 60 + t.minute
+
+
+# -------------------------
+# PER-DAY INTERVALS
+# -------------------------
+class DayIntervals:
+    """Intervals sorted by start; max_end[i] = max(end[0..i])."""
+
+    __slots__ = ("starts", "ends", "max_end", "items")
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.max_end = []
+        self.items = []
+
+    def add(self, start, end, item):
+        i = bisect.bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.items.insert(i, item)
+        self.max_end.insert(i, 0)
+        running = self.max_end[i - 1] if i else 0
+        for j in range(i, len(self.ends)):
+            running = max(running, self.ends[j])
+            self.max_end[j] = running
+
+    def overlapping(self, start, end):
+        """Items with item.start < end and item.end > start."""
+        found = []
+        i = bisect.bisect_left(self.starts, end) - 1
+        while i >= 0 and self.max_end[i] > start:
+            if self.ends[i] > start:
+                found.append(self.items[i])
+            i -= 1
+        return found
+
+    def __len__(self):
+        return len(self.starts)
+
+
+# -------------------------
+# COHORT INDEX
+# -------------------------
+def cohort_class_ids(class_id):
+    """The class plus every class its students belong to, in one query."""
+    own = aliased(ClassMember)
+    other = aliased(ClassMember)
+    ids = {
+        c for (c,) in db.session.query(other.class_id)
+        .join(own, own.student_id == other.student_id)
+        .filter(own.class_id == class_id)
+        .distinct()
+    }
+    ids.add(class_id)
+    return ids
+
+
+def describe(entry):
+    return {
+        "id": entry.id,
+        "class_id": entry.class_id,
+        "day": entry.day,
+        "period": entry.period,
+        "start_time": entry.start_time.strftime("%H:%M"),
+        "end_time": entry.end_time.strftime("%H:%M"),
+        "subject": entry.subject
+    }
+
+
+def slot(entry):
+    """(day, start minute, end minute, describe(entry)): what an index stores."""
+    return entry.day, minutes(entry.start_time), minutes(entry.end_time), describe(entry)
+
+
+class CohortIndex:
+    def __init__(self, class_id, class_ids, entries):
+        self.class_id = class_id
+        self.class_ids = frozenset(class_ids)
+        self.days = {day: DayIntervals() for day in DAYS}
+        for e in entries:
+            self.add(e)
+
+    @classmethod
+    def load(cls, class_id):
+        class_ids = cohort_class_ids(class_id)
+        entries = TimetableEntry.query.filter(TimetableEntry.class_id.in_(class_ids)).all()
+        return cls(class_id, class_ids, entries)
+
+    def add(self, entry):
+        self.add_slot(*slot(entry))
+
+    def add_slot(self, day, start, end, item):
+        days = self.days.get(day)
+        if days is None:
+            days = self.days[day] = DayIntervals()
+        days.add(start, end, item)
+
+    def conflicts(self, day, start_time, end_time, ignore_class=None):
+        days = self.days.get(day)
+        if days is None:
+            return []
+        return [
+            item for item in days.overlapping(minutes(start_time), minutes(end_time))
+            if item["class_id"] != ignore_class
+        ]
+
+
+class TimetableIndexCache:
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self.entries = {}       # class_id -> (expires_at, CohortIndex)
+        self.lock = threading.Lock()
+
+    def get(self, class_id):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(class_id)
+            if entry and entry[0] > now:
+                return entry[1]
+        index = CohortIndex.load(class_id)
+        with self.lock:
+            self.entries[class_id] = (now + self.ttl, index)
+        return index
+
+    def added(self, slots):
+        """Insert freshly committed slot()s into every cached index they affect."""
+        with self.lock:
+            for _, index in self.entries.values():
+                for day, start, end, item in slots:
+                    if item["class_id"] in index.class_ids:
+                        index.add_slot(day, start, end, item)
+
+    def invalidate_class(self, class_id):
+        """A timetable of `class_id` lost entries: drop cohorts containing it."""
+        with self.lock:
+            for cid, (_, index) in list(self.entries.items()):
+                if class_id in index.class_ids:
+                    del self.entries[cid]
+
+    def clear(self):
+        """Memberships changed: every cohort may be different."""
+        with self.lock:
+            self.entries.clear()
+
+
+timetable_index = TimetableIndexCache(Config.TIMETABLE_INDEX_TTL)
+
+
+# -------------------------
+# STUDENT GRID CACHE
+# -------------------------
+def render_grid(class_ids):
+    """The 6x8 grid JSON of a set of classes."""
+    entries = (
+        db.session.query(
+            TimetableEntry.day,
+            TimetableEntry.period,
+            TimetableEntry.start_time,
+            TimetableEntry.end_time,
+            TimetableEntry.subject,
+            TimetableEntry.teacher_name
+        )
+        .filter(TimetableEntry.class_id.in_(class_ids))
+        .all()
+    ) if class_ids else []
+
+    grid = {
+        day: {p: {"subject": None, "teacher": None} for p in PERIODS}
+        for day in DAYS
+    }
+    period_times = {}
+
+    for day, period, start_time, end_time, subject, teacher_name in entries:
+        grid[day][period] = {"subject": subject, "teacher": teacher_name}
+        if period not in period_times:
+            period_times[period] = f"{start_time.strftime('%I:%M %p')} - {end_time.strftime('%I:%M %p')}"
+
+    return current_app.json.dumps({"period_times": period_times, "grid": grid})
+
+
+def bump_timetable_version(class_id):
+    """Call in the transaction that changes a class's timetable entries."""
+    db.session.query(Classroom).filter_by(id=class_id).update(
+        {Classroom.timetable_version: db.func.coalesce(Classroom.timetable_version, 0) + 1},
+        synchronize_session=False
+    )
+
+
+class GridCache:
+    """
+    frozenset((class_id, timetable_version)) -> (etag, body).
+    Misses for the same class set are built once (the Monday morning herd
+    waits on one query instead of running it N times). Entries of old
+    versions are never hit again: every insert sweeps expired entries, and
+    past `max_entries` the oldest ones go first.
+    """
+
+    def __init__(self, ttl=300, max_entries=2048):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.grids = {}         # frozenset -> (expires_at, etag, body)
+        self.building = defaultdict(threading.Lock)
+        self.hits = 0
+        self.misses = 0
+
+    def class_versions(self, student_id):
+        """Cache key of a student's grid: their classes with timetable versions."""
+        return frozenset(
+            (class_id, version or 0)
+            for class_id, version in db.session.query(ClassMember.class_id, Classroom.timetable_version)
+            .join(Classroom, Classroom.id == ClassMember.class_id)
+            .filter(ClassMember.student_id == student_id)
+        )
+
+    def _cached(self, key):
+        entry = self.grids.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1], entry[2]
+        return None
+
+    def grid(self, key):
+        """(etag, body bytes) of a class_versions() key."""
+        found = self._cached(key)
+        if found:
+            self.hits += 1
+            return found
+
+        with self.lock:
+            build_lock = self.building[key]
+        with build_lock:
+            found = self._cached(key)     # built while we waited
+            if found:
+                self.hits += 1
+                return found
+
+            self.misses += 1
+            body = render_grid([class_id for class_id, _ in key]).encode()
+            etag = hashlib.sha1(body).hexdigest()
+            with self.lock:
+                self._sweep()
+                self.grids[key] = (time.monotonic() + self.ttl, etag, body)
+                self.building.pop(key, None)
+            return etag, body
+
+    def _sweep(self):
+        """Drop expired grids, then the oldest ones above max_entries (under self.lock)."""
+        now = time.monotonic()
+        for key in [k for k, entry in self.grids.items() if entry[0] <= now]:
+            del self.grids[key]
+        # insertion order = expiry order (constant ttl)
+        for key in list(self.grids)[:max(len(self.grids) - self.max_entries + 1, 0)]:
+            del self.grids[key]
+
+    def invalidate_class(self, class_id):
+        """Free this process's grids of a class early (the version bump already hides them)."""
+        with self.lock:
+            for key in [k for k in self.grids if any(c == class_id for c, _ in k)]:
+                del self.grids[key]
+
+    def counters(self):
+        return {
+            (("event", "hit"),): self.hits,
+            (("event", "miss"),): self.misses,
+            (("event", "size"),): len(self.grids),
+        }
+
+
+grid_cache = GridCache(Config.TIMETABLE_GRID_TTL, Config.TIMETABLE_GRID_MAX_ENTRIES)
+
+
+# -------------------------
+# VALIDATION
+# -------------------------
+def parse_slot(raw):
+    """(day, period, start_time, end_time) or raises ValueError."""
+    day = raw.get("day")
+    if day not in DAYS:
+        raise ValueError(f"day must be one of {', '.join(DAYS)}")
+    try:
+        period = int(raw.get("period"))
+    except (TypeError, ValueError):
+        raise ValueError("period must be a number")
+    if period not in PERIODS:
+        raise ValueError(f"period must be between {PERIODS.start} and {PERIODS.stop - 1}")
+    try:
+        start_time = datetime.strptime(raw.get("start_time") or "", "%H:%M").time()
+        end_time = datetime.strptime(raw.get("end_time") or "", "%H:%M").time()
+    except ValueError:
+        raise ValueError("start_time and end_time must be HH:MM")
+    if end_time <= start_time:
+        raise ValueError("end_time must be after start_time")
+    return day, period, start_time, end_time
+
+
+def plan_week(classroom, rows, teacher_name, replace=False):
+    """
+    Validate a batch of periods for one class against its cohort and against
+    each other. Returns (entries, errors); entries are unsaved TimetableEntry
+    objects and are only meaningful when errors is empty.
+    """
+    if replace:
+        # the class's current week is about to be deleted: index without it
+        index = CohortIndex.load(classroom.id)
+        ignore = classroom.id
+    else:
+        index = timetable_index.get(classroom.id)
+        ignore = None
+
+    batch = CohortIndex(classroom.id, (), ())
+    entries, errors = [], []
+
+    for n, raw in enumerate(rows):
+        try:
+            day, period, start_time, end_time = parse_slot(raw if isinstance(raw, dict) else {})
+        except ValueError as exc:
+            errors.append({"index": n, "error": str(exc)})
+            continue
+
+        clashes = index.conflicts(day, start_time, end_time, ignore_class=ignore)
+        clashes += batch.conflicts(day, start_time, end_time)
+        if clashes:
+            errors.append({
+                "index": n,
+                "day": day,
+                "period": period,
+                "error": "Time slot already occupied by another class.",
+                "conflicts_with": clashes
+            })
+            continue
+
+        entry = TimetableEntry(
+            class_id=classroom.id,
+            day=day,
+            start_time=start_time,
+            end_time=end_time,
+            period=period,
+            subject=classroom.subject,
+            teacher_name=teacher_name
+        )
+        batch.add(entry)
+        entries.append(entry)
+
+    return entries, errors
+
+
+def save_week(classroom, entries, replace=False):
+    """Insert plan_week()'s entries with one executemany, then update the caches."""
+    if replace:
+        TimetableEntry.query.filter_by(class_id=classroom.id).delete(synchronize_session=False)
+    inserted = db.session.execute(
+        # no sort_by_parameter_order: SQLite would fall back to a row per
+        # statement. plan_week rejects overlaps, so (day, start) is unique.
+        insert(TimetableEntry).returning(TimetableEntry.id, TimetableEntry.day, TimetableEntry.start_time),
+        [
+            {"class_id": e.class_id, "day": e.day, "period": e.period,
+             "start_time": e.start_time, "end_time": e.end_time,
+             "subject": e.subject, "teacher_name": e.teacher_name}
+            for e in entries
+        ]
+    ).all()
+    ids = {(day, start): entry_id for entry_id, day, start in inserted}
+    # the entries stay transient: reading them never goes back to the database
+    for e in entries:
+        e.id = ids.get((e.day, e.start_time))
+    slots = [slot(e) for e in entries]
+    bump_timetable_version(classroom.id)
+    db.session.commit()
+
+    if replace:
+        timetable_index.invalidate_class(classroom.id)
+    else:
+        timetable_index.added(slots)
+    grid_cache.invalidate_class(classroom.id)
+
+
+def owned_classroom(class_id, teacher_id):
+    try:
+        class_id = int(class_id)
+    except (TypeError, ValueError):
+        return None
+    return Classroom.query.filter_by(id=class_id, teacher_id=teacher_id).first()
@@ -0,0 +1,394 @@
+# utils/upload_store.py
+# ===============================
+# CONTENT-ADDRESSED UPLOAD STORE
+# ===============================
+#
+# Multipart uploads are first spooled by werkzeug (to a temp file above
+# 500 KB) while it parses the form; the request body as a whole is capped by
+# MAX_CONTENT_LENGTH before anything is read. save() then copies the spooled
+# file into the store in fixed-size chunks while hashing it (SHA-256), so no
+# step holds a whole PDF or video in memory. The finished temp file is
+# renamed to blobs/<aa>/<bb>/<sha256>; if that blob already exists (the whole
+# class submitting the same starter file) the temp file is discarded instead
+# and nothing new is kept.
+#
+# The database only stores a reference URL, /files/<sha256>/<filename>: the
+# digest names the blob and the filename is used for the download name and
+# the content type. Blobs never change, so they are served as immutable.
+#
+# Large files can also arrive through a resumable upload session: the client
+# PUTs chunks at byte offsets (in any order, retrying only what got lost),
+# asks which ranges the server already has, and finalizes once complete. The
+# session lives on local disk (sessions/<id>/meta.json + data) so any worker
+# can take the next chunk; abandoned sessions are swept after
+# UPLOAD_SESSION_TTL.
+
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import secrets
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import send_file, abort
+from flask_login import login_required
+from werkzeug.utils import secure_filename
+
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
+
+CHUNK_SIZE = 1024 * 1024
+DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+URL_PREFIX = "/files"
+SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+
+
+class StoredFile:
+    __slots__ = ("digest", "size", "filename", "deduplicated")
+
+    def __init__(self, digest, size, filename, deduplicated):
+        self.digest = digest
+        self.size = size
+        self.filename = filename
+        self.deduplicated = deduplicated
+
+    @property
+    def url(self):
+        return f"{URL_PREFIX}/{self.digest}/{self.filename}"
+
+
+class UploadStore:
+    def __init__(self, root):
+        self.root = root
+        self.lock = threading.Lock()
+        self.stored = 0
+        self.deduplicated = 0
+        self.bytes_saved = 0
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, "blobs", digest[:2], digest[2:4], digest)
+
+    def tmp_dir(self):
+        path = os.path.join(self.root, "tmp")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    # -------------------------
+    # WRITE
+    # -------------------------
+    def save_stream(self, stream, filename, max_bytes=None):
+        """Copy `stream` into the store chunk by chunk; returns a StoredFile."""
+        sha = hashlib.sha256()
+        size = 0
+        fd, tmp = tempfile.mkstemp(dir=self.tmp_dir(), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise ValueError(f"file is larger than {max_bytes} bytes")
+                    sha.update(chunk)
+                    out.write(chunk)
+            return self.commit_file(tmp, sha.hexdigest(), size, filename)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+
+    def commit_file(self, tmp, digest, size, filename):
+        """Move a fully written temp file to its blob path (or drop it as a duplicate)."""
+        path = self.blob_path(digest)
+        deduplicated = os.path.exists(path)
+        if deduplicated:
+            os.unlink(tmp)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)       # atomic; a concurrent twin writes identical bytes
+
+        with self.lock:
+            if deduplicated:
+                self.deduplicated += 1
+                self.bytes_saved += size
+            else:
+                self.stored += 1
+
+        return StoredFile(digest, size, display_name(filename), deduplicated)
+
+    def commit_path(self, path, filename):
+        """Hash a finished file on disk and move it into the store."""
+        sha = hashlib.sha256()
+        size = 0
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                sha.update(chunk)
+        return self.commit_file(path, sha.hexdigest(), size, filename)
+
+    def save(self, file_storage, max_bytes=None):
+        """
+        werkzeug FileStorage -> StoredFile, or None for an empty file field.
+        The file is already spooled by werkzeug; this copies and hashes it.
+        """
+        if not file_storage or not file_storage.filename:
+            return None
+        return self.save_stream(file_storage.stream, file_storage.filename, max_bytes)
+
+    # -------------------------
+    # READ
+    # -------------------------
+    def serve(self, digest, filename):
+        if not DIGEST_RE.match(digest):
+            abort(404)
+        path = self.blob_path(digest)
+        if not os.path.exists(path):
+            abort(404)
+
+        response = send_file(
+            path,
+            mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+            download_name=filename,
+            conditional=True,
+            etag=digest,
+            max_age=Config.UPLOAD_CACHE_SECONDS
+        )
+        response.cache_control.public = False     # behind login
+        response.cache_control.private = True
+        response.cache_control.immutable = True
+        return response
+
+    def init_app(self, app):
+        @app.route(f"{URL_PREFIX}/<digest>/<path:filename>")
+        @login_required
+        def uploaded_file(digest, filename):
+            return self.serve(digest, filename)
+
+    def counters(self):
+        return {
+            (("event", "stored"),): self.stored,
+            (("event", "deduplicated"),): self.deduplicated,
+            (("event", "bytes_saved"),): self.bytes_saved,
+        }
+
+
+def display_name(filename):
+    return secure_filename(filename or "") or "file"
+
+
+def join_urls(stored):
+    return ",".join(s.url for s in stored if s) or None
+
+
+# -------------------------
+# RESUMABLE UPLOAD SESSIONS
+# -------------------------
+class UploadSessionError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def merge_range(ranges, start, end):
+    """Add [start, end) to a sorted list of disjoint [start, end) pairs."""
+    merged = []
+    for s, e in sorted(ranges + [[start, end]]):
+        if merged and s <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], e)
+        else:
+            merged.append([s, e])
+    return merged
+
+
+class ResumableUploads:
+    def __init__(self, store, ttl=24 * 3600):
+        self.store = store
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    # -------------------------
+    # PATHS / LOCKING
+    # -------------------------
+    def _dir(self, upload_id):
+        if not SESSION_ID_RE.match(upload_id or ""):
+            raise UploadSessionError("unknown upload", 404)
+        return os.path.join(self.store.root, "sessions", upload_id)
+
+    @contextmanager
+    def _locked(self, upload_id):
+        """Exclusive access to a session's meta.json; yields (dir, meta)."""
+        path = self._dir(upload_id)
+        if not os.path.isdir(path):
+            raise UploadSessionError("unknown upload", 404)
+        with self._lock:
+            with open(os.path.join(path, "lock"), "a") as lf:
+                if fcntl:
+                    fcntl.flock(lf, fcntl.LOCK_EX)
+                try:
+                    if not os.path.exists(os.path.join(path, "meta.json")):
+                        raise UploadSessionError("unknown upload", 404)     # finalized meanwhile
+                    with open(os.path.join(path, "meta.json")) as f:
+                        meta = json.load(f)
+                    yield path, meta
+                finally:
+                    if fcntl:
+                        fcntl.flock(lf, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _write_meta(path, meta):
+        meta["updated_at"] = time.time()
+        tmp = os.path.join(path, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(path, "meta.json"))
+
+    @staticmethod
+    def _public(upload_id, meta):
+        received = sum(e - s for s, e in meta["ranges"])
+        return {
+            "upload_id": upload_id,
+            "filename": meta["filename"],
+            "size": meta["size"],
+            "received": meta["ranges"],
+            "received_bytes": received,
+            "complete": received == meta["size"],
+            "chunk_size": CHUNK_SIZE
+        }
+
+    # -------------------------
+    # API
+    # -------------------------
+    def create(self, owner_id, filename, size, max_bytes=None, **extra):
+        if not isinstance(size, int) or size <= 0:
+            raise UploadSessionError("size must be a positive number of bytes")
+        if max_bytes is not None and size > max_bytes:
+            raise UploadSessionError(f"file is larger than {max_bytes} bytes", 413)
+
+        self.sweep_if_due()
+
+        upload_id = secrets.token_urlsafe(18)
+        path = self._dir(upload_id)
+        os.makedirs(path)
+        with open(os.path.join(path, "data"), "wb") as f:
+            f.truncate(size)            # sparse; chunks land at their offsets
+        meta = {
+            "owner_id": owner_id,
+            "filename": display_name(filename),
+            "size": size,
+            "ranges": [],
+            "created_at": time.time(),
+            **extra
+        }
+        self._write_meta(path, meta)
+        return self._public(upload_id, meta)
+
+    def status(self, upload_id, owner_id):
+        with self._locked(upload_id) as (_, meta):
+            self._check_owner(meta, owner_id)
+            return self._public(upload_id, meta)
+
+    def write_chunk(self, upload_id, owner_id, offset, stream):
+        """Copy the request body to `offset`; the bytes that did arrive are kept."""
+        path = self._dir(upload_id)
+        with self._locked(upload_id) as (_, meta):
+            self._check_owner(meta, owner_id)
+            size = meta["size"]
+        if offset < 0 or offset >= size:
+            raise UploadSessionError("offset outside the file", 416)
+
+        written = 0
+        try:
+            with open(os.path.join(path, "data"), "r+b") as out:
+                out.seek(offset)
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    if offset + written + len(chunk) > size:
+                        raise UploadSessionError("chunk runs past the declared size", 416)
+                    out.write(chunk)
+                    written += len(chunk)
+        finally:
+            if written:
+                with self._locked(upload_id) as (_, meta):
+                    meta["ranges"] = merge_range(meta["ranges"], offset, offset + written)
+                    self._write_meta(path, meta)
+
+        return self.status(upload_id, owner_id)
+
+    def finalize(self, upload_id, owner_id):
+        """Move the assembled file into the store; returns (StoredFile, meta)."""
+        with self._locked(upload_id) as (path, meta):
+            self._check_owner(meta, owner_id)
+            if meta["ranges"] != [[0, meta["size"]]]:
+                raise UploadSessionError("upload is incomplete", 409)
+            stored = self.store.commit_path(os.path.join(path, "data"), meta["filename"])
+            os.unlink(os.path.join(path, "meta.json"))
+        shutil.rmtree(path, ignore_errors=True)
+        return stored, meta
+
+    def abort(self, upload_id, owner_id):
+        with self._locked(upload_id) as (path, meta):
+            self._check_owner(meta, owner_id)
+            os.unlink(os.path.join(path, "meta.json"))
+        shutil.rmtree(path, ignore_errors=True)
+
+    @staticmethod
+    def _check_owner(meta, owner_id):
+        if meta["owner_id"] != owner_id:
+            raise UploadSessionError("unknown upload", 404)
+
+    # -------------------------
+    # CLEANUP
+    # -------------------------
+    def sweep(self, now=None):
+        """Remove sessions idle for longer than ttl and orphaned temp files."""
+        now = now or time.time()
+        removed = 0
+
+        sessions = os.path.join(self.store.root, "sessions")
+        for name in os.listdir(sessions) if os.path.isdir(sessions) else []:
+            path = os.path.join(sessions, name)
+            try:
+                with open(os.path.join(path, "meta.json")) as f:
+                    updated = json.load(f)["updated_at"]
+            except (OSError, ValueError, KeyError):
+                updated = os.path.getmtime(path)
+            if now - updated > self.ttl:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+
+        tmp = os.path.join(self.store.root, "tmp")
+        for name in os.listdir(tmp) if os.path.isdir(tmp) else []:
+            path = os.path.join(tmp, name)
+            try:
+                if now - os.path.getmtime(path) > self.ttl:
+                    os.unlink(path)
+                    removed += 1
+            except OSError:
+                pass
+
+        self._last_sweep = now
+        return removed
+
+    def sweep_if_due(self):
+        if time.time() - self._last_sweep > min(self.ttl, 3600):
+            self.sweep()
+
+
+upload_store = UploadStore(Config.UPLOAD_STORE_DIR)
+resumable_uploads = ResumableUploads(upload_store, Config.UPLOAD_SESSION_TTL)
@@ -0,0 +1,398 @@
+# utils/whiteboard.py
+# ===============================
+# SHARED WHITEBOARD LOG (PER LIVE SESSION)
+# ===============================
+#
+# The teacher's board is an append-only log of WhiteboardStroke rows numbered
+# 1, 2, 3 ... per session. Clients poll "everything since seq N". Every
+# SNAPSHOT_EVERY entries the strokes still visible (everything after the last
+# clear) are folded into the session's WhiteboardSnapshot, so a student who
+# joins 40 minutes in downloads one snapshot plus a short tail instead of
+# replaying the whole session.
+#
+# Points are integers in the board's logical size (BOARD_WIDTH x BOARD_HEIGHT,
+# shared by every screen): the first point absolute, then deltas, each zigzag
+# + varint encoded (one byte for moves under 64 units), base64 on the wire.
+# static/js/whiteboard.js encodes the same format.
+#
+# Volume: the client keeps one pointer position per animation frame and
+# simplifies every piece with Ramer-Douglas-Peucker (SIMPLIFY_TOLERANCE board
+# units) before sending; ingest clamps, de-duplicates and simplifies again,
+# and snapshots merge the pieces of one stroke back into a single polyline.
+# `python -m utils.whiteboard` measures bytes per minute of drawing.
+
+import base64
+import binascii
+import json
+import re
+import threading
+from collections import defaultdict
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from utils.auth_utils import db
+from models.whiteboard_models import WhiteboardSnapshot, WhiteboardStroke
+
+BOARD_WIDTH = 1600
+BOARD_HEIGHT = 520
+
+TOOLS = ("pen", "eraser")
+COLOR = re.compile(r"^#[0-9a-fA-F]{6}$")
+MAX_WIDTH = 60
+MAX_POINTS = 4000           # per stroke
+MAX_BATCH = 100             # strokes per POST
+
+SIMPLIFY_TOLERANCE = 1.5   # board units (about a screen pixel)
+
+SNAPSHOT_EVERY = 200        # log entries between snapshots
+PAGE_SIZE = 500             # log entries per "since" response
+
+
+# -------------------------
+# POINT ENCODING
+# -------------------------
+def encode_points(points):
+    out = bytearray()
+    px = py = 0
+    for x, y in points:
+        for d in (x - px, y - py):
+            z = d << 1 if d >= 0 else (-d << 1) - 1
+            while z >= 0x80:
+                out.append((z & 0x7F) | 0x80)
+                z >>= 7
+            out.append(z)
+        px, py = x, y
+    return bytes(out)
+
+
+def decode_points(data):
+    values = []
+    z = shift = 0
+    for b in data:
+        z |= (b & 0x7F) << shift
+        if b & 0x80:
+            shift += 7
+            if shift > 28:
+                raise ValueError("point value too large")
+            continue
+        values.append((z >> 1) ^ -(z & 1))
+        z = shift = 0
+    if shift or len(values) % 2:
+        raise ValueError("truncated point data")
+
+    points = []
+    x = y = 0
+    for i in range(0, len(values), 2):
+        x += values[i]
+        y += values[i + 1]
+        points.append((x, y))
+    return points
+
+
+def simplify(points, tolerance=SIMPLIFY_TOLERANCE):
+    """Ramer-Douglas-Peucker (iterative); the end points are always kept."""
+    n = len(points)
+    if n < 3:
+        return list(points)
+
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    limit = tolerance * tolerance
+    stack = [(0, n - 1)]
+    while stack:
+        a, b = stack.pop()
+        ax, ay = points[a]
+        dx, dy = points[b][0] - ax, points[b][1] - ay
+        norm = dx * dx + dy * dy
+        worst, index = -1.0, -1
+        for i in range(a + 1, b):
+            px, py = points[i][0] - ax, points[i][1] - ay
+            if norm:
+                cross = px * dy - py * dx
+                d2 = cross * cross / norm
+            else:
+                d2 = px * px + py * py
+            if d2 > worst:
+                worst, index = d2, i
+        if worst > limit:
+            keep[index] = True
+            stack.append((a, index))
+            stack.append((index, b))
+    return [p for p, k in zip(points, keep) if k]
+
+
+def compact(points):
+    """Clamp to the board, drop repeated points and simplify."""
+    out = []
+    for x, y in points:
+        p = (min(max(x, 0), BOARD_WIDTH), min(max(y, 0), BOARD_HEIGHT))
+        if not out or out[-1] != p:
+            out.append(p)
+    return simplify(out)
+
+
+def merge_piece(previous, entry):
+    """
+    Append a wire stroke to the previous one when it continues it (same
+    style, starts where it ended), as the pieces of one drawn stroke do.
+    """
+    if (
+        previous.get("kind") != "stroke"
+        or any(previous[k] != entry[k] for k in ("tool", "color", "width"))
+    ):
+        return False
+    head = decode_points(base64.b64decode(previous["points"]))
+    tail = decode_points(base64.b64decode(entry["points"]))
+    if head[-1] != tail[0]:
+        return False
+    previous["points"] = base64.b64encode(encode_points(simplify(head + tail[1:]))).decode("ascii")
+    previous["seq"] = entry["seq"]
+    return True
+
+
+# -------------------------
+# VALIDATION / WIRE FORMAT
+# -------------------------
+def parse_stroke(raw):
+    """Model fields of one posted log entry, or raises ValueError."""
+    if not isinstance(raw, dict):
+        raise ValueError("stroke must be an object")
+    kind = raw.get("kind", "stroke")
+    if kind == "clear":
+        return {"kind": "clear"}
+    if kind != "stroke":
+        raise ValueError(f"unknown kind {kind!r}")
+
+    tool = raw.get("tool", "pen")
+    if tool not in TOOLS:
+        raise ValueError(f"tool must be one of {', '.join(TOOLS)}")
+    color = raw.get("color") or "#000000"
+    if not COLOR.match(color):
+        raise ValueError("color must be #rrggbb")
+    width = int(raw.get("width", 4))
+    if not 1 <= width <= MAX_WIDTH:
+        raise ValueError(f"width must be 1..{MAX_WIDTH}")
+
+    try:
+        data = base64.b64decode(raw.get("points") or "", validate=True)
+    except (binascii.Error, TypeError):
+        raise ValueError("points must be base64")
+    points = decode_points(data)
+    if not points or len(points) > MAX_POINTS:
+        raise ValueError(f"a stroke needs 1..{MAX_POINTS} points")
+
+    return {
+        "kind": "stroke",
+        "tool": tool,
+        "color": color.lower(),
+        "width": width,
+        "points": encode_points(compact(points)),
+    }
+
+
+def wire(seq, kind, tool, color, width, points):
+    entry = {"seq": seq, "kind": kind}
+    if kind == "stroke":
+        entry.update(
+            tool=tool, color=color, width=width,
+            points=base64.b64encode(points).decode("ascii")
+        )
+    return entry
+
+
+_LOG_COLUMNS = (
+    WhiteboardStroke.seq, WhiteboardStroke.kind, WhiteboardStroke.tool,
+    WhiteboardStroke.color, WhiteboardStroke.width, WhiteboardStroke.points
+)
+
+
+# -------------------------
+# LOG
+# -------------------------
+class WhiteboardLog:
+    def __init__(self, snapshot_every=SNAPSHOT_EVERY, page_size=PAGE_SIZE):
+        self.snapshot_every = snapshot_every
+        self.page_size = page_size
+        self.locks = defaultdict(threading.Lock)
+
+    def _entries(self, session_id, after, limit=None):
+        query = (
+            db.session.query(*_LOG_COLUMNS)
+            .filter(WhiteboardStroke.session_id == session_id, WhiteboardStroke.seq > after)
+            .order_by(WhiteboardStroke.seq)
+        )
+        if limit is not None:
+            query = query.limit(limit)
+        return [wire(*row) for row in query]
+
+    def append(self, session_id, author_id, strokes, retries=5):
+        """Store parsed strokes with the next seqs of the session; returns the seqs."""
+        with self.locks[session_id]:
+            for _ in range(retries):
+                head = db.session.query(func.max(WhiteboardStroke.seq)).filter_by(
+                    session_id=session_id
+                ).scalar() or 0
+                db.session.add_all([
+                    WhiteboardStroke(session_id=session_id, seq=head + i, author_id=author_id, **s)
+                    for i, s in enumerate(strokes, start=1)
+                ])
+                try:
+                    db.session.commit()
+                    break
+                except IntegrityError:
+                    db.session.rollback()       # another process took these seqs
+            else:
+                raise RuntimeError("could not allocate whiteboard seqs")
+
+            new_head = head + len(strokes)
+            if new_head // self.snapshot_every != head // self.snapshot_every:
+                self.snapshot(session_id)
+        return list(range(head + 1, new_head + 1))
+
+    def snapshot(self, session_id):
+        """Fold the log after the current snapshot into it."""
+        snap = WhiteboardSnapshot.query.filter_by(session_id=session_id).first()
+        visible = json.loads(snap.data) if snap else []
+        entries = self._entries(session_id, snap.seq if snap else 0)
+        if not entries:
+            return snap
+
+        for entry in entries:
+            if entry["kind"] == "clear":
+                visible = []
+            elif not (visible and merge_piece(visible[-1], entry)):
+                visible.append(entry)
+
+        if snap is None:
+            snap = WhiteboardSnapshot(session_id=session_id)
+            db.session.add(snap)
+        snap.seq = entries[-1]["seq"]
+        snap.strokes = len(visible)
+        snap.data = json.dumps(visible, separators=(",", ":"))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()       # built concurrently by another process
+        return snap
+
+    def since(self, session_id, since=0):
+        """
+        {"seq", "snapshot", "strokes", "more"}: the log after `since`, starting
+        from the snapshot when the client has nothing yet or is far behind.
+        `seq` is the last entry covered; ask again with it while `more`.
+        """
+        tail = self._entries(session_id, since, self.page_size + 1)
+
+        snapshot = None
+        if since == 0 or len(tail) > self.snapshot_every:
+            snap = WhiteboardSnapshot.query.filter_by(session_id=session_id).first()
+            if snap and snap.seq > since:
+                snapshot = {"seq": snap.seq, "strokes": json.loads(snap.data)}
+                since = snap.seq
+                tail = self._entries(session_id, since, self.page_size + 1)
+
+        page = tail[:self.page_size]
+        return {
+            "seq": page[-1]["seq"] if page else since,
+            "snapshot": snapshot,
+            "strokes": page,
+            "more": len(tail) > self.page_size,
+        }
+
+
+whiteboard_log = WhiteboardLog()
+
+
+# -------------------------
+# BENCHMARK (BYTES PER MINUTE OF DRAWING)
+# -------------------------
+def _pointer_events(seconds, rate, seed):
+    """(t, x, y) of a pen writing for `seconds`: short curved strokes with pauses, `rate` Hz."""
+    import math
+    import random
+
+    rng = random.Random(seed)
+    strokes = []
+    t = 0.0
+    while t < seconds:
+        length = rng.uniform(0.3, 1.5)
+        x0, y0 = rng.uniform(100, BOARD_WIDTH - 100), rng.uniform(60, BOARD_HEIGHT - 60)
+        fx, fy, ph = rng.uniform(0.5, 3), rng.uniform(0.5, 3), rng.uniform(0, 6.3)
+        events = []
+        for k in range(int(length * rate)):
+            s = k / rate
+            events.append((
+                t + s,
+                round(x0 + 120 * s + 25 * math.sin(fx * 6.3 * s + ph) + rng.gauss(0, 0.3)),
+                round(y0 + 30 * math.sin(fy * 6.3 * s) + rng.gauss(0, 0.3)),
+            ))
+        strokes.append(events)
+        t += length + rng.uniform(0.1, 0.5)
+    return strokes
+
+
+def benchmark(seconds=60, rate=240, frame_ms=1000 / 60, piece_ms=200, seed=0):
+    """
+    Bytes sent and stored per minute of drawing:
+      per_event    one JSON segment per mousemove (the old whiteboard's input loop)
+      raw_pieces   every pointer position, sent as encoded 200 ms pieces
+      optimized    one position per animation frame + RDP, then server compaction
+    """
+    style = {"tool": "pen", "color": "#1faa00", "width": 4}
+    per_event = {"sent": 0, "stored": 0, "points": 0}
+    raw = {"sent": 0, "stored": 0, "points": 0}
+    optimized = {"sent": 0, "stored": 0, "points": 0}
+
+    def pieces(events):
+        """Split a stroke into send pieces; each continues from the previous end point."""
+        out, current, started = [], [], events[0][0]
+        for t, x, y in events:
+            current.append((x, y))
+            if t - started >= piece_ms / 1000:
+                out.append(current)
+                current, started = [current[-1]], t
+        if len(current) > 1 or not out:
+            out.append(current)
+        return out
+
+    def body(points):
+        entry = dict(style, kind="stroke", points=base64.b64encode(encode_points(points)).decode("ascii"))
+        return len(json.dumps({"strokes": [entry]}, separators=(",", ":")))
+
+    for events in _pointer_events(seconds, rate, seed):
+        for (_, x0, y0), (_, x1, y1) in zip(events, events[1:]):
+            segment = json.dumps(dict(style, x0=x0, y0=y0, x1=x1, y1=y1), separators=(",", ":"))
+            per_event["sent"] += len(segment)
+            per_event["stored"] += len(segment)
+            per_event["points"] += 2
+
+        for piece in pieces(events):
+            raw["sent"] += body(piece)
+            raw["stored"] += len(encode_points(piece))
+            raw["points"] += len(piece)
+
+        # last position of every animation frame
+        frames = {}
+        for t, x, y in events:
+            frames[int(t * 1000 // frame_ms)] = (t, x, y)
+        for piece in pieces(sorted(frames.values())):
+            sent = simplify(piece)
+            optimized["sent"] += body(sent)
+            stored = compact(sent)
+            optimized["stored"] += len(encode_points(stored))
+            optimized["points"] += len(stored)
+
+    per_minute = 60 / seconds
+    result = {}
+    for name, totals in (("per_event", per_event), ("raw_pieces", raw), ("optimized", optimized)):
+        result[name] = {k: round(v * per_minute) for k, v in totals.items()}
+    result["sent_reduction"] = round(per_event["sent"] / optimized["sent"], 1)
+    result["stored_reduction"] = round(raw["stored"] / optimized["stored"], 1)
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+
+    print(json.dumps(benchmark(rate=int(sys.argv[1]) if len(sys.argv) > 1 else 240), indent=2))